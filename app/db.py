@@ -35,12 +35,17 @@ _MIGRATIONS = {
         "source_dataset": "TEXT",
         "justice_subjekt_id": "TEXT",
         "listiny_checked_at": "DATETIME",
+        "listing_state": "JSON",
+        "rotation_stats": "JSON",
+        "next_check_at": "DATETIME",
     },
     "documents": {
         "score": "INTEGER",
         "doc_type": "TEXT",
         "meeting_date": "DATETIME",
         "ocr_used": "BOOLEAN",
+        "page_stats": "JSON",
+        "ocr_partial": "BOOLEAN",
     },
     "signals": {
         "type": "TEXT",
@@ -61,11 +66,13 @@ def _existing_columns(table_name: str) -> set[str]:
 
 # Mapování typů pro Postgres (SQLite bere obojí).
 _PG_TYPES = {"DATETIME": "TIMESTAMP", "BOOLEAN": "BOOLEAN",
-             "INTEGER": "INTEGER", "TEXT": "TEXT"}
+             "INTEGER": "INTEGER", "TEXT": "TEXT", "JSON": "JSON"}
 
 
 def init_db():
-    from .models import Subject, Document, Signal  # noqa: F401
+    from .models import (Subject, Document, Signal, LeadSummary,  # noqa: F401
+                         SubjektIdCache, SyncRun, SyncRunSubject)
+    from .lead_summary import ensure_built
     Base.metadata.create_all(bind=engine)
 
     is_pg = DATABASE_URL.startswith("postgresql")
@@ -78,6 +85,10 @@ def init_db():
                     conn.execute(text(
                         f"ALTER TABLE {table} ADD COLUMN {name} {col_type}"))
 
+    # Přehled leadů pro databáze založené před zavedením lead_summary.
+    with SessionLocal() as db:
+        ensure_built(db)
+
 def get_db():
     db = SessionLocal()
     try:
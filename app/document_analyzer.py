@@ -1,13 +1,14 @@
 """Extrakce metadat dokumentu (typ, datum shromáždění, výbor...).
 
 Doplněk k signal_engine: signal_engine hledá obchodní signály,
-document_analyzer strukturální údaje o dokumentu.
+document_analyzer strukturální údaje o dokumentu. analyze_full spojí
+obojí nad jedním AnalyzedText, takže se text normalizuje jen jednou.
 """
 
 import re
 from datetime import datetime
 
-from .signal_engine import _normalize_with_map, _norm
+from .signal_engine import AnalyzedText, detect_signals, score_signals
 
 
 DATE_RE = r"(\d{1,2})\s*\.\s*(\d{1,2})\s*\.\s*(\d{4})"
@@ -20,17 +21,18 @@ def _parse_cz_date(day: str, month: str, year: str):
         return None
 
 
-def analyze_document(text: str) -> dict:
+def analyze_document(text: str | AnalyzedText) -> dict:
     result = {
         "document_type": None,
         "meeting_date": None,       # datetime | None
         "meeting_date_text": None,  # "10.10.2024" | None
         "board_members": [],
     }
-    if not text or not text.strip():
+    doc = AnalyzedText.of(text)
+    if doc.is_blank:
         return result
 
-    norm_text, index_map = _normalize_with_map(text)
+    text, norm_text = doc.text, doc.norm_text
 
     # --- Typ dokumentu -----------------------------------------------------
     if re.search(r"zapis.{0,80}shromazdeni|shromazdeni.{0,80}zapis", norm_text, re.S):
@@ -58,8 +60,8 @@ def analyze_document(text: str) -> dict:
     m = re.search(r"zvoleni clenove\s*:?\s*", norm_text)
     if m:
         # Vezmi zbytek řádku z původního textu.
-        start_orig = index_map[min(m.end(), len(index_map) - 1)]
-        line = text[start_orig:start_orig + 200].splitlines()[0]
+        start_orig = doc.orig_index(m.end())
+        line = text[start_orig:min(doc.line_end(start_orig), start_orig + 200)]
         members = [
             x.strip(" .;-–")
             for x in re.split(r",|\s+a\s+", line)
@@ -72,3 +74,17 @@ def analyze_document(text: str) -> dict:
         ][:10]
 
     return result
+
+
+def analyze_full(text: str | AnalyzedText) -> dict:
+    """Metadata, signály a skóre dokumentu z jedné normalizace textu.
+
+    Skóre je před slevou podle typu dokumentu (viz pipeline.doc_score_divisor).
+    """
+    doc = AnalyzedText.of(text)
+    signals = detect_signals(doc)
+    return {
+        "meta": analyze_document(doc),
+        "signals": signals,
+        "score": score_signals(signals),
+    }
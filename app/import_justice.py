@@ -1,96 +1,240 @@
+"""Import SVJ z OpenData veřejného rejstříku (dataor.justice.cz).
+
+Dataset se stahuje a importuje proudově (JusticeClient.open_stream),
+nezměněný se podle ETag / Last-Modified nestahuje znovu. CSV se čte
+po dávkách (RADAR_IMPORT_CHUNK řádků, výchozí 2000). Pro každou dávku se
+existující IČO načtou jedním dotazem IN a dávka se zapíše hromadným
+upsertem: INSERT … ON CONFLICT (ico) DO UPDATE na SQLite i Postgres, na
+Postgres přes COPY do dočasné tabulky. Celostátní dataset (desítky tisíc
+řádků) tak stojí pár desítek dotazů místo dotazu na řádek.
+
+  python -m app.import_justice --dataset svj-actual-brno-2026
+  python -m app.import_justice --dataset svj-actual-brno-2026 --no-cache
+  python scripts/benchmark.py import      # řádky/s: po řádcích vs. dávky
+"""
+
 import argparse
 import csv
+import io
+import os
+import time
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
+
 from sqlalchemy import select
+from sqlalchemy.orm import Session
 
 from .db import init_db, SessionLocal
 from .models import Subject
 from .justice_client import JusticeClient
 from .justice_parser import parse_udaje
 
-def import_dataset(dataset: str, limit: int | None = None):
-    init_db()
-    Path("data/cache").mkdir(parents=True, exist_ok=True)
+CHUNK = int(os.getenv("RADAR_IMPORT_CHUNK", "2000"))
+# 0 = dataset se nikam neukládá (malý disk), jen se proudově importuje.
+KEEP_CACHE = os.getenv("RADAR_IMPORT_CACHE", "1") != "0"
+
+# Pole, která import přepisuje i u existujících subjektů.
+UPDATE_FIELDS = ("name", "address", "court", "file_number", "city", "street",
+                 "house_number", "zip_code", "last_entry_date",
+                 "source_dataset")
+# Jen u nově založených subjektů.
+NEW_DEFAULTS = {"legal_form": "Společenství vlastníků jednotek",
+                "source_url": "https://or.justice.cz/ias/ui/rejstrik"}
+
+
+def _subject_rows(reader, dataset: str, limit: int | None, out: dict):
+    """Pole Subjectu z řádků CSV; přeskočené a chybné řádky počítá do out."""
+    for row_no, row in enumerate(reader, start=1):
+        if limit and row_no > limit:
+            break
+        out["rows"] = row_no
+        try:
+            ico = (row.get("ico") or "").strip()
+            name = (row.get("nazev") or "").strip()
+            if not ico or not name:
+                out["skipped"] += 1
+                continue
+            parsed = parse_udaje(row.get("udaje") or "")
+            yield {"ico": ico, "name": name, "source_dataset": dataset,
+                   **{k: parsed[k] for k in UPDATE_FIELDS
+                      if k not in ("name", "source_dataset")}}
+        except Exception as exc:
+            out["errors"] += 1
+            if out["errors"] <= 10:
+                print(f"CHYBA řádek {row_no}: {exc}")
+
+
+def _chunks(iterable, size: int):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Zápis dávky
+# ---------------------------------------------------------------------------
+
+def _upsert_on_conflict(db: Session, rows: list[dict], dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(Subject.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Subject.__table__.c.ico],
+        set_={f: stmt.excluded[f] for f in UPDATE_FIELDS})
+    db.execute(stmt, [{**NEW_DEFAULTS, **r} for r in rows])
+
+
+_COPY_COLUMNS = ("ico",) + UPDATE_FIELDS
+
 
+def _upsert_copy(db: Session, rows: list[dict]):
+    """Postgres: COPY do dočasné tabulky a jeden INSERT … SELECT."""
+    cursor = db.connection().connection.cursor()
+    cols = ", ".join(_COPY_COLUMNS)
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS subjects_import "
+        "(ico TEXT, name TEXT, address TEXT, court TEXT, file_number TEXT, "
+        "city TEXT, street TEXT, house_number TEXT, zip_code TEXT, "
+        "last_entry_date TIMESTAMP, source_dataset TEXT) "
+        "ON COMMIT DELETE ROWS")
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        # \N = NULL, prázdné pole zůstane prázdným řetězcem.
+        writer.writerow([r"\N" if r[c] is None else
+                         r[c].isoformat() if isinstance(r[c], datetime)
+                         else r[c] for c in _COPY_COLUMNS])
+    buf.seek(0)
+    cursor.copy_expert(f"COPY subjects_import ({cols}) FROM STDIN "
+                       r"WITH (FORMAT csv, NULL '\N')", buf)
+    cursor.execute(
+        f"INSERT INTO subjects ({cols}, legal_form, source_url, active, "
+        f"created_at) "
+        f"SELECT {cols}, %s, %s, TRUE, %s FROM subjects_import "
+        f"ON CONFLICT (ico) DO UPDATE SET "
+        + ", ".join(f"{c} = EXCLUDED.{c}" for c in UPDATE_FIELDS),
+        (NEW_DEFAULTS["legal_form"], NEW_DEFAULTS["source_url"],
+         datetime.utcnow()))
+    cursor.execute("TRUNCATE subjects_import")
+
+
+def _upsert_orm(db: Session, rows: list[dict], existing: dict):
+    """Ostatní databáze: ORM, ale s objekty načtenými jedním dotazem."""
+    for r in rows:
+        subject = existing.get(r["ico"])
+        if subject is None:
+            subject = Subject(**NEW_DEFAULTS, ico=r["ico"], name=r["name"])
+            db.add(subject)
+        for key in UPDATE_FIELDS:
+            setattr(subject, key, r[key])
+
+
+def upsert_subjects(db: Session, rows: list[dict], out: dict,
+                    copy: bool = True) -> None:
+    """Zapíše dávku polí Subjectu (nové i existující IČO); necommituje.
+
+    Nové / aktualizované počítá podle jednoho dotazu IN na IČO dávky.
+    Opakované IČO v dávce: platí poslední řádek (jako při zápisu po
+    řádcích). copy=False vypne COPY na Postgres.
+    """
+    icos = list({r["ico"] for r in rows})
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        seen = set(db.scalars(select(Subject.ico).where(Subject.ico.in_(icos))))
+        existing = {}
+    else:
+        existing = {s.ico: s for s in db.scalars(
+            select(Subject).where(Subject.ico.in_(icos)))}
+        seen = set(existing)
+    for r in rows:
+        out["updated" if r["ico"] in seen else "inserted"] += 1
+        seen.add(r["ico"])
+    rows = list({r["ico"]: r for r in rows}.values())
+
+    if (dialect == "postgresql" and copy
+            and db.get_bind().dialect.driver == "psycopg2"):
+        _upsert_copy(db, rows)
+    elif dialect in ("sqlite", "postgresql"):
+        _upsert_on_conflict(db, rows, dialect)
+    else:
+        _upsert_orm(db, rows, existing)
+
+
+def import_rows(db: Session, f, dataset: str, limit: int | None = None,
+                chunk: int = CHUNK) -> dict:
+    """Naimportuje CSV z textového proudu po dávkách, commit po každé dávce.
+
+    Vrací počty řádků (rows, inserted, updated, skipped, errors), dobu
+    v sekundách a rychlost rows_per_s.
+    """
+    out = {"rows": 0, "inserted": 0, "updated": 0, "skipped": 0,
+           "errors": 0}
+    started = time.perf_counter()
+    rows = _subject_rows(csv.DictReader(f), dataset, limit, out)
+    for batch in _chunks(rows, max(1, chunk)):
+        upsert_subjects(db, batch, out)
+        db.commit()
+        print(f"Zpracováno: {out['rows']:,} | nové: {out['inserted']:,} "
+              f"| aktualizované: {out['updated']:,}")
+    elapsed = time.perf_counter() - started
+    out["seconds"] = round(elapsed, 2)
+    out["rows_per_s"] = round(out["rows"] / max(elapsed, 1e-9))
+    return out
+
+
+def import_csv(db: Session, path: str | Path, dataset: str,
+               limit: int | None = None, chunk: int = CHUNK) -> dict:
+    """Naimportuje CSV soubor (viz import_rows)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return import_rows(db, f, dataset, limit, chunk)
+
+
+def import_dataset(dataset: str, limit: int | None = None,
+                   chunk: int = CHUNK, keep_cache: bool = KEEP_CACHE) -> dict:
+    """Stáhne dataset a průběžně ho importuje (bez čekání na celý soubor).
+
+    keep_cache: stažená data se zároveň ukládají do data/cache (příště se
+    nezměněný dataset podle ETag / Last-Modified nestahuje); bez cache se
+    na disk nezapisuje nic.
+    """
+    init_db()
     client = JusticeClient()
     url = client.csv_url(dataset)
-    target = Path("data/cache") / f"{dataset}.csv"
+    cache = Path("data/cache") / f"{dataset}.csv" if keep_cache else None
 
     print(f"Dataset: {dataset}")
     print(f"CSV: {url}")
-    print("Stahuji...")
-    client.download(url, target)
-    print(f"Staženo: {target} ({target.stat().st_size / 1024 / 1024:.1f} MB)")
-
-    db = SessionLocal()
-    inserted = updated = skipped = errors = 0
-
-    try:
-        with open(target, "r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            for row_no, row in enumerate(reader, start=1):
-                if limit and row_no > limit:
-                    break
-
-                try:
-                    ico = (row.get("ico") or "").strip()
-                    name = (row.get("nazev") or "").strip()
-                    udaje = row.get("udaje") or ""
-                    if not ico or not name:
-                        skipped += 1
-                        continue
-
-                    parsed = parse_udaje(udaje)
-                    subject = db.scalar(select(Subject).where(Subject.ico == ico))
-
-                    if subject is None:
-                        subject = Subject(
-                            ico=ico,
-                            name=name,
-                            legal_form="Společenství vlastníků jednotek",
-                            source_url="https://or.justice.cz/ias/ui/rejstrik",
-                            source_dataset=dataset,
-                        )
-                        db.add(subject)
-                        inserted += 1
-                    else:
-                        updated += 1
-
-                    subject.name = name
-                    subject.address = parsed["address"]
-                    subject.court = parsed["court"]
-                    subject.file_number = parsed["file_number"]
-                    subject.city = parsed["city"]
-                    subject.street = parsed["street"]
-                    subject.house_number = parsed["house_number"]
-                    subject.zip_code = parsed["zip_code"]
-                    subject.last_entry_date = parsed["last_entry_date"]
-                    subject.source_dataset = dataset
-
-                    if row_no % 500 == 0:
-                        db.commit()
-                        print(f"Zpracováno: {row_no:,} | nové: {inserted:,} | aktualizované: {updated:,}")
-
-                except Exception as exc:
-                    errors += 1
-                    if errors <= 10:
-                        print(f"CHYBA řádek {row_no}: {exc}")
-
-            db.commit()
-    finally:
-        db.close()
+    with client.open_stream(url, cache) as stream, SessionLocal() as db:
+        print("Beze změny od posledního stažení, čtu z cache..."
+              if stream.cached else "Stahuji a importuji průběžně...")
+        out = import_rows(db, stream.text(), dataset, limit, chunk)
+        out["cached"] = stream.cached
+        out["bytes"] = stream.bytes_read
+    print(f"{'Přečteno z cache' if out['cached'] else 'Staženo'}: "
+          f"{out['bytes'] / 1024 / 1024:.1f} MB")
 
     print()
     print("IMPORT HOTOV")
-    print(f"Zpracováno: {row_no:,}")
-    print(f"Nové:       {inserted:,}")
-    print(f"Aktualizované: {updated:,}")
-    print(f"Přeskočené: {skipped:,}")
-    print(f"Chyby:      {errors:,}")
+    print(f"Zpracováno: {out['rows']:,}")
+    print(f"Nové:       {out['inserted']:,}")
+    print(f"Aktualizované: {out['updated']:,}")
+    print(f"Přeskočené: {out['skipped']:,}")
+    print(f"Chyby:      {out['errors']:,}")
+    print(f"Rychlost:   {out['rows_per_s']:,} řádků/s ({out['seconds']} s)")
+    return out
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--dataset", default="svj-actual-brno-2026")
     parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=CHUNK,
+                        help="Řádků CSV na jednu dávku zápisu")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Neukládat dataset do data/cache")
     args = parser.parse_args()
-    import_dataset(args.dataset, args.limit)
+    import_dataset(args.dataset, args.limit, args.chunk,
+                   keep_cache=KEEP_CACHE and not args.no_cache)
@@ -1,8 +1,30 @@
+"""Klient OpenData veřejného rejstříku (dataor.justice.cz).
+
+Dataset se čte proudově (open_stream): tělo odpovědi čte vlákno napřed
+po blocích, takže stahování běží souběžně s parsováním a importem
+a doba importu je zhruba max(stahování, parsování) místo součtu.
+Komprimované CSV (Content-Encoding i samotný soubor .gz) se rozbalí
+za běhu. Volitelně se stažená data zároveň ukládají do cache souboru
+(tee); s ním se příště pošle podmíněný požadavek (ETag / Last-Modified)
+a nezměněný dataset se nestahuje znovu, čte se z cache.
+"""
+
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+
 import requests
 
 OPEN_DATA_API = "https://dataor.justice.cz/api/3/action"
 FILE_BASE = "http://dataor.justice.cz/api/file/"
 
+USER_AGENT = "RBD-Radar/0.2 internal monitoring"
+
+
 class JusticeClient:
     def __init__(self, timeout=60):
         self.timeout = timeout
@@ -35,7 +57,7 @@ class JusticeClient:
 
     def download(self, url, target):
         with requests.get(url, stream=True, timeout=self.timeout, headers={
-            "User-Agent": "RBD-Radar/0.2 internal monitoring"
+            "User-Agent": USER_AGENT
         }) as r:
             r.raise_for_status()
             with open(target, "wb") as f:
@@ -43,3 +65,176 @@ class JusticeClient:
                     if chunk:
                         f.write(chunk)
         return target
+
+    def open_stream(self, url: str, cache: Path | None = None) -> "DatasetStream":
+        """Otevře dataset pro proudové čtení (viz DatasetStream).
+
+        cache: soubor, do kterého se stažená data průběžně ukládají; jsou-li
+        u něj uložené validátory ze stejné URL, pošle se podmíněný požadavek
+        a při 304 se čte přímo z cache. None = bez cache.
+        """
+        headers = {"User-Agent": USER_AGENT}
+        meta = read_meta(cache) if cache is not None else None
+        if meta and meta.get("url") == url:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        r = requests.get(url, stream=True, timeout=self.timeout,
+                         headers=headers)
+        if r.status_code == 304 and meta:
+            r.close()
+            return DatasetStream(open(cache, "rb"), cached=True)
+        r.raise_for_status()
+        r.raw.decode_content = True     # Content-Encoding: gzip/deflate
+        validators = {"url": url, "etag": r.headers.get("ETag"),
+                      "last_modified": r.headers.get("Last-Modified")}
+        return DatasetStream(r.raw, response=r, tee=cache,
+                             validators=validators)
+
+
+# ---------------------------------------------------------------------------
+# Proudové čtení a cache
+# ---------------------------------------------------------------------------
+
+def _meta_path(cache: Path) -> Path:
+    return cache.with_name(cache.name + ".meta.json")
+
+
+def read_meta(cache: Path) -> dict | None:
+    """Validátory uložené k úplnému cache souboru (None = není cache)."""
+    if not cache.exists():
+        return None
+    try:
+        return json.loads(_meta_path(cache).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class _Prefetcher(io.RawIOBase):
+    """Čte zdroj ve vlákně po blocích napřed (omezená fronta).
+
+    Každý přečtený blok zároveň zapíše do tee (cache). eof = zdroj byl
+    dočten do konce.
+    """
+
+    def __init__(self, source, tee=None, block: int = 1 << 20,
+                 depth: int = 8):
+        super().__init__()
+        self._source = source
+        self._tee = tee
+        self._block = block
+        self._queue = queue.Queue(depth)
+        self._stop = threading.Event()
+        self._view = memoryview(b"")
+        self._done = False
+        self.error: BaseException | None = None
+        self.eof = False
+        self.bytes_read = 0
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="dataset-prefetch")
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while True:
+                chunk = self._source.read(self._block)
+                if not chunk:
+                    self.eof = True
+                    break
+                self.bytes_read += len(chunk)
+                if self._tee is not None:
+                    self._tee.write(chunk)
+                if not self._put(chunk):
+                    return
+        except BaseException as exc:
+            self.error = exc
+        self._put(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._view:
+            if self._done:
+                return 0
+            chunk = self._queue.get()
+            if not chunk:
+                self._done = True
+                if self.error is not None:
+                    raise self.error
+                return 0
+            self._view = memoryview(chunk)
+        n = min(len(b), len(self._view))
+        b[:n] = self._view[:n]
+        self._view = self._view[n:]
+        return n
+
+    def close(self, source_close=None):
+        """Zastaví čtení; source_close (zavření spojení) přeruší rozečtený
+        blok, jinak by se čekalo na jeho dočtení."""
+        self._stop.set()
+        if source_close is not None:
+            source_close()
+        self._thread.join()
+        super().close()
+
+
+class DatasetStream:
+    """Dataset otevřený pro proudové čtení (kontextový manažer).
+
+    text() vrací textový proud CSV (gzip rozpozná podle obsahu). Cache
+    soubor se píše do dočasného souboru a nahradí starý jen tehdy, když
+    se data dočetla do konce (import s --limit cache nezmění).
+    cached = data jsou z cache (server odpověděl 304).
+    """
+
+    def __init__(self, source, *, cached: bool = False, response=None,
+                 tee: Path | None = None, validators: dict | None = None):
+        self.cached = cached
+        self._source = source
+        self._response = response
+        self._cache = tee
+        self._validators = validators
+        self._tmp = None
+        if tee is not None:
+            tee.parent.mkdir(parents=True, exist_ok=True)
+            self._tmp = open(tee.with_name(tee.name + ".part"), "wb")
+        self._raw = _Prefetcher(source, tee=self._tmp)
+
+    @property
+    def bytes_read(self) -> int:
+        return self._raw.bytes_read
+
+    def text(self) -> io.TextIOBase:
+        buffered = io.BufferedReader(self._raw, buffer_size=1 << 16)
+        stream = (gzip.GzipFile(fileobj=buffered)
+                  if buffered.peek(2)[:2] == b"\x1f\x8b" else buffered)
+        return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    def close(self):
+        self._raw.close((self._response or self._source).close)
+        if self._tmp is not None:
+            self._tmp.close()
+            tmp = Path(self._tmp.name)
+            if self._raw.eof and self._raw.error is None:
+                os.replace(tmp, self._cache)
+                _meta_path(self._cache).write_text(
+                    json.dumps(self._validators), encoding="utf-8")
+            else:
+                tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,34 +1,294 @@
+"""Parser sloupce 'udaje' z OpenData ISVR (dataor.justice.cz).
+
+Sloupec obsahuje strukturu podobnou JSON: seznam záznamů
+[{hlavicka=…;hodnotaText=…;zapisDatum=…;adresa={obec=…;ulice=…};…}, …],
+vnořené slovníky ve {…} a seznamy v […]. parse_tree z ní postaví strom
+a pole subjektu jsou pak vyhledání v jeho slovnících místo opakovaného
+prohledávání celého textu regulárními výrazy.
+
+Strom je líný. Kořen se čte tokenizérem postupně jen do chvíle, kdy je
+hledaný záznam celý (Spisová značka a Sídlo jsou na začátku); hodnoty
+ve {…} / […] přeskočí jako celek (vyváženou skupinu najde regex v C)
+a jejich obsah se tokenizuje až při prvním přístupu. U záznamu v kořeni
+se kvůli rejstříku čte jen jeho nejvyšší úroveň po hlavicka=…. Dlouhá
+historie zápisů (členové výboru s adresami, i jako samostatné záznamy
+v kořeni) se tak nerozkládá; data zápisů posbírá jeden findall.
+
+Regex vyvážené skupiny sahá do hloubky _DEPTH (ISVR má nejvýš ~4);
+hlubší skupinu dohledá pomalejší počítání závorek (_group_end), takže
+se nic neztratí. Neuzavřená skupina (useknutý text) sahá do konce.
+
+Proti původním regexům se liší jen tam, kde se regex trefil vedle: chybí-li
+v adrese sídla ulice nebo číslo, regex ho vzal z první další adresy v textu
+(typicky člena výboru), strom vrátí None.
+
+Srovnání s původními regulárními výrazy: python scripts/benchmark.py udaje
+"""
+
 import re
 from datetime import datetime
 
+
 def clean(value):
     return value.strip() if value else None
 
-def first(pattern, text):
-    m = re.search(pattern, text, flags=re.I | re.S)
-    return clean(m.group(1)) if m else None
+
+# Vyvážená skupina {…} nebo […] do hloubky _DEPTH (ISVR má nejvýš ~4,
+# hlubší viz _group_end).
+_DEPTH = 6
+_GROUP = r"[{\[][^{}\[\]]*+[}\]]"
+for _ in range(_DEPTH):
+    _GROUP = r"[{\[](?:[^{}\[\]]++|" + _GROUP + r")*+[}\]]"
+
+# Klíč=skupina, klíč= s neuzavřenou skupinou (useknutý text), klíč=text.
+# Text končí na ';', závorce nebo čárce před dalším klíčem= ({kod=…,nazev=…});
+# jiné čárky k hodnotě patří (původní regexy bral hodnoty jako [^;}]*).
+_TEXT = r"((?:[^;,{}\[\]]++|,(?!\s*\w+=))*+)"
+_PAIR = r"(\w+)=(?:(" + _GROUP + r")|([{\[])|" + _TEXT + ")"
+# Uvnitř uzlu jsou i anonymní skupiny celé. V kořeni je celý jen záznam
+# {…}; do seznamů […] se vstupuje, takže čtení může skončit uprostřed.
+_TOKEN = re.compile(_PAIR + r"|(" + _GROUP + r")|([{\[])|[}\]]")
+_ROOT_TOKEN = re.compile(
+    _PAIR + r"|(\{(?:[^{}\[\]]++|" + _GROUP + r")*+\})|([{\[])|([}\]])")
+_DATES = re.compile(r"zapisDatum=(\d{4}-\d{2}-\d{2})")
+_BRACKET = re.compile(r"[{}\[\]]")
+
+
+def _group_end(text: str, start: int) -> int | None:
+    """Konec skupiny otevřené na text[start] (index za závorkou) počítáním
+    závorek; None = skupina není uzavřená."""
+    depth = 0
+    for m in _BRACKET.finditer(text, start):
+        depth += 1 if m.group() in "{[" else -1
+        if depth == 0:
+            return m.end()
+    return None
+
+
+class Node:
+    """Slovník {…} nebo seznam […] z 'udaje', tokenizovaný při prvním přístupu.
+
+    fields: klíč -> první hodnota s tímto klíčem (text nebo Node), v pořadí
+    textu; anonymní skupiny (položky seznamu) jsou v seznamu pod klíčem "".
+    """
+    __slots__ = ("text", "_fields")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._fields = None
+
+    @property
+    def fields(self) -> dict:
+        if self._fields is None:
+            self._fields = _fields(self.text)
+        return self._fields
+
+    def get(self, key: str, default=None):
+        return self.fields.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.fields[key]
+
+    def find(self, key: str):
+        """První hodnota klíče v uzlu, jinak v jeho vnořených uzlech."""
+        fields = self.fields
+        if key in fields:
+            return fields[key]
+        for name, value in fields.items():
+            for node in (value if name == "" else (value,)):
+                if isinstance(node, Node):
+                    found = node.find(key)
+                    if found is not None:
+                        return found
+        return None
+
+
+def _fields(text: str) -> dict:
+    fields: dict = {}
+    for key, group, opened, value, anon, bare in _TOKEN.findall(text):
+        if group:
+            value = Node(group[1:-1])
+        elif opened or bare:
+            return _fields_slow(text)
+        elif anon:
+            fields.setdefault("", []).append(Node(anon[1:-1]))
+            continue
+        elif not key:
+            continue
+        fields.setdefault(key, value)
+    return fields
+
+
+def _fields_slow(text: str) -> dict:
+    """Jako _fields, ale skupinu, kterou regex nepřeskočil (hlubší než
+    _DEPTH nebo neuzavřenou), dohledá po závorkách."""
+    fields: dict = {}
+    pos = 0
+    while (m := _TOKEN.search(text, pos)) is not None:
+        pos = m.end()
+        key, group, opened, value, anon, bare = m.groups()
+        if opened or bare:
+            end = _group_end(text, m.end() - 1)
+            node = Node(text[m.end():end - 1] if end else text[m.end():])
+            if key:
+                fields.setdefault(key, node)
+            else:
+                fields.setdefault("", []).append(node)
+            if end is None:
+                break
+            pos = end
+        elif anon is not None:
+            fields.setdefault("", []).append(Node(anon[1:-1]))
+        elif key:
+            fields.setdefault(key, Node(group[1:-1]) if group is not None
+                              else value)
+    return fields
+
+
+def _header(text: str):
+    """Hlavička záznamu {…}: jen nejvyšší úroveň do hlavicka=…, hodnoty
+    ve skupinách se přeskočí bez rozkladu."""
+    for m in _TOKEN.finditer(text):
+        key, group, opened, value, anon, bare = m.groups()
+        if opened or bare:
+            return _fields_slow(text).get("hlavicka")
+        if key == "hlavicka":
+            return value if group is None else None
+    return None
+
+
+class UdajeTree:
+    """Kořen údajů subjektu čtený postupně, s rejstříkem záznamů.
+
+    Záznam je skupina {…} v kořeni nebo v seznamu […] (slovník jejích
+    polí), případně pole v kořeni od hlavicka=… do další hlavičky (údaje
+    bez závorek). Do hodnot polí rejstřík nesestupuje.
+
+    records   hlavička (casefold) -> první záznam s ní (Node, u záznamu
+              bez závorek dict), zatím přečtené
+    dates     všechny hodnoty zapisDatum (YYYY-MM-DD)
+    """
+
+    def __init__(self, udaje: str):
+        self.text = udaje
+        self.records: dict[str, dict] = {}
+        self.dates = _DATES.findall(udaje)
+        self._read: list = []           # přečtené dvojice kořene (pro find)
+        self._tokens = _ROOT_TOKEN.finditer(udaje)
+        self._open: list[dict] = [{}]   # rozpracovaný záznam bez závorek
+
+    def _index(self, record, header):
+        if isinstance(header, str):
+            self.records.setdefault(header.casefold(), record)
+
+    def _step(self) -> bool:
+        """Zpracuje další token kořene; False = text je přečtený celý."""
+        m = next(self._tokens, None)
+        if m is None:
+            self._open.clear()
+            return False
+        key, group, opened, value, record, anon, closer = m.groups()
+        if record is not None:
+            node = Node(record[1:-1])
+            self._read.append(("", node))
+            self._index(node, _header(node.text))
+        elif anon:
+            self._open.append({})
+        elif closer:
+            if len(self._open) > 1:
+                self._open.pop()
+        elif key:
+            if group is not None:
+                value = Node(group[1:-1])
+            elif opened:
+                # Skupina hlubší než _DEPTH, nebo neuzavřená (sahá do konce).
+                end = _group_end(self.text, m.end() - 1)
+                value = Node(self.text[m.end():end - 1] if end
+                             else self.text[m.end():])
+                self._tokens = (_ROOT_TOKEN.finditer(self.text, end) if end
+                                else iter(()))
+            self._read.append((key, value))
+            current = self._open[-1]
+            if key == "hlavicka" and "hlavicka" in current:
+                current = self._open[-1] = {}
+            current.setdefault(key, value)
+            if key == "hlavicka":
+                self._index(current, current["hlavicka"])
+        return True
+
+    def record(self, header: str) -> dict:
+        """První záznam, jehož hlavička začíná daným textem ({} = není).
+
+        Kořen se čte jen do konce tohoto záznamu.
+        """
+        header = header.casefold()
+        seen = 0
+        while True:
+            names = list(self.records)
+            for name in names[seen:]:
+                if name.startswith(header):
+                    record = self.records[name]
+                    # Záznam bez závorek je celý, až začne další nebo
+                    # skončí skupina, ve které je.
+                    while any(r is record for r in self._open):
+                        if not self._step():
+                            break
+                    return record
+            seen = len(names)
+            if not self._step():
+                return {}
+
+    def find(self, key: str):
+        """První hodnota klíče kdekoli v údajích (v pořadí textu)."""
+        n = 0
+        while True:
+            for name, value in self._read[n:]:
+                if name == key:
+                    return value
+                if isinstance(value, Node):
+                    found = value.find(key)
+                    if found is not None:
+                        return found
+            n = len(self._read)
+            if not self._step():
+                return None
+
+
+def parse_tree(udaje: str) -> UdajeTree:
+    return UdajeTree(udaje)
+
+
+def _text(node, *path):
+    """Text po cestě klíčů (None, pokud cesta nevede nebo nekončí textem)."""
+    for key in path:
+        if not isinstance(node, (dict, Node)):
+            return None
+        node = node.get(key)
+    return clean(node) if isinstance(node, str) else None
+
 
 def parse_udaje(udaje: str):
     # OpenData ISVR používá ve sloupci 'udaje' textovou strukturu podobnou JSON.
-    file_number = first(r"hlavicka=Spisová značka.*?hodnotaText=([^;}]*)", udaje)
-    court = first(r"spisZn=\{soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)", udaje)
+    tree = parse_tree(udaje)
 
-    # Robustnější varianta: pokud se předchozí regex netrefí.
+    file_number = _text(tree.record("Spisová značka"), "hodnotaText")
+    court = _text(tree.find("spisZn"), "soud", "nazev")
+    # Robustnější varianta: soud mimo spisovou značku.
     if not court:
-        court = first(r"soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)", udaje)
+        court = _text(tree.find("soud"), "nazev")
 
-    city = first(r"hlavicka=Sídlo.*?adresa=\{.*?obec=([^;}]*)", udaje)
-    street = first(r"hlavicka=Sídlo.*?adresa=\{.*?ulice=([^;}]*)", udaje)
-    cislo_po = first(r"hlavicka=Sídlo.*?adresa={.*?cisloPo=([^;}]*)", udaje)
-    cislo_or = first(r"hlavicka=Sídlo.*?adresa={.*?cisloOr=([^;}]*)", udaje)
+    adresa = tree.record("Sídlo").get("adresa")
+    city = _text(adresa, "obec")
+    street = _text(adresa, "ulice")
+    cislo_po = _text(adresa, "cisloPo")
+    cislo_or = _text(adresa, "cisloOr")
     house_number = f"{cislo_po}/{cislo_or}" if cislo_po and cislo_or else (cislo_po or cislo_or)
-    zip_code = first(r"hlavicka=Sídlo.*?adresa=\{.*?psc=([^;}]*)", udaje)
+    zip_code = _text(adresa, "psc")
 
-    dates = re.findall(r"zapisDatum=(\d{4}-\d{2}-\d{2})", udaje)
     last_entry = None
-    if dates:
+    if tree.dates:
         try:
-            last_entry = datetime.strptime(max(dates), "%Y-%m-%d")
+            last_entry = datetime.fromisoformat(max(tree.dates))
         except ValueError:
             pass
 
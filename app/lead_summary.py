@@ -0,0 +1,103 @@
+"""Materializovaný přehled leadů (tabulka lead_summary).
+
+Jeden řádek na SVJ s nejlepším skóre, úrovní leadu, posledním zápisem
+a deduplikovanými signály. Řádek se přepočítá ve stejné transakci jako
+změna dokumentů subjektu (ingest_text, rescore_all, delete_document),
+takže /api/leads, export i /api/leads/{ico} čtou hotová čísla místo
+seskupování všech dokumentů a signálů při každém dotazu.
+
+Funkce necommitují — o transakci rozhoduje volající.
+"""
+
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import Session, defer, selectinload
+
+from .models import Document, LeadSummary
+from .signal_engine import lead_level
+
+
+def _doc_rank(doc: Document) -> tuple:
+    """Pořadí dokumentů jako v /api/leads: skóre, datum (NULL na konec), id."""
+    return (doc.score or 0, doc.document_date is not None,
+            doc.document_date or datetime.min, doc.id)
+
+
+def summarize(docs: list[Document]) -> dict:
+    """Spočítá hodnoty řádku lead_summary z dokumentů jednoho subjektu."""
+    docs = sorted(docs, key=_doc_rank, reverse=True)
+    best = docs[0]
+    seen, labels, values = set(), [], []
+    last_date, source = None, None
+    for doc in docs:
+        d = doc.meeting_date or doc.document_date
+        if d and (last_date is None or d > last_date):
+            last_date, source = d, doc.source_url
+        for s in sorted(doc.signals, key=lambda x: x.priority or 0,
+                        reverse=True):
+            label = s.label or s.keyword
+            if label in seen:
+                continue
+            seen.add(label)
+            labels.append(label)
+            if s.value:
+                values.append(f"{label}: {s.value}")
+    return {
+        "best_score": best.score or 0,
+        "lead_level": lead_level(best.score or 0),
+        "best_document_id": best.id,
+        "best_document_date": best.document_date,
+        "last_meeting_date": last_date,
+        "source_url": source,
+        "signal_labels": labels,
+        "signal_values": values,
+        "document_count": len(docs),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def refresh_subject(db: Session, subject_id: int) -> LeadSummary | None:
+    """Přepočítá řádek jednoho subjektu; bez dokumentů ho smaže."""
+    db.flush()
+    docs = db.scalars(
+        select(Document).where(Document.subject_id == subject_id)
+        .options(defer(Document.text), selectinload(Document.signals))
+    ).all()
+    row = db.get(LeadSummary, subject_id)
+    if not docs:
+        if row is not None:
+            db.delete(row)
+        return None
+    if row is None:
+        row = LeadSummary(subject_id=subject_id)
+        db.add(row)
+    for key, value in summarize(docs).items():
+        setattr(row, key, value)
+    return row
+
+
+def rebuild_all(db: Session) -> int:
+    """Přepočítá celou tabulku (po rescore nebo pro existující databázi)."""
+    db.flush()
+    db.execute(delete(LeadSummary))
+    docs = db.scalars(
+        select(Document)
+        .options(defer(Document.text), selectinload(Document.signals))
+        .order_by(Document.subject_id)
+    ).all()
+    count = 0
+    for subject_id, group in groupby(docs, key=lambda d: d.subject_id):
+        db.add(LeadSummary(subject_id=subject_id, **summarize(list(group))))
+        count += 1
+    return count
+
+
+def ensure_built(db: Session) -> None:
+    """Doplní tabulku pro databázi, která vznikla před jejím zavedením."""
+    if db.scalar(select(func.count()).select_from(LeadSummary)):
+        return
+    if db.scalar(select(func.count(Document.id))):
+        rebuild_all(db)
+        db.commit()
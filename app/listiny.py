@@ -2,23 +2,34 @@
 
 Web or.justice.cz nemá oficiální API a poměrně agresivně omezuje
 frekvenci požadavků (při rychlém přístupu vrací timeouty). Klient proto:
-  - drží mezi požadavky pauzu (výchozí 3 s),
-  - opakuje neúspěšné požadavky s exponenciálním čekáním,
-  - stahuje jen listiny, které v databázi ještě nejsou.
+  - drží celkovou frekvenci požadavků (výchozí 1 za 3 s) a navíc zvlášť
+    pro každý typ stránky (vyhledávání, seznam listin, detail, stažení),
+  - po 429/5xx zpomalí jen dotčený typ stránky a zrychluje zase pomalu,
+  - stahuje jen listiny, které v databázi ještě nejsou,
+  - seznam listin stahuje podmíněně (ETag / Last-Modified, pokud je server
+    pošle) a nezměněný seznam podle otisku vůbec neparsuje,
+  - HTML parsuje C parserem (selectolax / lxml), je-li nainstalovaný
+    (app.listiny_html, záloha BeautifulSoup).
+
+Klient je bezpečný pro použití z více vláken (každé má svou HTTP session),
+takže síťové čekání může běžet souběžně se zpracováním PDF.
 
 Tok:  IČO -> subjektId (stránka rejstříku)
       subjektId -> seznam listin (vypis-sl-firma)
       dokumentId -> odkaz na PDF (vypis-sl-detail, /ias/content/download?id=...)
 """
 
+import hashlib
 import re
+import threading
 import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
+
+from . import listiny_html
 
 BASE = "https://or.justice.cz/ias/ui"
 CONTENT_BASE = "https://or.justice.cz"
@@ -76,60 +87,85 @@ def _qs(href: str, name: str) -> str | None:
 # Parsování HTML (oddělené od klienta kvůli testovatelnosti bez sítě)
 # ---------------------------------------------------------------------------
 
-def parse_subjekt_id(html: str) -> str | None:
-    """Najde subjektId v HTML stránky rejstříku (odkaz na Sbírku listin)."""
-    soup = BeautifulSoup(html, "html.parser")
-    for a in soup.find_all("a", href=True):
-        sid = _qs(a["href"], "subjektId")
-        if sid and "vypis-sl" in a["href"]:
-            return sid
-    for a in soup.find_all("a", href=True):
-        sid = _qs(a["href"], "subjektId")
-        if sid:
+def parse_subjekt_id(html: str, parser: str | None = None) -> str | None:
+    """Najde subjektId v HTML stránky rejstříku (odkaz na Sbírku listin).
+
+    Přednost má odkaz na Sbírku listin (vypis-sl), jinak první odkaz
+    se subjektId. parser: backend z app.listiny_html (None = výchozí).
+    """
+    fallback = None
+    for href in listiny_html.get(parser).links(html):
+        sid = _qs(href, "subjektId")
+        if sid and "vypis-sl" in href:
             return sid
-    return None
+        fallback = fallback or sid
+    return fallback
 
 
-def parse_listiny_html(html: str, subjekt_id: str) -> list[Listina]:
+def parse_listiny_html(html: str, subjekt_id: str,
+                       parser: str | None = None) -> list[Listina]:
     """Vyparsuje tabulku listin ze stránky vypis-sl-firma."""
-    soup = BeautifulSoup(html, "html.parser")
     listiny: list[Listina] = []
-    for table in soup.find_all("table"):
-        heads = [th.get_text(" ", strip=True) for th in table.find_all("th")]
-        if not any("Číslo listiny" in h for h in heads):
+    for row in listiny_html.get(parser).listing_rows(html):
+        href = row.href
+        dokument_id = _qs(href, "dokument")
+        if not dokument_id:
             continue
-        for tr in table.find_all("tr"):
-            tds = tr.find_all("td")
-            if len(tds) < 6:
-                continue
-            a = tds[0].find("a", href=True)
-            if not a:
-                continue
-            href = a["href"]
-            dokument_id = _qs(href, "dokument")
-            if not dokument_id:
-                continue
-            stran_txt = tds[5].get_text(strip=True)
-            listiny.append(Listina(
-                cislo=a.get_text(" ", strip=True).replace("\xa0", " "),
-                typ=tds[1].get_text(" ", strip=True),
-                vznik=_parse_cz_date(tds[2].get_text(strip=True)),
-                doslo=_parse_cz_date(tds[3].get_text(strip=True)),
-                zalozeno=_parse_cz_date(tds[4].get_text(strip=True)),
-                stran=int(stran_txt) if stran_txt.isdigit() else None,
-                dokument_id=dokument_id,
-                subjekt_id=subjekt_id,
-                spis=_qs(href, "spis"),
-                detail_url=f"{BASE}/{href.lstrip('./')}",
-            ))
+        stran_txt = "".join(row.cells[5])
+        listiny.append(Listina(
+            cislo=" ".join(row.link_text).replace("\xa0", " "),
+            typ=" ".join(row.cells[1]),
+            vznik=_parse_cz_date("".join(row.cells[2])),
+            doslo=_parse_cz_date("".join(row.cells[3])),
+            zalozeno=_parse_cz_date("".join(row.cells[4])),
+            stran=int(stran_txt) if stran_txt.isdigit() else None,
+            dokument_id=dokument_id,
+            subjekt_id=subjekt_id,
+            spis=_qs(href, "spis"),
+            detail_url=f"{BASE}/{href.lstrip('./')}",
+        ))
     return listiny
 
 
-def parse_download_url(html: str) -> str | None:
+_ROW_DOKUMENT = re.compile(r"vypis-sl-detail\?dokument=(\d+)")
+_ROW_DATE = re.compile(r"\b(\d{1,2})\.\s*(\d{1,2})\.\s*(\d{4})\b")
+
+
+def listing_fingerprint(html: str) -> str:
+    """Otisk seznamu listin bez parsování HTML.
+
+    Počet řádků s listinou, nejnovější datum v nich (založení do sbírky
+    je vždy nejpozdější) a hash všech dokument_id — nová, stažená i
+    nahrazená listina otisk změní, obsah mimo tabulku ne.
+    """
+    ids, newest = [], ""
+    for row in html.split("<tr")[1:]:
+        m = _ROW_DOKUMENT.search(row)
+        if not m:
+            continue
+        ids.append(m.group(1))
+        for d, mo, y in _ROW_DATE.findall(row):
+            newest = max(newest, f"{y}-{int(mo):02d}-{int(d):02d}")
+    digest = hashlib.sha256(",".join(sorted(ids)).encode()).hexdigest()
+    return f"{len(ids)}|{newest}|{digest[:16]}"
+
+
+@dataclass
+class ListingPage:
+    """Výsledek podmíněného načtení seznamu listin."""
+    listiny: list[Listina] | None      # None = beze změny, neparsováno
+    fingerprint: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def unchanged(self) -> bool:
+        return self.listiny is None
+
+
+def parse_download_url(html: str, parser: str | None = None) -> str | None:
     """Najde odkaz na PDF v HTML detailu listiny."""
-    soup = BeautifulSoup(html, "html.parser")
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
+    for href in listiny_html.get(parser).links(html):
         if "content/download" in href or re.search(r"\.pdf(\?|$)", href, re.I):
             if href.startswith("http"):
                 return href
@@ -139,39 +175,166 @@ def parse_download_url(html: str) -> str | None:
     return None
 
 
+# ---------------------------------------------------------------------------
+# Plánovač požadavků
+# ---------------------------------------------------------------------------
+
+# Typy stránek (endpointy) s vlastním limitem.
+ENDPOINTS = {
+    "search": "rejstrik-",            # IČO -> subjektId
+    "firma": "vypis-sl-firma",        # seznam listin
+    "detail": "vypis-sl-detail",      # detail listiny s odkazem na PDF
+    "download": "content/download",   # samotné PDF
+}
+
+
+def endpoint_class(url: str) -> str:
+    for name, marker in ENDPOINTS.items():
+        if marker in url:
+            return name
+    return "download"
+
+
+class TokenBucket:
+    """Token bucket s adaptivní rychlostí doplňování (tokeny za sekundu).
+
+    Tokeny si vlákna rezervují dopředu (stav smí jít do minusu), takže
+    čekání probíhá mimo zámek a pořadí požadavků je férové.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0,
+                 min_rate: float | None = None, now: float = 0.0):
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Vezme token; vrátí, kolik sekund je třeba počkat."""
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def slow_down(self, now: float, pause: float = 0.0):
+        """Po 429/5xx: poloviční rychlost a případně pauza (Retry-After)."""
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, -pause * self.rate)
+
+    def recover(self):
+        """Po úspěchu: pomalý návrat k základní rychlosti (+5 % z ní)."""
+        self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+class FetchScheduler:
+    """Globální limit + limit pro každý typ stránky.
+
+    Globální bucket drží celkovou frekvenci, kterou or.justice.cz vidí;
+    buckety typů stránek se zpomalují nezávisle, takže přetížené stahování
+    PDF nebrzdí seznamy listin (a naopak). 429 zpomalí i globální limit.
+    """
+
+    def __init__(self, rate: float, rates: dict[str, float] | None = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self._lock = threading.Lock()
+        self.total = TokenBucket(rate, now=now)
+        self.buckets = {name: TokenBucket((rates or {}).get(name, rate), now=now)
+                        for name in ENDPOINTS}
+
+    def acquire(self, endpoint: str):
+        with self._lock:
+            now = self.clock()
+            wait = max(self.total.reserve(now),
+                       self.buckets[endpoint].reserve(now))
+        if wait > 0:
+            self.sleep(wait)
+
+    def report(self, endpoint: str, status: int | None,
+               retry_after: float | None = None):
+        """Výsledek požadavku: status None = síťová chyba / timeout.
+
+        Zpomaluje jen síťová chyba, 429 a 5xx; jiné 4xx (404 neznámého
+        subjektu / dokumentu) o zátěži serveru nic neříkají a nemění nic.
+        """
+        with self._lock:
+            bucket = self.buckets[endpoint]
+            if status is not None and status < 400:
+                bucket.recover()
+                self.total.recover()
+                return
+            if status is not None and status != 429 and status < 500:
+                return
+            now = self.clock()
+            bucket.slow_down(now, retry_after or 0.0)
+            if status == 429:
+                self.total.slow_down(now, retry_after or 0.0)
+
+
+def _retry_after(r: requests.Response) -> float | None:
+    value = r.headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else None
+
+
 class ListinyClient:
     def __init__(self, delay: float = 3.0, timeout: int = 60,
-                 max_retries: int = 4):
+                 max_retries: int = 4,
+                 rates: dict[str, float] | None = None):
+        """delay: průměrný odstup požadavků (globálně i pro každý typ
+        stránky); rates: volitelně jiná rychlost (požadavků/s) pro typ."""
         self.delay = delay
         self.timeout = timeout
         self.max_retries = max_retries
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": USER_AGENT,
-            "Accept-Language": "cs,en;q=0.8",
-        })
-        self._last_request = 0.0
+        self.scheduler = FetchScheduler(1.0 / delay if delay > 0 else 1000.0,
+                                        rates)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session pro aktuální vlákno (requests.Session sdílet nelze)."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Language": "cs,en;q=0.8",
+            })
+            self._local.session = session
+        return session
 
     # -- nízká úroveň -------------------------------------------------------
 
     def _get(self, url: str, **kwargs) -> requests.Response:
+        endpoint = endpoint_class(url)
         for attempt in range(self.max_retries):
-            wait = self.delay - (time.time() - self._last_request)
-            if wait > 0:
-                time.sleep(wait)
+            self.scheduler.acquire(endpoint)
             try:
-                self._last_request = time.time()
                 r = self.session.get(url, timeout=self.timeout, **kwargs)
-                if r.status_code in (429, 502, 503, 504):
-                    raise requests.RequestException(f"HTTP {r.status_code}")
-                r.raise_for_status()
-                return r
             except requests.RequestException as exc:
+                self.scheduler.report(endpoint, None)
                 if attempt == self.max_retries - 1:
                     raise
-                backoff = self.delay * (2 ** (attempt + 1))
-                print(f"  ! {exc} — čekám {backoff:.0f} s a zkouším znovu")
-                time.sleep(backoff)
+                print(f"  ! {exc} — zpomaluji {endpoint} a zkouším znovu")
+                continue
+            if r.status_code in (429, 502, 503, 504):
+                self.scheduler.report(endpoint, r.status_code, _retry_after(r))
+                if attempt == self.max_retries - 1:
+                    raise requests.RequestException(f"HTTP {r.status_code}")
+                print(f"  ! HTTP {r.status_code} — zpomaluji {endpoint} "
+                      f"a zkouším znovu")
+                continue
+            self.scheduler.report(endpoint, r.status_code)
+            r.raise_for_status()
+            return r
         raise RuntimeError("unreachable")
 
     # -- kroky --------------------------------------------------------------
@@ -189,8 +352,33 @@ class ListinyClient:
 
     def list_listiny(self, subjekt_id: str) -> list[Listina]:
         """Vrátí seznam listin ze stránky Sbírky listin subjektu."""
-        r = self._get(f"{BASE}/vypis-sl-firma", params={"subjektId": subjekt_id})
-        return parse_listiny_html(r.text, subjekt_id)
+        return self.fetch_listing(subjekt_id).listiny
+
+    def fetch_listing(self, subjekt_id: str,
+                      previous: dict | None = None) -> ListingPage:
+        """Seznam listin se změnovou detekcí.
+
+        previous: uložený stav z minula ({"fingerprint", "etag",
+        "last_modified"}). Vrátí-li server 304 nebo má stránka stejný otisk,
+        listiny se neparsují (ListingPage.unchanged).
+        """
+        previous = previous or {}
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        r = self._get(f"{BASE}/vypis-sl-firma",
+                      params={"subjektId": subjekt_id}, headers=headers)
+        etag = r.headers.get("ETag") or previous.get("etag")
+        modified = r.headers.get("Last-Modified") or previous.get("last_modified")
+        if r.status_code == 304:
+            return ListingPage(None, previous.get("fingerprint"), etag, modified)
+        fingerprint = listing_fingerprint(r.text)
+        if fingerprint == previous.get("fingerprint"):
+            return ListingPage(None, fingerprint, etag, modified)
+        return ListingPage(parse_listiny_html(r.text, subjekt_id), fingerprint,
+                           r.headers.get("ETag"), r.headers.get("Last-Modified"))
 
     def get_download_url(self, listina: Listina) -> str:
         """Z detailu listiny vytáhne odkaz na PDF."""
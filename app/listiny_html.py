@@ -0,0 +1,185 @@
+"""Backendy pro parsování HTML stránek or.justice.cz.
+
+Parsery v app.listiny potřebují z HTML jen dvě věci: odkazy (a[href])
+v pořadí dokumentu a řádky tabulek listin. Každý backend je vrací ve
+stejném tvaru, výsledky z nich skládá app.listiny:
+
+  selectolax  Lexbor (C), nejrychlejší
+  lxml        libxml2 (C)
+  bs4         BeautifulSoup + html.parser (čistý Python), vždy k dispozici
+
+Výběr: RADAR_HTML_PARSER=auto|selectolax|lxml|bs4 (výchozí auto = první
+nainstalovaný v pořadí výše). C backendy instaluje radar/requirements.txt
+(Docker image Radaru), import je ale volitelný; bez nich se použije
+BeautifulSoup.
+
+Text se bere jako u BeautifulSoup get_text(strip=True): textové uzly
+bez komentářů, každý oříznutý, prázdné vynechané. Na dobře utvořeném
+markupu or.justice.cz dávají všechny backendy stejný výstup (testy
+tests/test_listiny_parser.py), rychlost: python scripts/benchmark.py parsers
+"""
+
+import os
+import re
+from functools import cache
+from typing import NamedTuple
+
+BACKENDS = ("selectolax", "lxml", "bs4")
+PARSER = os.getenv("RADAR_HTML_PARSER", "auto")
+
+
+class Row(NamedTuple):
+    """Řádek tabulky listin: odkaz v první buňce a texty prvních 6 buněk."""
+    href: str
+    link_text: list[str]
+    cells: list[list[str]]
+
+
+def _is_listing(heads) -> bool:
+    return any("Číslo listiny" in " ".join(h) for h in heads)
+
+
+def _strings(texts) -> list[str]:
+    return [t for t in (s.strip() for s in texts) if t]
+
+
+class _Bs4:
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = lambda html: BeautifulSoup(html, "html.parser")
+
+    def links(self, html: str) -> list[str]:
+        return [a["href"] for a in self._soup(html).find_all("a", href=True)]
+
+    def listing_rows(self, html: str) -> list[Row]:
+        rows = []
+        for table in self._soup(html).find_all("table"):
+            if not _is_listing(list(th.stripped_strings)
+                               for th in table.find_all("th")):
+                continue
+            for tr in table.find_all("tr"):
+                tds = tr.find_all("td")
+                if len(tds) < 6:
+                    continue
+                a = tds[0].find("a", href=True)
+                if a is None:
+                    continue
+                rows.append(Row(a["href"], list(a.stripped_strings),
+                                [list(td.stripped_strings) for td in tds[:6]]))
+        return rows
+
+
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+class _Lxml:
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        self._parse = lxml.html.fromstring
+
+    def _root(self, html: str):
+        # lxml odmítá str s deklarací kódování (<?xml … encoding=…?>)
+        # i prázdný dokument; BeautifulSoup deklaraci přeskočí a vrátí
+        # prázdný strom.
+        html = _XML_DECLARATION.sub("", html, count=1)
+        return self._parse(html) if html.strip() else None
+
+    def links(self, html: str) -> list[str]:
+        root = self._root(html)
+        if root is None:
+            return []
+        return [a.get("href") for a in root.iter("a")
+                if a.get("href") is not None]
+
+    def listing_rows(self, html: str) -> list[Row]:
+        root = self._root(html)
+        if root is None:
+            return []
+        rows = []
+        for table in root.iter("table"):
+            if not _is_listing(_strings(th.itertext())
+                               for th in table.iter("th")):
+                continue
+            for tr in table.iter("tr"):
+                tds = list(tr.iter("td"))
+                if len(tds) < 6:
+                    continue
+                a = next((a for a in tds[0].iter("a")
+                          if a.get("href") is not None), None)
+                if a is None:
+                    continue
+                rows.append(Row(a.get("href"), _strings(a.itertext()),
+                                [_strings(td.itertext()) for td in tds[:6]]))
+        return rows
+
+
+class _Selectolax:
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parse = LexborHTMLParser
+
+    @staticmethod
+    def _texts(node) -> list[str]:
+        # Oddělovač \x00 se v HTML nevyskytuje (parser ho nahradí).
+        return _strings(node.text(separator="\x00").split("\x00"))
+
+    def links(self, html: str) -> list[str]:
+        return [a.attributes.get("href") or ""
+                for a in self._parse(html).css("a[href]")]
+
+    def listing_rows(self, html: str) -> list[Row]:
+        rows = []
+        for table in self._parse(html).css("table"):
+            if not _is_listing(self._texts(th) for th in table.css("th")):
+                continue
+            for tr in table.css("tr"):
+                tds = tr.css("td")
+                if len(tds) < 6:
+                    continue
+                a = tds[0].css_first("a[href]")
+                if a is None:
+                    continue
+                rows.append(Row(a.attributes.get("href") or "",
+                                self._texts(a),
+                                [self._texts(td) for td in tds[:6]]))
+        return rows
+
+
+_FACTORIES = {"selectolax": _Selectolax, "lxml": _Lxml, "bs4": _Bs4}
+
+
+@cache
+def get(name: str | None = None):
+    """Backend podle jména (None = RADAR_HTML_PARSER).
+
+    ImportError, pokud knihovna backendu není nainstalovaná.
+    """
+    name = name or PARSER
+    if name == "auto":
+        for candidate in BACKENDS:
+            try:
+                return get(candidate)
+            except ImportError:
+                continue
+    if name not in _FACTORIES:
+        raise ValueError(f"Neznámý HTML parser {name!r} (RADAR_HTML_PARSER), "
+                         f"možnosti: auto, {', '.join(BACKENDS)}")
+    return _FACTORIES[name]()
+
+
+def available() -> list[str]:
+    """Nainstalované backendy v pořadí preference."""
+    names = []
+    for name in BACKENDS:
+        try:
+            get(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
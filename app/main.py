@@ -1,4 +1,6 @@
+import base64
 import hashlib
+import json
 import os
 import shutil
 import tempfile
@@ -8,18 +10,22 @@ from datetime import datetime
 from pathlib import Path
 
 from fastapi import (FastAPI, Depends, HTTPException, UploadFile, File, Form,
-                     Header)
+                     Header, Response)
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import select, desc, func
-from sqlalchemy.orm import Session
+from sqlalchemy import select, desc, func, and_, or_, tuple_
+from sqlalchemy.orm import Session, defer, selectinload
 
 from .db import init_db, get_db, SessionLocal
-from .models import Subject, Document, Signal
+from .models import Subject, Document, Signal, LeadSummary, SyncRun
 from .signal_engine import lead_level
-from .pipeline import ingest_text, ingest_pdf, sync_many, SYNC_STATE
+from .pipeline import (ingest_text, ingest_pdf, delete_document, sync_many,
+                       plan_subjects, complete_partial_ocr, PROGRESSIVE_OCR,
+                       SYNC_STATE)
 from .import_justice import import_dataset
+from . import subjekt_ids, sync_runs
 
 app = FastAPI(title="RBD Radar", version="0.3.0")
 
@@ -27,8 +33,9 @@ app = FastAPI(title="RBD Radar", version="0.3.0")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 STATIC_DIR = Path(__file__).parent / "static"
@@ -89,39 +96,117 @@ def _notify_hot(results: list[dict]):
         print(f"Notifikace se nepodařila: {exc}")
 
 
-def _run_sync_job(limit: int, city: str | None, max_docs: int,
-                  since_days: int | None, icos: list[str] | None = None):
-    SYNC_STATE.update(running=True, started_at=datetime.utcnow().isoformat(),
+def _run_sync_job(run_id: int):
+    """Zpracuje běh ze sync_runs — nový i převzatý po restartu procesu."""
+    SYNC_STATE.update(running=True, run_id=run_id, started_at=None,
                       finished_at=None, progress="startuji…",
                       processed_subjects=0, new_documents=0, hot_found=0,
+                      unchanged_subjects=0,
+                      stages={},
                       error=None)
     db = SessionLocal()
     try:
-        results = sync_many(db, limit=limit, city=city, max_docs=max_docs,
-                            since_days=since_days, state=SYNC_STATE, icos=icos)
+        run = db.get(SyncRun, run_id)
+        params = run.params
+        SYNC_STATE["started_at"] = run.started_at.isoformat()
+        with sync_runs.Heartbeat(SessionLocal, run_id, SYNC_STATE):
+            sync_runs.touch(db, run_id, progress=None)
+            results = sync_many(db, max_docs=params["max_docs"],
+                                since_days=params.get("since_days"),
+                                state=SYNC_STATE, run_id=run_id)
+            _notify_hot(results)
+            if params.get("complete_ocr"):
+                SYNC_STATE["progress"] = "dokončuji OCR…"
+                sync_runs.touch(db, run_id, progress=SYNC_STATE["progress"])
+                complete_partial_ocr(
+                    db, limit=int(os.getenv("RADAR_OCR_COMPLETE_LIMIT", "50")),
+                    state=SYNC_STATE)
         SYNC_STATE["progress"] = "hotovo"
-        _notify_hot(results)
+        sync_runs.finish(db, run_id, "done", "hotovo",
+                         stages=SYNC_STATE["stages"])
     except Exception as exc:
+        db.rollback()
         SYNC_STATE["error"] = str(exc)
         SYNC_STATE["progress"] = "chyba"
+        sync_runs.finish(db, run_id, "error", "chyba", error=str(exc),
+                         stages=SYNC_STATE["stages"])
     finally:
         db.close()
         SYNC_STATE["running"] = False
         SYNC_STATE["finished_at"] = datetime.utcnow().isoformat()
 
 
+# Kontrola "neběží už synchronizace" a její start atomicky v rámci procesu.
+_sync_lock = threading.Lock()
+
+
+def _spawn_sync(run_id: int):
+    threading.Thread(target=_run_sync_job, args=(run_id,),
+                     daemon=True).start()
+
+
 def _start_sync(limit: int, city: str | None, max_docs: int,
-                since_days: int | None, icos: list[str] | None = None) -> bool:
-    if SYNC_STATE["running"]:
-        return False
-    threading.Thread(
-        target=_run_sync_job,
-        args=(limit, city, max_docs, since_days, icos),
-        daemon=True,
-    ).start()
+                since_days: int | None, icos: list[str] | None = None,
+                complete_ocr: bool = False, key: str | None = None) -> bool:
+    """Naplánuje běh (zapíše ho do sync_runs) a spustí ho na pozadí.
+
+    False, pokud synchronizace běží v tomto nebo jiném procesu, nebo běh
+    se stejným klíčem (plánovač, více workerů) už založil někdo jiný.
+    """
+    with _sync_lock:
+        if SYNC_STATE["running"]:
+            return False
+        with SessionLocal() as db:
+            if sync_runs.active(db):
+                return False
+            subjects = plan_subjects(db, limit=limit, city=city, icos=icos)
+            run = sync_runs.create(
+                db, [s.id for s in subjects],
+                {"limit": limit, "city": city, "max_docs": max_docs,
+                 "since_days": since_days, "icos_count": len(icos or []),
+                 "complete_ocr": complete_ocr}, key=key)
+            if run is None:
+                return False
+            run_id = run.id
+        SYNC_STATE["running"] = True
+    _spawn_sync(run_id)
     return True
 
 
+def _resume_sync() -> bool:
+    """Převezme běh, jehož proces skončil (deploy, restart instance)."""
+    with _sync_lock:
+        if SYNC_STATE["running"]:
+            return False
+        with SessionLocal() as db:
+            run = sync_runs.claim_stale(db)
+            if run is None:
+                return False
+            run_id = run.id
+        SYNC_STATE["running"] = True
+    print(f"Pokračuji v přerušené synchronizaci (běh {run_id}).")
+    _spawn_sync(run_id)
+    return True
+
+
+def _resume_loop():
+    """Po startu dokončí přerušené běhy.
+
+    Běh, jehož proces při deployi ještě chvíli žije, se převezme až po
+    vypršení jeho heartbeatu (RADAR_SYNC_STALE); smyčka skončí, jakmile
+    žádný nedokončený běh nezbývá.
+    """
+    while True:
+        try:
+            _resume_sync()
+            with SessionLocal() as db:
+                if not sync_runs.unfinished(db):
+                    return
+        except Exception as exc:
+            print(f"Převzetí synchronizace selhalo: {exc}")
+        time.sleep(sync_runs.STALE_SECONDS / 2)
+
+
 def _scheduler():
     """Automatické synchronizace uvnitř webové služby (bez placeného cronu).
 
@@ -129,6 +214,8 @@ def _scheduler():
                           RADAR_SYNC_LIMIT, vých. 15 SVJ; jen čerstvé listiny)
     RADAR_NIGHT_SYNC=1  — noční dlouhý běh (RADAR_NIGHT_HOUR_UTC, vých. 0;
                           RADAR_NIGHT_LIMIT, vých. 150 SVJ; hlubší stahování)
+                          a s RADAR_OCR_PROGRESSIVE=1 i dokončení OCR
+                          (RADAR_OCR_COMPLETE_LIMIT, vých. 50 dokumentů)
     """
     daily = os.getenv("RADAR_DAILY_SYNC") == "1"
     night = os.getenv("RADAR_NIGHT_SYNC") == "1"
@@ -146,12 +233,15 @@ def _scheduler():
             # Dlouhý běh přes rotační frontu: nejdřív nikdy nekontrolované
             # domy, pak nejstarší kontroly. Poběží klidně hodiny; klient
             # drží pauzy, aby nedráždil justice.cz.
+            # Klíč běhu: víc workerů se stejným plánovačem ho spustí jednou.
             _start_sync(limit=night_limit, city=None, max_docs=5,
-                        since_days=since_days)
+                        since_days=since_days, complete_ocr=PROGRESSIVE_OCR,
+                        key=f"night-{now.date()}")
         elif daily and now.hour == daily_hour and last_daily != now.date():
             last_daily = now.date()
             _start_sync(limit=daily_limit, city=None, max_docs=3,
-                        since_days=min(since_days, 90))
+                        since_days=min(since_days, 90),
+                        key=f"daily-{now.date()}")
         time.sleep(300)
 
 
@@ -159,6 +249,7 @@ def _scheduler():
 def startup():
     Path("data").mkdir(exist_ok=True)
     init_db()
+    threading.Thread(target=_resume_loop, daemon=True).start()
     if os.getenv("RADAR_DAILY_SYNC") == "1" or os.getenv("RADAR_NIGHT_SYNC") == "1":
         threading.Thread(target=_scheduler, daemon=True).start()
 
@@ -210,6 +301,74 @@ def _find_subject(db: Session, ico: str) -> Subject:
     return subject
 
 
+# ---------------------------------------------------------------------------
+# Stránkování (keyset) a NDJSON
+#
+# Kurzor je neprůhledný řetězec s klíčem posledního vráceného řádku; další
+# stránka se čte od něj indexem, bez OFFSET. U JSON odpovědí jde kurzor
+# v hlavičce X-Next-Cursor (tělo zůstává pole kvůli stávajícím klientům),
+# poslední stránka hlavičku nemá. NDJSON varianty posílají řádky tak, jak
+# přicházejí z databázového kurzoru, a každý řádek nese svůj "cursor",
+# od kterého lze přerušené čtení navázat.
+# ---------------------------------------------------------------------------
+
+_STREAM_CHUNK = 500
+
+
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v
+                      for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None, types: tuple) -> list | None:
+    """Rozbalí kurzor; types určuje typ každé složky (datetime se parsuje)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(v) if t is datetime and v is not None
+                else t(v) if v is not None else None
+                for v, t in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Neplatný kurzor.")
+
+
+def _page(rows: list, limit: int, key, response: Response | None) -> list:
+    """Ořízne přebytečný řádek (limit + 1) a nastaví X-Next-Cursor."""
+    limit = max(limit, 0)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # limit=0: prázdná stránka, kurzor není od čeho (jako dřív [])
+        if rows and response is not None:
+            response.headers["X-Next-Cursor"] = _encode_cursor(key(rows[-1]))
+    return rows
+
+
+def _ndjson(items):
+    """Obalí generátor slovníků do streamované NDJSON odpovědi."""
+    return StreamingResponse(
+        (json.dumps(jsonable_encoder(item), ensure_ascii=False) + "\n"
+         for item in items),
+        media_type="application/x-ndjson")
+
+
+def _own_session(iter_fn, *args):
+    """Generátor s vlastní session.
+
+    Závislost get_db se v novějších verzích FastAPI uzavírá dřív, než se
+    odešle tělo streamované odpovědi — stream si proto session drží sám.
+    """
+    db = SessionLocal()
+    try:
+        yield from iter_fn(db, *args)
+    finally:
+        db.close()
+
+
 # ---------------------------------------------------------------------------
 # Dashboard
 # ---------------------------------------------------------------------------
@@ -243,16 +402,20 @@ def stats(db: Session = Depends(get_db)):
     }
 
 
-@app.get("/api/subjects")
-def subjects(limit: int = 20, city: str | None = None,
-             search: str | None = None, db: Session = Depends(get_db)):
+def _subjects_query(city: str | None, search: str | None,
+                    after: list | None):
     q = select(Subject)
     if city:
         q = q.where(Subject.city.ilike(f"%{city}%"))
     if search:
         q = q.where(Subject.name.ilike(f"%{search}%"))
-    rows = db.scalars(q.order_by(Subject.name).limit(limit)).all()
-    return [{
+    if after:
+        q = q.where(tuple_(Subject.name, Subject.id) > tuple_(*after))
+    return q.order_by(Subject.name, Subject.id)
+
+
+def _subject_dict(s: Subject) -> dict:
+    return {
         "ico": s.ico,
         "name": s.name,
         "address": s.address,
@@ -265,7 +428,40 @@ def subjects(limit: int = 20, city: str | None = None,
         "last_entry_date": s.last_entry_date,
         "source_dataset": s.source_dataset,
         "listiny_checked_at": s.listiny_checked_at,
-    } for s in rows]
+    }
+
+
+def _subject_key(s: Subject) -> list:
+    return [s.name, s.id]
+
+
+@app.get("/api/subjects")
+def subjects(limit: int = 20, city: str | None = None,
+             search: str | None = None, cursor: str | None = None,
+             response: Response = None, db: Session = Depends(get_db)):
+    """Subjekty podle názvu; další stránka přes X-Next-Cursor."""
+    after = _decode_cursor(cursor, (str, int))
+    rows = db.scalars(_subjects_query(city, search, after)
+                      .limit(limit + 1)).all()
+    return [_subject_dict(s)
+            for s in _page(rows, limit, _subject_key, response)]
+
+
+def _iter_subjects(db: Session, city: str | None, search: str | None,
+                   after: list | None, limit: int | None):
+    q = _subjects_query(city, search, after)
+    if limit is not None:
+        q = q.limit(limit)
+    for s in db.scalars(q.execution_options(yield_per=_STREAM_CHUNK)):
+        yield {**_subject_dict(s), "cursor": _encode_cursor(_subject_key(s))}
+
+
+@app.get("/api/subjects.ndjson")
+def subjects_ndjson(limit: int | None = None, city: str | None = None,
+                    search: str | None = None, cursor: str | None = None):
+    """Všechny (nebo prvních limit) subjekty jako NDJSON stream."""
+    after = _decode_cursor(cursor, (str, int))
+    return _ndjson(_own_session(_iter_subjects, city, search, after, limit))
 
 
 class PrvotkarImportIn(BaseModel):
@@ -295,11 +491,13 @@ def prvotkar_import(payload: PrvotkarImportIn):
 def lead_by_ico(ico: str, db: Session = Depends(get_db)):
     """Lead jednoho SVJ podle IČO — pro integraci s Prvotkářem."""
     subject = _find_subject(db, ico)
+    summary = db.get(LeadSummary, subject.id)
     docs = db.scalars(
         select(Document).where(Document.subject_id == subject.id)
+        .options(selectinload(Document.signals))
         .order_by(desc(Document.score))
     ).all()
-    best = docs[0].score if docs and docs[0].score else 0
+    best = summary.best_score if summary else 0
     return {
         "ico": subject.ico,
         "name": subject.name,
@@ -324,12 +522,28 @@ def lead_by_ico(ico: str, db: Session = Depends(get_db)):
     }
 
 
+@app.get("/api/subjekt-ids/{ico}")
+def subjekt_id_by_ico(ico: str, db: Session = Depends(get_db)):
+    """subjektId or.justice.cz ze sdílené cache — pro Prvotkář.
+
+    Jen čte (žádný požadavek na rejstřík); 404 = IČO zatím nikdo nehledal.
+    found=false je platný negativní záznam: IČO v rejstříku není.
+    """
+    cached = subjekt_ids.lookup_many(db, [ico])
+    key = subjekt_ids.normalize(ico)
+    if key not in cached:
+        raise HTTPException(404, "subjektId není v cache")
+    return {"ico": key, "subjektId": cached[key],
+            "found": cached[key] is not None}
+
+
 @app.post("/api/import/justice", dependencies=[Depends(require_api_key)])
 def justice_import(payload: JusticeImportIn):
     if not payload.dataset.startswith(("svj-", "druzstvo-", "bd-")):
         raise HTTPException(400, "Povoleny jsou pouze SVJ/druzstvo datasety.")
-    import_dataset(payload.dataset, payload.limit)
-    return {"status": "ok", "dataset": payload.dataset, "limit": payload.limit}
+    out = import_dataset(payload.dataset, payload.limit)
+    return {"status": "ok", "dataset": payload.dataset, "limit": payload.limit,
+            **out}
 
 
 @app.post("/api/subjects", dependencies=[Depends(require_api_key)])
@@ -362,6 +576,16 @@ def ingest_document(payload: DocumentIn, db: Session = Depends(get_db)):
     return result
 
 
+@app.delete("/api/documents/{document_id}",
+            dependencies=[Depends(require_api_key)])
+def remove_document(document_id: int, db: Session = Depends(get_db)):
+    doc = db.get(Document, document_id)
+    if not doc:
+        raise HTTPException(404, f"Dokument {document_id} neexistuje.")
+    delete_document(db, doc)
+    return {"status": "ok", "document_id": document_id}
+
+
 @app.post("/api/documents/upload", dependencies=[Depends(require_api_key)])
 async def upload_document(ico: str = Form(...),
                           file: UploadFile = File(...),
@@ -415,8 +639,12 @@ def sync_run(payload: SyncRunIn):
 
 
 @app.get("/api/sync/status")
-def sync_status():
-    return SYNC_STATE
+def sync_status(db: Session = Depends(get_db)):
+    """Stav posledního běhu z databáze — stejný ze všech workerů."""
+    out = sync_runs.status(db)
+    if SYNC_STATE["running"] and SYNC_STATE["run_id"] == out["run_id"]:
+        out["stages"] = SYNC_STATE["stages"]  # čerstvější než heartbeat
+    return out
 
 
 @app.post("/api/subjects/{ico}/sync-listiny", dependencies=[Depends(require_api_key)])
@@ -440,34 +668,85 @@ def sync_listiny(ico: str, payload: SyncIn | None = None,
 # Leady
 # ---------------------------------------------------------------------------
 
-@app.get("/api/leads")
-def leads(min_score: int = 1, limit: int = 100, city: str | None = None,
-          db: Session = Depends(get_db)):
-    """Leady seskupené podle SVJ; skóre subjektu = nejlepší dokument."""
-    q = (select(Document, Subject)
-         .join(Subject, Document.subject_id == Subject.id)
-         .where(Document.score >= min_score)
-         .order_by(desc(Document.score), desc(Document.document_date)))
+def _lead_order(score, document_date, doc_id):
+    """Řazení leadů: skóre, pak novější dokument (NULL na konec), pak id.
+
+    NULLS LAST je explicitní, aby pořadí bylo stejné na SQLite i Postgresu.
+    """
+    return (desc(score), document_date.desc().nulls_last(), desc(doc_id))
+
+
+def _top_leads(min_score: int, limit: int | None, city: str | None,
+               after: list | None = None):
+    """(LeadSummary, Subject) nejlepších SVJ — průchod indexem podle skóre.
+
+    after: klíč (skóre, datum, id dokumentu) posledního leadu předchozí
+    stránky; vrací se jen leady, které jsou v pořadí za ním.
+    """
+    q = (select(LeadSummary, Subject)
+         .join(Subject, LeadSummary.subject_id == Subject.id)
+         .where(LeadSummary.best_score >= min_score))
     if city:
         q = q.where(Subject.city.ilike(f"%{city}%"))
-    rows = db.execute(q).all()
+    if after:
+        score, date, doc_id = after
+        col_date, col_id = (LeadSummary.best_document_date,
+                            LeadSummary.best_document_id)
+        # Datum je řazené sestupně s NULL na konci (viz _lead_order).
+        if date is None:
+            same_score = and_(col_date.is_(None), col_id < doc_id)
+        else:
+            same_score = or_(col_date < date, col_date.is_(None),
+                             and_(col_date == date, col_id < doc_id))
+        q = q.where(or_(LeadSummary.best_score < score,
+                        and_(LeadSummary.best_score == score, same_score)))
+    q = q.order_by(*_lead_order(LeadSummary.best_score,
+                                LeadSummary.best_document_date,
+                                LeadSummary.best_document_id))
+    return q.limit(limit) if limit is not None else q
+
 
-    by_subject: dict[int, dict] = {}
-    for doc, subject in rows:
-        entry = by_subject.setdefault(subject.id, {
+_LEAD_CURSOR = (int, datetime, int)
+
+
+def _lead_key(row) -> list:
+    lead = row[0]
+    return [lead.best_score, lead.best_document_date, lead.best_document_id]
+
+
+def _lead_entries(db: Session, rows, min_score: int) -> dict[int, dict]:
+    """Leady pro řádky (LeadSummary, Subject) i s dokumenty a signály.
+
+    Dokumenty všech subjektů se načtou jedním dotazem, signály hromadně
+    přes selectinload.
+    """
+    by_subject: dict[int, dict] = {
+        subject.id: {
             "ico": subject.ico,
             "name": subject.name,
             "address": subject.address,
             "city": subject.city,
-            "score": 0,
-            "lead_level": "LOW",
+            "score": lead.best_score,
+            "lead_level": lead.lead_level,
             "documents": [],
-        })
-        signals = db.scalars(
-            select(Signal).where(Signal.document_id == doc.id)
-            .order_by(desc(Signal.priority))
-        ).all()
-        entry["documents"].append({
+        }
+        for lead, subject in rows
+    }
+    if not by_subject:
+        return by_subject
+
+    docs = db.scalars(
+        select(Document)
+        .where(Document.subject_id.in_(list(by_subject)),
+               Document.score >= min_score)
+        .options(defer(Document.text), selectinload(Document.signals))
+        .order_by(*_lead_order(Document.score, Document.document_date,
+                               Document.id))
+    ).all()
+    for doc in docs:
+        signals = sorted(doc.signals, key=lambda x: x.priority or 0,
+                         reverse=True)
+        by_subject[doc.subject_id]["documents"].append({
             "document_id": doc.id,
             "external_id": doc.external_id,
             "title": doc.title,
@@ -488,12 +767,41 @@ def leads(min_score: int = 1, limit: int = 100, city: str | None = None,
                 "keyword": s.keyword,
             } for s in signals],
         })
-        if (doc.score or 0) > entry["score"]:
-            entry["score"] = doc.score or 0
-            entry["lead_level"] = lead_level(entry["score"])
+    return by_subject
+
+
+@app.get("/api/leads")
+def leads(min_score: int = 1, limit: int = 100, city: str | None = None,
+          cursor: str | None = None, response: Response = None,
+          db: Session = Depends(get_db)):
+    """Leady seskupené podle SVJ; skóre subjektu = nejlepší dokument.
+
+    Pořadí, skóre a limit jdou z lead_summary; další stránka přes
+    X-Next-Cursor.
+    """
+    after = _decode_cursor(cursor, _LEAD_CURSOR)
+    rows = db.execute(_top_leads(min_score, limit + 1, city, after)).all()
+    rows = _page(rows, limit, _lead_key, response)
+    return list(_lead_entries(db, rows, min_score).values())
+
+
+def _iter_leads(db: Session, min_score: int, city: str | None,
+                after: list | None, limit: int | None):
+    result = db.execute(_top_leads(min_score, limit, city, after)
+                        .execution_options(yield_per=_STREAM_CHUNK))
+    for rows in result.partitions():
+        entries = _lead_entries(db, rows, min_score)
+        for row in rows:
+            yield {**entries[row[1].id],
+                   "cursor": _encode_cursor(_lead_key(row))}
+
 
-    result = sorted(by_subject.values(), key=lambda x: x["score"], reverse=True)
-    return result[:limit]
+@app.get("/api/leads.ndjson")
+def leads_ndjson(min_score: int = 1, limit: int | None = None,
+                 city: str | None = None, cursor: str | None = None):
+    """Všechny (nebo prvních limit) leady jako NDJSON stream."""
+    after = _decode_cursor(cursor, _LEAD_CURSOR)
+    return _ndjson(_own_session(_iter_leads, min_score, city, after, limit))
 
 
 # ---------------------------------------------------------------------------
@@ -505,12 +813,11 @@ def export_leads(min_score: int = 35, city: str | None = None,
                  db: Session = Depends(get_db)):
     """Excel se seznamem leadů pro obchodníky."""
     import io
-    from fastapi.responses import StreamingResponse
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill
     from openpyxl.utils import get_column_letter
 
-    data = leads(min_score=min_score, limit=1000, city=city, db=db)
+    rows = db.execute(_top_leads(min_score, 1000, city)).all()
 
     wb = Workbook()
     ws = wb.active
@@ -523,28 +830,17 @@ def export_leads(min_score: int = 35, city: str | None = None,
         cell.font = Font(bold=True, color="FFFFFF")
         cell.fill = PatternFill("solid", fgColor="1E293B")
 
-    for lead in data:
-        seen, sig_labels, sig_values = set(), [], []
-        last_date, source = None, None
-        for doc in lead["documents"]:
-            d = doc.get("meeting_date") or doc.get("document_date")
-            if d and (last_date is None or d > last_date):
-                last_date, source = d, doc.get("source_url")
-            for s in doc["signals"]:
-                if s["label"] in seen:
-                    continue
-                seen.add(s["label"])
-                sig_labels.append(s["label"])
-                if s.get("value"):
-                    sig_values.append(f"{s['label']}: {s['value']}")
+    for lead, subject in rows:
+        last_date = lead.last_meeting_date
         ws.append([
-            lead["score"], lead["lead_level"], lead["name"], lead["ico"],
-            lead.get("address") or "", lead.get("city") or "",
-            ", ".join(sig_labels), ", ".join(sig_values),
+            lead.best_score, lead.lead_level, subject.name, subject.ico,
+            subject.address or "", subject.city or "",
+            ", ".join(lead.signal_labels or []),
+            ", ".join(lead.signal_values or []),
             last_date.strftime("%d.%m.%Y") if last_date else "",
-            source or "",
+            lead.source_url or "",
         ])
-        fill = level_fill.get(lead["lead_level"])
+        fill = level_fill.get(lead.lead_level)
         if fill:
             ws.cell(row=ws.max_row, column=2).fill = PatternFill(
                 "solid", fgColor=fill)
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import String, Text, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import (String, Text, DateTime, Integer, ForeignKey, Boolean,
+                        JSON, Index)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -23,6 +24,13 @@ class Subject(Base):
     # ID subjektu ve webovém rejstříku or.justice.cz (pro Sbírku listin).
     justice_subjekt_id: Mapped[str | None] = mapped_column(String(50), nullable=True)
     listiny_checked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Otisk a HTTP validátory seznamu listin z poslední úplné kontroly
+    # (viz pipeline._remember_listing); None = příště načíst celý seznam.
+    listing_state: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Adaptivní rotace (viz app.rotation): historie listin a termín další
+    # kontroly.
+    rotation_stats: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    next_check_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     source_url: Mapped[str | None] = mapped_column(String(2000), nullable=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -47,6 +55,10 @@ class Document(Base):
     doc_type: Mapped[str | None] = mapped_column(String(200), nullable=True)
     meeting_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     ocr_used: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Progresivní OCR skončilo dřív — dokončí complete_partial_ocr.
+    ocr_partial: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Statistiky stránek z extrakce (viz pdf_extract.extract_document).
+    page_stats: Mapped[list | None] = mapped_column(JSON, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     subject = relationship("Subject", back_populates="documents")
@@ -69,3 +81,93 @@ class Signal(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     document = relationship("Document", back_populates="signals")
+
+class LeadSummary(Base):
+    """Předpočítaný lead jednoho SVJ (viz app.lead_summary).
+
+    Udržuje se v transakci s každou změnou dokumentů, čtecí endpointy pak
+    místo seskupování dokumentů jen procházejí index podle skóre.
+    """
+    __tablename__ = "lead_summary"
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"),
+                                            primary_key=True)
+    best_score: Mapped[int] = mapped_column(Integer, default=0)
+    lead_level: Mapped[str] = mapped_column(String(20), default="LOW")
+    # Nejlepší dokument — pořadí remíz stejné jako v /api/leads.
+    best_document_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    best_document_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # Poslední zápis (datum shromáždění, jinak datum listiny) a odkaz na něj.
+    last_meeting_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    source_url: Mapped[str | None] = mapped_column(String(2000), nullable=True)
+    # Deduplikované signály přes všechny dokumenty, nejsilnější napřed.
+    signal_labels: Mapped[list] = mapped_column(JSON, default=list)
+    signal_values: Mapped[list] = mapped_column(JSON, default=list)
+    document_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_lead_summary_rank", "best_score", "best_document_date",
+              "best_document_id"),
+    )
+
+
+class SubjektIdCache(Base):
+    """Překlad IČO -> subjektId webového rejstříku (viz app.subjekt_ids).
+
+    Sdílená cache pro synchronizaci listin i Prvotkář; subjekt_id NULL
+    znamená, že IČO v rejstříku nalezeno nebylo (negativní záznam).
+    """
+    __tablename__ = "subjekt_ids"
+    ico: Mapped[str] = mapped_column(String(20), primary_key=True)
+    subjekt_id: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    checked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SyncRun(Base):
+    """Běh hromadné synchronizace (viz app.sync_runs).
+
+    Naplánovaná SVJ a jejich výsledky jsou v sync_run_subjects; běh tak
+    po restartu procesu převezme jiný proces a dokončí, co zbývá.
+    """
+    __tablename__ = "sync_runs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Klíč plánovaného běhu (např. "night-2026-10-17"): druhý worker
+    # se stejným plánovačem tentýž běh nezaloží. Ruční běhy NULL.
+    key: Mapped[str | None] = mapped_column(String(100), unique=True,
+                                            nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default="running",
+                                        index=True)
+    # Parametry sync_many (max_docs, since_days, complete_ocr, …).
+    params: Mapped[dict] = mapped_column(JSON, default=dict)
+    # Fáze mimo pipeline ("dokončuji OCR…", "hotovo"); None = počítá se
+    # z výsledků SVJ.
+    progress: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    stages: Mapped[dict] = mapped_column(JSON, default=dict)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Proces, který běh zpracovává (hostname:pid), a jeho poslední znamení.
+    owner: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    resumed: Mapped[int] = mapped_column(Integer, default=0)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class SyncRunSubject(Base):
+    """Naplánované SVJ běhu synchronizace a výsledek jeho zpracování."""
+    __tablename__ = "sync_run_subjects"
+    run_id: Mapped[int] = mapped_column(ForeignKey("sync_runs.id"),
+                                        primary_key=True)
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"),
+                                            primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+    # pending / done / failed
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    new_documents: Mapped[int] = mapped_column(Integer, default=0)
+    hot_found: Mapped[int] = mapped_column(Integer, default=0)
+    unchanged: Mapped[bool] = mapped_column(Boolean, default=False)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sync_run_subjects_status", "run_id", "status", "position"),
+    )
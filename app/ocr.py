@@ -3,13 +3,43 @@
 Cesty k nástrojům se hledají automaticky (funguje na macOS s Homebrew,
 na Linuxu i v Dockeru). Pracovní adresář je volitelný — bez něj se použije
 dočasná složka, která se po zpracování uklidí.
+
+Stránky se zpracovávají paralelně: každý worker si stránku převede na
+obrázek (pdftoppm -f/-l) a hned ji předá Tesseractu, takže rasterizace
+a OCR různých stránek běží současně. Text se skládá v pořadí stránek.
+
+Nastavení (proměnné prostředí):
+  RADAR_OCR_WORKERS    počet workerů na dokument (výchozí: počet CPU)
+  RADAR_OCR_MAX_PROCS  max. souběžných pdftoppm/tesseract v celém procesu
+                       (výchozí: počet CPU - 1, aby zbylo jádro pro web)
+  RADAR_OCR_TIMEOUT    limit na jeden dokument v sekundách (výchozí 600)
 """
 
+import os
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+_CPUS = os.cpu_count() or 1
+OCR_WORKERS = int(os.getenv("RADAR_OCR_WORKERS", _CPUS))
+OCR_MAX_PROCS = int(os.getenv("RADAR_OCR_MAX_PROCS", max(1, _CPUS - 1)))
+OCR_TIMEOUT = float(os.getenv("RADAR_OCR_TIMEOUT", 600))
+
+# Společný strop pro všechny dokumenty (sync na pozadí i ruční upload).
+_proc_slots = threading.BoundedSemaphore(OCR_MAX_PROCS)
+
+# Paralelizujeme po stránkách; vlastní vlákna Tesseractu (OpenMP) by jen
+# přetěžovala CPU.
+_TESSERACT_ENV = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+
+
+class OcrTimeout(RuntimeError):
+    """OCR dokumentu nestihlo doběhnout v časovém limitu."""
+
 _EXTRA_PATHS = [
     "/opt/homebrew/bin",   # macOS Apple Silicon (Homebrew)
     "/usr/local/bin",      # macOS Intel / Linux
@@ -49,12 +79,31 @@ def pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 300) -> list[Path]:
     return sorted(out.glob("page-*.jpg"))
 
 
-def ocr_image(image_path: str, lang: str = "ces") -> str:
+def rasterize_page(pdf_path: str, page: int, output_dir: str,
+                   dpi: int = 300, timeout: float | None = None) -> Path:
+    """Převede jednu stránku (číslováno od 1) na JPEG."""
+    target = Path(output_dir) / f"page-{page:04d}"
+    subprocess.run(
+        [_find_tool("pdftoppm"), "-jpeg", "-r", str(dpi),
+         "-f", str(page), "-l", str(page), "-singlefile",
+         str(pdf_path), str(target)],
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=timeout,
+    )
+    return target.with_suffix(".jpg")
+
+
+def ocr_image(image_path: str, lang: str = "ces",
+              timeout: float | None = None) -> str:
     image_path = Path(image_path).resolve()
     result = subprocess.run(
         [_find_tool("tesseract"), str(image_path), "stdout", "-l", lang],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        env=_TESSERACT_ENV,
+        timeout=timeout,
     )
     if result.returncode != 0:
         stderr = result.stderr.decode("utf-8", errors="replace")
@@ -65,22 +114,108 @@ def ocr_image(image_path: str, lang: str = "ces") -> str:
 
 
 def ocr_pdf(pdf_path: str, work_dir: str | None = None, lang: str = "ces",
-            dpi: int = 300) -> str:
-    """Zpracuje celé PDF. Bez work_dir použije dočasnou složku."""
+            dpi: int = 300, timeout: float | None = None) -> str:
+    """Zpracuje celé PDF. Bez work_dir použije dočasnou složku.
+
+    Po vypršení timeout (výchozí OCR_TIMEOUT) vyhodí OcrTimeout.
+    """
+    if not Path(pdf_path).exists():
+        raise FileNotFoundError(pdf_path)
+    pages = range(1, page_count(pdf_path) + 1)
+    texts = ocr_pages(pdf_path, pages, work_dir, lang, dpi, timeout)
+    return "\n\n".join(texts[p] for p in sorted(texts) if texts[p].strip())
+
+
+def ocr_pages(pdf_path: str, pages, work_dir: str | None = None,
+              lang: str = "ces", dpi: int = 300,
+              timeout: float | None = None) -> dict[int, str]:
+    """OCR vybraných stránek (číslováno od 1) -> {stránka: text}.
+
+    Stránky, které skončily chybou, ve výsledku chybí.
+    """
+    timeout = OCR_TIMEOUT if timeout is None else timeout
     if work_dir is None:
         with tempfile.TemporaryDirectory(prefix="rbd_ocr_") as tmp:
-            return _ocr_pdf_in(pdf_path, tmp, lang, dpi)
-    return _ocr_pdf_in(pdf_path, work_dir, lang, dpi)
-
-
-def _ocr_pdf_in(pdf_path: str, work_dir: str, lang: str, dpi: int) -> str:
-    images = pdf_to_images(pdf_path, work_dir, dpi)
-    texts = []
-    for image in images:
-        try:
-            text = ocr_image(image, lang)
-            if text.strip():
-                texts.append(text)
-        except RuntimeError as exc:
-            print(f"OCR chyba: {image}: {exc}")
-    return "\n\n".join(texts)
+            return _ocr_pages_in(pdf_path, list(pages), tmp, lang, dpi,
+                                 timeout)
+    return _ocr_pages_in(pdf_path, list(pages), work_dir, lang, dpi, timeout)
+
+
+def page_count(pdf_path: str) -> int:
+    """Počet stránek — pypdf, u PDF, které nepřečte, pdfinfo z Poppleru."""
+    from pypdf import PdfReader
+    try:
+        return len(PdfReader(pdf_path).pages)
+    except Exception:
+        result = subprocess.run([_find_tool("pdfinfo"), str(pdf_path)],
+                                check=True, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+            if line.startswith("Pages:"):
+                return int(line.split()[1])
+        raise RuntimeError(f"pdfinfo nevrátil počet stránek: {pdf_path}")
+
+
+def _ocr_page(pdf_path: str, page: int, work_dir: str, lang: str, dpi: int,
+              deadline: float) -> str:
+    """Rasterizace + OCR jedné stránky; každý podproces si bere slot."""
+    def remaining() -> float:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise OcrTimeout(f"OCR nestihlo stránku {page}")
+        return left
+
+    if not _proc_slots.acquire(timeout=remaining()):
+        raise OcrTimeout(f"OCR nestihlo stránku {page}")
+    try:
+        image = rasterize_page(pdf_path, page, work_dir, dpi,
+                               timeout=remaining())
+    finally:
+        _proc_slots.release()
+
+    if not _proc_slots.acquire(timeout=remaining()):
+        raise OcrTimeout(f"OCR nestihlo stránku {page}")
+    try:
+        return ocr_image(image, lang, timeout=remaining())
+    finally:
+        _proc_slots.release()
+        image.unlink(missing_ok=True)
+
+
+def _ocr_pages_in(pdf_path: str, pages: list[int], work_dir: str, lang: str,
+                  dpi: int, timeout: float) -> dict[int, str]:
+    if not Path(pdf_path).exists():
+        raise FileNotFoundError(pdf_path)
+    if not pages:
+        return {}
+    Path(work_dir).mkdir(parents=True, exist_ok=True)
+    # Chybějící nástroj shodí celý dokument hned (výjimka z _find_tool),
+    # ne každou stránku zvlášť.
+    _find_tool("pdftoppm")
+    _find_tool("tesseract")
+    deadline = time.monotonic() + timeout
+    texts: dict[int, str] = {}
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(OCR_WORKERS, len(pages))),
+                              thread_name_prefix="ocr")
+    try:
+        futures = {
+            pool.submit(_ocr_page, pdf_path, page, work_dir, lang, dpi,
+                        deadline): page
+            for page in pages
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                texts[page] = future.result()
+            except (OcrTimeout, subprocess.TimeoutExpired) as exc:
+                raise OcrTimeout(
+                    f"OCR {Path(pdf_path).name} přesáhlo {timeout:.0f} s "
+                    f"({len(texts)}/{len(pages)} stránek)") from exc
+            except (RuntimeError, subprocess.SubprocessError) as exc:
+                print(f"OCR chyba: {pdf_path} str. {page}: {exc}")
+    finally:
+        # Při timeoutu se čekající stránky zruší, běžící dojedou k limitu.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return texts
@@ -1,24 +1,161 @@
-"""Extrakce textu z PDF: nejdřív textová vrstva, u skenů OCR."""
+"""Extrakce textu z PDF: textová vrstva po stránkách, OCR jen u skenů.
+
+Každá stránka se klasifikuje zvlášť podle délky textu z pypdf, plochy
+stránky pokryté obrázky a přítomnosti fontů. Do OCR jdou jen stránky bez
+použitelné textové vrstvy, výsledek se skládá v pořadí stránek. Smíšené
+PDF (psaná titulní strana + naskenované přílohy) tak projde OCR jen
+u skenů a jedna naskenovaná příloha nespustí OCR celého dokumentu.
+
+Progresivní režim (page_budget / enough) OCRuje skenované stránky po
+dávkách od začátku a skončí po vyčerpání rozpočtu stránek nebo jakmile
+predikát enough(text) řekne, že další stránky výsledek nezmění. Zbylé
+stránky mají source "skipped" a výsledek příznak partial.
+
+Stránka, kterou OCR nevrátilo (chyba pdftoppm/tesseract), má source
+"failed"; výsledek je také partial a do cache se neukládá.
+"""
+
+import time
 
 from pypdf import PdfReader
 
+# Mění-li se pravidla klasifikace, mění se i klíč v text_cache.
+EXTRACTION_SCHEME = "page-hybrid-1"
+
+# Stránka s aspoň tolika znaky textové vrstvy se bere jako textová.
+PAGE_MIN_CHARS = 40
+# Kratší text + obrázky přes aspoň takový podíl plochy = sken -> OCR.
+SCAN_MIN_COVERAGE = 0.3
+
+
+def _page_text_and_coverage(page) -> tuple[str, float]:
+    """Text stránky a podíl plochy pokryté vykreslenými obrázky (0–1).
+
+    Plocha obrázku se bere z transformační matice platné při operátoru
+    Do / vloženém obrázku — jednotkový čtverec obrázku se jí zobrazí na
+    stránku. Text i pokrytí dá jeden průchod obsahem stránky.
+    """
+    drawn = [0.0]
+
+    def before(operator, operands, cm, tm):
+        if operator in (b"Do", b"INLINE IMAGE"):
+            drawn[0] += abs(cm[0] * cm[3] - cm[1] * cm[2])
+
+    text = page.extract_text(visitor_operand_before=before) or ""
+    area = float(page.mediabox.width) * float(page.mediabox.height)
+    return text, min(1.0, drawn[0] / area) if area else 0.0
+
+
+def classify_page(chars: int, coverage: float) -> str:
+    """'text', 'ocr' nebo 'empty' podle textové vrstvy a pokrytí obrázky."""
+    if chars >= PAGE_MIN_CHARS:
+        return "text"
+    if coverage >= SCAN_MIN_COVERAGE:
+        return "ocr"
+    return "text" if chars else "empty"
+
 
 def extract_pdf_text(path: str) -> str:
     reader = PdfReader(path)
     return "\n".join((p.extract_text() or "") for p in reader.pages).strip()
 
 
-def looks_like_scan(text: str, min_chars: int = 100) -> bool:
-    return len(text.strip()) < min_chars
+def extract_document(path: str, use_cache: bool = True,
+                     page_budget: int | None = None, enough=None) -> dict:
+    """Text PDF se statistikami stránek.
+
+    Vrací {"text", "used_ocr", "partial", "pages"}; pages je seznam
+    slovníků {"page", "chars", "images", "fonts", "source"} (+ "ocr_chars"
+    u OCR). Úplný výsledek se ukládá do obsahově adresované cache
+    (app.text_cache), stejné PDF se podruhé neextrahuje; částečný ne.
+    """
+    from . import text_cache
 
+    key = None
+    if use_cache and text_cache.ENABLED:
+        key = text_cache.cache_key(path)
+        hit = text_cache.get(key)
+        if hit is not None:
+            return hit
 
-def extract_text_smart(path: str) -> tuple[str, bool]:
-    """Vrátí (text, used_ocr). Skenované PDF automaticky projde OCR."""
     try:
-        text = extract_pdf_text(path)
+        pages = PdfReader(path).pages
+        texts, stats = [], []
+        for n, page in enumerate(pages, 1):
+            text, coverage = _page_text_and_coverage(page)
+            chars = len(text.strip())
+            texts.append(text)
+            stats.append({
+                "page": n, "chars": chars, "images": round(coverage, 2),
+                "fonts": "/Font" in (page.get("/Resources") or {}),
+                "source": classify_page(chars, coverage),
+            })
     except Exception:
-        text = ""
-    if looks_like_scan(text):
-        from .ocr import ocr_pdf
-        return ocr_pdf(path), True
-    return text, False
+        # Nečitelné PDF pro pypdf — celé projde OCR jako dřív.
+        from .ocr import page_count
+        n_pages = page_count(path)
+        texts = [""] * n_pages
+        stats = [{"page": n, "chars": 0, "images": None, "fonts": None,
+                  "source": "ocr"} for n in range(1, n_pages + 1)]
+
+    to_ocr = [s["page"] for s in stats if s["source"] == "ocr"]
+    if page_budget is None and enough is None:
+        done = _ocr_into(path, to_ocr, texts, stats)
+    else:
+        done = _ocr_progressive(path, to_ocr, texts, stats, page_budget,
+                                enough)
+    for page in to_ocr:
+        if stats[page - 1]["source"] == "ocr" and page not in done:
+            stats[page - 1]["source"] = "skipped"
+
+    partial = len(done) < len(to_ocr)
+    result = {"text": "\n".join(texts).strip(), "used_ocr": bool(done),
+              "partial": partial, "pages": stats}
+    if key is not None and not partial:
+        text_cache.put(key, result)
+    return result
+
+
+def _ocr_into(path: str, pages: list[int], texts: list[str], stats: list[dict],
+              timeout: float | None = None) -> list[int]:
+    """OCR stránek přímo do texts/stats; vrátí stránky, které OCR opravdu
+    vrátilo (ostatní označí source "failed")."""
+    if not pages:
+        return []
+    from .ocr import ocr_pages
+    results = ocr_pages(path, pages, timeout=timeout)
+    for page in pages:
+        if page in results:
+            texts[page - 1] = results[page]
+            stats[page - 1]["ocr_chars"] = len(results[page].strip())
+        else:
+            stats[page - 1]["source"] = "failed"
+    return [page for page in pages if page in results]
+
+
+def _ocr_progressive(path: str, pages: list[int], texts: list[str],
+                     stats: list[dict], page_budget: int | None,
+                     enough) -> list[int]:
+    """OCR po dávkách (jedna dávka = počet workerů) s předčasným koncem."""
+    from . import ocr
+    budget = len(pages) if page_budget is None else page_budget
+    batch = max(1, ocr.OCR_WORKERS)
+    deadline = time.monotonic() + ocr.OCR_TIMEOUT
+    done: list[int] = []
+    tried = 0
+    while tried < min(budget, len(pages)):
+        chunk = pages[tried:min(budget, tried + batch)]
+        tried += len(chunk)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ocr.OcrTimeout(f"OCR {path} přesáhlo {ocr.OCR_TIMEOUT:.0f} s")
+        done += _ocr_into(path, chunk, texts, stats, timeout=remaining)
+        if enough is not None and enough("\n".join(texts).strip()):
+            break
+    return done
+
+
+def extract_text_smart(path: str, use_cache: bool = True) -> tuple[str, bool]:
+    """Vrátí (text, used_ocr). Skenované stránky automaticky projdou OCR."""
+    result = extract_document(path, use_cache)
+    return result["text"], result["used_ocr"]
@@ -10,11 +10,20 @@ Použití z příkazové řádky:
 
   # projít více SVJ z databáze (nejdřív ta s nejnovějším zápisem)
   python -m app.pipeline --sync-all --limit 20
+
+  # dokončit OCR dokumentů zpracovaných progresivně jen zčásti
+  python -m app.pipeline --complete-ocr --limit 20
 """
 
 import argparse
 import hashlib
+import os
 import re
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import (BrokenExecutor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
 from datetime import datetime
 from pathlib import Path
 
@@ -22,23 +31,43 @@ from sqlalchemy import select, desc
 from sqlalchemy.orm import Session
 
 from .db import init_db, SessionLocal
-from .models import Subject, Document, Signal
-from .pdf_extract import extract_text_smart
-from .document_analyzer import analyze_document
-from .signal_engine import detect_signals, score_signals, lead_level
+from .models import Subject, Document, Signal, LeadSummary, SyncRun
+from .pdf_extract import extract_document
+from .document_analyzer import analyze_full
+from .signal_engine import SIGNAL_RULES, lead_level
+from . import lead_summary, ocr, rotation, subjekt_ids, sync_runs
 
 LISTINY_DIR = Path("data/listiny")
 
-# Stav běžící synchronizace (čte ho /api/sync/status a dashboard).
+# Progresivní OCR při synchronizaci: skenované stránky se OCRují od
+# začátku po dávkách a skončí se, jakmile další stránky nemohou změnit
+# úroveň leadu, nebo po RADAR_OCR_PAGE_BUDGET stránkách. Zbytek dokončí
+# complete_partial_ocr (noční běh, --complete-ocr).
+PROGRESSIVE_OCR = os.getenv("RADAR_OCR_PROGRESSIVE") == "1"
+OCR_PAGE_BUDGET = int(os.getenv("RADAR_OCR_PAGE_BUDGET", "6"))
+
+# sync_many je proudová pipeline (viz sync_many): síťové fáze ve vláknech
+# přes jeden šetrný klient, extrakce/OCR v RADAR_SYNC_PROCS procesech
+# (0 = ve vlákně tohoto procesu; nejvýš RADAR_OCR_MAX_PROCS, mezi které
+# se limit OCR dělí), fáze propojené frontami délky RADAR_SYNC_QUEUE.
+# Výchozí 2 procesy: pipeline běží ve webovém procesu i na malé instanci.
+SYNC_PROCS = int(os.getenv("RADAR_SYNC_PROCS", min(2, ocr.OCR_MAX_PROCS)))
+SYNC_QUEUE = int(os.getenv("RADAR_SYNC_QUEUE", "8"))
+
+# Stav synchronizace běžící v tomto procesu. Trvalý stav běhu (i pro
+# ostatní workery a po restartu) je v app.sync_runs.
 SYNC_STATE = {
     "running": False,
+    "run_id": None,
     "started_at": None,
     "finished_at": None,
     "progress": "",
     "processed_subjects": 0,
     "new_documents": 0,
     "hot_found": 0,
+    "unchanged_subjects": 0,
     "error": None,
+    "stages": {},
 }
 
 
@@ -79,7 +108,9 @@ def ingest_text(db: Session, subject: Subject, *, text: str, external_id: str,
                 title: str, source_url: str | None = None,
                 document_date: datetime | None = None,
                 file_path: str | None = None,
-                ocr_used: bool = False) -> dict:
+                ocr_used: bool = False,
+                page_stats: list[dict] | None = None,
+                ocr_partial: bool = False) -> dict:
     """Uloží dokument + signály. Duplicitní text (podle hashe) přeskočí."""
     text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
     existing = db.scalar(select(Document).where(Document.text_hash == text_hash))
@@ -88,9 +119,9 @@ def ingest_text(db: Session, subject: Subject, *, text: str, external_id: str,
                 "score": existing.score or 0,
                 "lead_level": lead_level(existing.score or 0), "signals": []}
 
-    meta = analyze_document(text)
-    signals = detect_signals(text)
-    score = score_signals(signals)
+    analysis = analyze_full(text)
+    meta, signals, score = (analysis["meta"], analysis["signals"],
+                            analysis["score"])
 
     divisor = doc_score_divisor(title, meta["document_type"])
     if divisor > 1:
@@ -110,6 +141,8 @@ def ingest_text(db: Session, subject: Subject, *, text: str, external_id: str,
         doc_type=meta["document_type"],
         meeting_date=meta["meeting_date"],
         ocr_used=ocr_used,
+        page_stats=page_stats,
+        ocr_partial=ocr_partial,
     )
     db.add(doc)
     db.flush()
@@ -126,6 +159,7 @@ def ingest_text(db: Session, subject: Subject, *, text: str, external_id: str,
             priority=s["priority"],
             value=s["value"],
         ))
+    lead_summary.refresh_subject(db, subject.id)
     db.commit()
 
     return {
@@ -137,28 +171,73 @@ def ingest_text(db: Session, subject: Subject, *, text: str, external_id: str,
         "meeting_date": meta["meeting_date_text"],
         "board_members": meta["board_members"],
         "ocr_used": ocr_used,
+        "ocr_partial": ocr_partial,
+        "ocr_pages": sum(1 for p in page_stats or [] if p["source"] == "ocr"),
+        "pages": len(page_stats or []),
         "signals": signals,
     }
 
 
+def signals_decided(title: str | None):
+    """Predikát pro progresivní OCR: rozhodl už text dosud úroveň leadu?
+
+    Signály s přibývajícím textem jen přibývají, skóre tedy neklesá.
+    Jakmile dosažená úroveň odpovídá nejvyšší možné (po slevě za typ
+    dokumentu — stanovy ÷3 nikdy nepřekročí LOW) nebo už vystřelila
+    všechna pravidla, další stránky výsledek nezmění.
+    """
+    rule_types = {r["type"] for r in SIGNAL_RULES}
+
+    def decided(text: str) -> bool:
+        analysis = analyze_full(text)
+        if rule_types <= {s["type"] for s in analysis["signals"]}:
+            return True
+        divisor = doc_score_divisor(title, analysis["meta"]["document_type"])
+        return (lead_level(analysis["score"] // divisor)
+                == lead_level(100 // divisor))
+    return decided
+
+
+def extract_pdf(pdf_path: str | Path, title: str | None = None,
+                progressive: bool = False) -> dict:
+    """Extrakce textu pro ingest_pdf; bez databáze, spouští se i v procesu
+    sync_many (argumenty i výsledek jdou přes pickle)."""
+    if progressive:
+        return extract_document(str(pdf_path), page_budget=OCR_PAGE_BUDGET,
+                                enough=signals_decided(title))
+    return extract_document(str(pdf_path))
+
+
 def ingest_pdf(db: Session, subject: Subject, pdf_path: str | Path, *,
                external_id: str | None = None, title: str | None = None,
                source_url: str | None = None,
-               document_date: datetime | None = None) -> dict:
-    """Extrahuje text z PDF (s OCR fallbackem) a uloží ho k subjektu."""
+               document_date: datetime | None = None,
+               progressive: bool = False,
+               extraction: dict | None = None) -> dict:
+    """Extrahuje text z PDF (OCR jen u naskenovaných stránek) a uloží ho.
+
+    progressive: OCR jen dokud se nerozhodne úroveň leadu (viz
+    signals_decided), nejvýš OCR_PAGE_BUDGET stránek.
+    extraction: výsledek extract_pdf spočítaný jinde (sync_many).
+    """
     pdf_path = Path(pdf_path)
-    text, ocr_used = extract_text_smart(str(pdf_path))
+    title = title or pdf_path.name
+    if extraction is None:
+        extraction = extract_pdf(pdf_path, title, progressive)
+    text = extraction["text"]
     if not text.strip():
         return {"error": f"Z PDF {pdf_path.name} se nepodařilo získat text."}
     return ingest_text(
         db, subject,
         text=text,
         external_id=external_id or pdf_path.stem,
-        title=title or pdf_path.name,
+        title=title,
         source_url=source_url,
         document_date=document_date,
         file_path=str(pdf_path),
-        ocr_used=ocr_used,
+        ocr_used=extraction["used_ocr"],
+        page_stats=extraction["pages"],
+        ocr_partial=extraction.get("partial", False),
     )
 
 
@@ -166,50 +245,147 @@ def ingest_pdf(db: Session, subject: Subject, pdf_path: str | Path, *,
 # Synchronizace se Sbírkou listin
 # ---------------------------------------------------------------------------
 
-def sync_subject(db: Session, subject: Subject, client=None,
-                 max_docs: int = 5, only_interesting: bool = True,
-                 since: datetime | None = None) -> dict:
-    """Stáhne a zpracuje nové listiny jednoho SVJ."""
-    from .listiny import ListinyClient
+def _known_ids(db: Session, subject: Subject) -> set[str]:
+    return set(db.scalars(
+        select(Document.external_id).where(Document.subject_id == subject.id)))
 
-    client = client or ListinyClient()
-    result = {"ico": subject.ico, "name": subject.name,
-              "downloaded": 0, "skipped": 0, "documents": []}
 
-    if not subject.justice_subjekt_id:
-        subject.justice_subjekt_id = client.find_subjekt_id(subject.ico)
-        db.commit()
+def fetch_listiny(client, ico: str, subjekt_id: str | None,
+                  known_ids: set[str], *, max_docs: int = 5,
+                  only_interesting: bool = True,
+                  since: datetime | None = None,
+                  previous: dict | None = None) -> dict:
+    """Síťová část synchronizace jednoho SVJ: najde subjekt, načte seznam
+    listin a stáhne nové PDF. Nesahá do databáze, takže smí běžet ve vlákně.
+
+    previous: uložený stav seznamu (_listing_previous); nezměněný seznam
+    se neparsuje ani neporovnává s databází.
+
+    Vrací {"subjekt_id", "listing", "total", "candidates", "downloaded",
+    "items"}; items jsou trojice (listina, cesta k PDF nebo None, chyba
+    nebo None), listing je ListingPage.
+    """
+    subjekt_id = subjekt_id or client.find_subjekt_id(ico)
+    page = client.fetch_listing(subjekt_id, previous)
+    fetched = {"subjekt_id": subjekt_id, "listing": page, "total": 0,
+               "candidates": 0, "downloaded": 0, "items": []}
+    if page.unchanged:
+        return fetched
+    candidates = _candidates(page.listiny, known_ids, only_interesting, since)
+    fetched.update(total=len(page.listiny), candidates=len(candidates))
+    for listina in candidates[:max_docs]:
+        try:
+            target, downloaded = _download(client, ico, listina)
+            fetched["downloaded"] += downloaded
+            fetched["items"].append((listina, target, None))
+        except Exception as exc:
+            print(f"  ! {listina.cislo}: {exc}")
+            fetched["items"].append((listina, None, str(exc)))
+    return fetched
 
-    listiny = client.list_listiny(subject.justice_subjekt_id)
-    known_ids = {
-        d.external_id
-        for d in db.scalars(
-            select(Document).where(Document.subject_id == subject.id)
-        )
-    }
 
+def _candidates(listiny: list, known_ids: set[str], only_interesting: bool,
+                since: datetime | None) -> list:
+    """Nové (a zajímavé) listiny, nejnovější napřed."""
     candidates = [
         l for l in listiny
         if (not only_interesting or l.is_interesting)
         and l.external_id not in known_ids
         and (since is None or ((l.zalozeno or l.vznik or datetime.min) >= since))
     ]
-    # Nejnovější napřed.
     candidates.sort(key=lambda l: l.vznik or datetime.min, reverse=True)
+    return candidates
 
-    for listina in candidates[:max_docs]:
-        target = LISTINY_DIR / subject.ico / f"{listina.dokument_id}.pdf"
+
+def _listing_previous(subject: Subject, since: datetime | None,
+                      only_interesting: bool) -> dict | None:
+    """Uložený stav seznamu listin, pokud pokrývá parametry tohoto běhu.
+
+    Otisk z běhu s užším oknem since (nebo jen se zajímavými listinami)
+    nic neříká o listinách mimo něj — pak se seznam načte celý.
+    """
+    state = subject.listing_state
+    if not state:
+        return None
+    if state.get("since") and (since is None
+                               or since.isoformat() < state["since"]):
+        return None
+    if state.get("only_interesting") and not only_interesting:
+        return None
+    return state
+
+
+def _remember_listing(subject: Subject, page, since: datetime | None,
+                      only_interesting: bool, complete: bool) -> None:
+    """Uloží otisk seznamu, pokud byly zpracované všechny nové listiny.
+
+    complete=False (limit max_docs, chyba stažení či zpracování) stav
+    smaže, aby příští běh seznam načetl a zbytek dodělal.
+    """
+    if page is None or page.unchanged:
+        return
+    subject.listing_state = {
+        "fingerprint": page.fingerprint,
+        "etag": page.etag,
+        "last_modified": page.last_modified,
+        "since": since.isoformat() if since else None,
+        "only_interesting": only_interesting,
+    } if complete else None
+
+
+def _download(client, ico: str, listina) -> tuple[Path, bool]:
+    """Stáhne PDF listiny, pokud ještě není na disku -> (cesta, staženo)."""
+    target = LISTINY_DIR / ico / f"{listina.dokument_id}.pdf"
+    if target.exists():
+        return target, False
+    print(f"  ↓ {listina.cislo} — {listina.typ}")
+    client.download_pdf(listina, target)
+    return target, True
+
+
+def sync_subject(db: Session, subject: Subject, client=None,
+                 max_docs: int = 5, only_interesting: bool = True,
+                 since: datetime | None = None,
+                 fetched: dict | None = None) -> dict:
+    """Stáhne a zpracuje nové listiny jednoho SVJ.
+
+    fetched: výsledek fetch_listiny stažený předem (sync_many); jinak se
+    stahuje tady.
+    """
+    from .listiny import ListinyClient
+
+    if fetched is None:
+        client = client or ListinyClient()
+        if not subject.justice_subjekt_id:
+            subject.justice_subjekt_id = subjekt_ids.resolve(db, client,
+                                                             subject.ico)
+            db.commit()
+        fetched = fetch_listiny(
+            client, subject.ico, subject.justice_subjekt_id,
+            _known_ids(db, subject), max_docs=max_docs,
+            only_interesting=only_interesting, since=since,
+            previous=_listing_previous(subject, since, only_interesting))
+    result = {"ico": subject.ico, "name": subject.name,
+              "downloaded": fetched["downloaded"], "skipped": 0,
+              "unchanged": fetched["listing"].unchanged, "documents": []}
+
+    if subject.justice_subjekt_id != fetched["subjekt_id"]:
+        subject.justice_subjekt_id = fetched["subjekt_id"]
+        db.commit()
+
+    for listina, target, error in fetched["items"]:
+        if error:
+            result["documents"].append({"listina": listina.cislo,
+                                        "error": error})
+            continue
         try:
-            if not target.exists():
-                print(f"  ↓ {listina.cislo} — {listina.typ}")
-                client.download_pdf(listina, target)
-                result["downloaded"] += 1
             outcome = ingest_pdf(
                 db, subject, target,
                 external_id=listina.external_id,
                 title=listina.typ,
                 source_url=listina.detail_url,
                 document_date=listina.vznik,
+                progressive=PROGRESSIVE_OCR,
             )
             outcome["listina"] = listina.cislo
             result["documents"].append(outcome)
@@ -219,111 +395,591 @@ def sync_subject(db: Session, subject: Subject, client=None,
                 {"listina": listina.cislo, "error": str(exc)}
             )
 
-    result["skipped"] = len(listiny) - len(candidates)
+    result["skipped"] = fetched["total"] - fetched["candidates"]
+    rotation.record_check(
+        subject, fetched["listing"].listiny,
+        sum(1 for d in result["documents"]
+            if not d.get("duplicate") and not d.get("error")),
+        db.get(LeadSummary, subject.id))
+    _remember_listing(
+        subject, fetched["listing"], since, only_interesting,
+        complete=(fetched["candidates"] <= max_docs
+                  and not any(d.get("error") for d in result["documents"])))
     subject.listiny_checked_at = datetime.utcnow()
     db.commit()
     return result
 
 
+def plan_subjects(db: Session, limit: int = 10, city: str | None = None,
+                  icos: list[str] | None = None) -> list[Subject]:
+    """SVJ pro hromadnou synchronizaci v pořadí adaptivní rotace.
+
+    Rotační fronta: nejdřív domy, které ještě nikdy nebyly zkontrolované,
+    pak podle termínu další kontroly — aktivní SVJ se vracejí dřív než
+    spící, opakované běhy přesto časem pokryjí celou databázi.
+    """
+    order = rotation.rotation_order()
+    if icos:
+        normalized = {i.lstrip("0") for i in icos if i}
+        q = (select(Subject).where(Subject.ico.in_(normalized))
+             .order_by(*order).limit(max(limit, len(normalized))))
+    elif city:
+        q = (select(Subject).where(Subject.city.ilike(f"%{city}%"))
+             .order_by(*order).limit(limit))
+    else:
+        q = select(Subject).order_by(*order).limit(limit)
+    return db.scalars(q).all()
+
+
 def sync_many(db: Session, limit: int = 10, city: str | None = None,
               max_docs: int = 3, since_days: int | None = None,
               state: dict | None = None,
-              icos: list[str] | None = None) -> list[dict]:
-    """Projde více SVJ — přednostně ta s nejnovějším zápisem v rejstříku.
+              icos: list[str] | None = None,
+              procs: int | None = None,
+              run_id: int | None = None) -> list[dict]:
+    """Projde více SVJ — v pořadí adaptivní rotace (app.rotation).
 
     since_days: stahovat jen listiny založené/vzniklé za posledních N dní.
     icos: explicitní seznam IČO (např. celý okres z Prvotkáře).
     state: volitelný slovník, do kterého se průběžně hlásí postup.
+    procs: počet procesů pro extrakci/OCR (výchozí RADAR_SYNC_PROCS,
+        0 = vlákno v tomto procesu).
+    run_id: běh ze sync_runs — místo výběru podle limit/city/icos se
+        projdou jeho dosud nehotová SVJ a výsledek každého se do běhu
+        zapíše (pokračování po restartu procesu, viz app.sync_runs).
     """
+    from datetime import timedelta
     from .listiny import ListinyClient
 
-    # Rotační fronta: nejdřív domy, které ještě nikdy nebyly zkontrolované,
-    # pak ty s nejstarší kontrolou. Opakované běhy tak postupně pokryjí
-    # celou databázi, místo aby dokola procházely stejné subjekty.
-    rotation = (Subject.listiny_checked_at.asc().nullsfirst(),
-                desc(Subject.last_entry_date))
-    if icos:
-        normalized = {i.lstrip("0") for i in icos if i}
-        q = (select(Subject).where(Subject.ico.in_(normalized))
-             .order_by(*rotation).limit(max(limit, len(normalized))))
-    elif city:
-        q = (select(Subject).where(Subject.city.ilike(f"%{city}%"))
-             .order_by(*rotation).limit(limit))
+    now, done_before = datetime.utcnow(), 0
+    if run_id is not None:
+        run = db.get(SyncRun, run_id)
+        # since se počítá od začátku běhu, i když pokračuje po restartu.
+        now = run.started_at
+        done_before = sync_runs.counts(db, run_id)["processed_subjects"]
+        subjects = sync_runs.pending_subjects(db, run_id)
     else:
-        q = select(Subject).order_by(*rotation).limit(limit)
-
-    since = None
-    if since_days:
-        from datetime import timedelta
-        since = datetime.utcnow() - timedelta(days=since_days)
-
-    client = ListinyClient()
-    results = []
-    subjects = db.scalars(q).all()
-    for n, subject in enumerate(subjects, 1):
-        print(f"» {subject.name} (IČO {subject.ico})")
-        _state_update(state,
-                      progress=f"{n}/{len(subjects)}: {subject.name}",
-                      processed_subjects=n)
+        subjects = plan_subjects(db, limit, city, icos)
+    since = now - timedelta(days=since_days) if since_days else None
+
+    known: dict[int, set[str]] = {}
+    for subject_id, external_id in db.execute(
+            select(Document.subject_id, Document.external_id)
+            .where(Document.subject_id.in_([s.id for s in subjects]))):
+        known.setdefault(subject_id, set()).add(external_id)
+    cached = subjekt_ids.lookup_many(
+        db, [s.ico for s in subjects if not s.justice_subjekt_id])
+    jobs = [{"n": n, "id": s.id, "ico": s.ico, "name": s.name,
+             "subjekt_id": (s.justice_subjekt_id
+                            or cached.get(subjekt_ids.normalize(s.ico))),
+             "cached_miss": (not s.justice_subjekt_id
+                             and subjekt_ids.normalize(s.ico) in cached
+                             and cached[subjekt_ids.normalize(s.ico)] is None),
+             "known": known.get(s.id, set()),
+             "previous": _listing_previous(s, since, True)}
+            for n, s in enumerate(subjects, 1)]
+    return _SyncPipeline(db, ListinyClient(), jobs, max_docs=max_docs,
+                         since=since, state=state,
+                         procs=SYNC_PROCS if procs is None else procs,
+                         run_id=run_id, done_before=done_before).run()
+
+
+# Fáze pipeline sync_many v pořadí toku dat.
+SYNC_STAGES = ("resolve", "listing", "download", "extract", "store")
+
+_DONE = object()
+
+
+def _init_extract_worker(max_ocr_procs: int):
+    """Limit souběžných pdftoppm/tesseract v jednom procesu extrakce, aby
+    součet přes všechny procesy odpovídal RADAR_OCR_MAX_PROCS."""
+    from . import ocr
+    ocr._proc_slots = threading.BoundedSemaphore(max_ocr_procs)
+
+
+class _SyncPipeline:
+    """Proudová synchronizace více SVJ.
+
+      resolve -> listing -> download -> extract -> store
+
+    Síťové fáze běží každá ve svém vlákně přes společný ListinyClient —
+    jeho plánovač drží frekvenci požadavků, takže úzkým hrdlem je jen
+    šetrné stahování. Extrakce/OCR běží v poolu procesů, analýza a zápis
+    do databáze ve volajícím vlákně (session není thread-safe). Fáze
+    spojují omezené fronty: když extrakce nestíhá, stahování počká.
+
+    Průběh se hlásí do state["stages"]: pro každou fázi počet hotových
+    položek, položek ve frontě a chyb. S run_id se výsledek každého SVJ
+    zapisuje do sync_runs v transakci s jeho daty (checkpoint běhu).
+    """
+
+    def __init__(self, db: Session, client, jobs: list[dict], *,
+                 max_docs: int, since: datetime | None, state: dict | None,
+                 procs: int, run_id: int | None = None,
+                 done_before: int = 0):
+        self.db = db
+        self.run_id = run_id
+        self.done_before = done_before
+        self.client = client
+        self.jobs = jobs
+        self.max_docs = max_docs
+        self.since = since
+        self.state = state
+        # Každý proces extrakce dostane aspoň jeden slot OCR a součet slotů
+        # nesmí překročit RADAR_OCR_MAX_PROCS -> nejvýš tolik procesů.
+        self.procs = min(procs, ocr.OCR_MAX_PROCS)
+        self.stop = threading.Event()
+        self.crashed: str | None = None   # fáze, jejíž vlákno spadlo
+        self.executor = None              # pool extrakce (run, po rozbití nový)
+        self._lock = threading.Lock()
+        self.stages = {name: {"done": 0, "queued": 0, "errors": 0}
+                       for name in SYNC_STAGES}
+        self.stages["resolve"]["cached"] = 0
+        self.stages["listing"]["unchanged"] = 0
+        if state is not None:
+            state["stages"] = self.stages
+        size = max(1, SYNC_QUEUE)
+        self.q_listing = queue.Queue(size)
+        self.q_download = queue.Queue(size)
+        self.q_extract = queue.Queue(size)
+        # Do store píšou všechny fáze (chyby rovnou), čte jen hlavní vlákno.
+        self.q_store = queue.Queue()
+
+    # -- pomocné -------------------------------------------------------------
+
+    def _count(self, stage: str, **delta):
+        with self._lock:
+            for key, value in delta.items():
+                self.stages[stage][key] += value
+
+    def _put(self, q: queue.Queue, item, stage: str | None = None):
+        if stage:
+            self._count(stage, queued=1)
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _items(self, q: queue.Queue, stage: str):
+        """Položky fronty až po _DONE (nebo do zastavení pipeline)."""
+        while not self.stop.is_set():
+            try:
+                item = q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            self._count(stage, queued=-1)
+            yield item
+
+    def _stage(self, target, *args):
+        """Vlákno fáze: nečekaná chyba pipeline zastaví (jinak by store
+        čekal na _DONE, které už nepřijde)."""
+        try:
+            target(*args)
+        except Exception as exc:
+            print(f"  ! fáze {target.__name__[1:]} spadla: {exc}")
+            self.crashed = f"{target.__name__[1:]}: {exc}"
+            self.stop.set()
+
+    def _fail(self, stage: str, job: dict, exc: Exception):
+        print(f"  ! {job['name']}: {exc}")
+        self._count(stage, errors=1)
+        self._put(self.q_store, ("failed", job, str(exc)), "store")
+
+    # -- síťové fáze ----------------------------------------------------------
+
+    def _resolve(self):
+        for job in self.jobs:
+            if self.stop.is_set():
+                break
+            try:
+                # subjektId z cache subjekt_ids: bez požadavku na rejstřík.
+                if job["cached_miss"]:
+                    raise LookupError(f"Subjekt s IČO {job['ico']} není "
+                                      f"v rejstříku (cache).")
+                if not job["subjekt_id"]:
+                    try:
+                        job["subjekt_id"] = self.client.find_subjekt_id(
+                            job["ico"])
+                    except LookupError:
+                        job["resolved"] = None
+                        raise
+                    job["resolved"] = job["subjekt_id"]
+                else:
+                    self._count("resolve", cached=1)
+                self._count("resolve", done=1)
+                self._put(self.q_listing, job, "listing")
+            except Exception as exc:
+                self._fail("resolve", job, exc)
+        self._put(self.q_listing, _DONE)
+
+    def _listing(self):
+        for job in self._items(self.q_listing, "listing"):
+            try:
+                page = self.client.fetch_listing(job["subjekt_id"],
+                                                 job["previous"])
+                job["listing"] = page
+                if page.unchanged:
+                    job.update(skipped=0, candidates=[], complete=True)
+                    self._count("listing", unchanged=1)
+                else:
+                    candidates = _candidates(page.listiny, job["known"],
+                                             True, self.since)
+                    job["skipped"] = len(page.listiny) - len(candidates)
+                    job["candidates"] = candidates[:self.max_docs]
+                    job["complete"] = len(candidates) <= self.max_docs
+                self._count("listing", done=1)
+                self._put(self.q_download, job, "download")
+            except Exception as exc:
+                self._fail("listing", job, exc)
+        self._put(self.q_download, _DONE)
+
+    def _download(self):
+        for job in self._items(self.q_download, "download"):
+            job["downloaded"] = 0
+            for listina in job["candidates"]:
+                try:
+                    target, downloaded = _download(self.client, job["ico"],
+                                                   listina)
+                    job["downloaded"] += downloaded
+                    self._count("download", done=1)
+                    self._put(self.q_extract, (job, listina, target),
+                              "extract")
+                except Exception as exc:
+                    print(f"  ! {listina.cislo}: {exc}")
+                    self._count("download", errors=1)
+                    self._put(self.q_store, ("document", job, listina,
+                                             None, str(exc)), "store")
+            # Konec subjektu: store ví, kolik dokumentů má čekat.
+            self._put(self.q_store, ("subject", job), "store")
+        self._put(self.q_extract, _DONE)
+
+    # -- CPU fáze --------------------------------------------------------------
+
+    def _executor(self):
+        if self.procs <= 0:
+            return ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix="extract")
+        # spawn: fork z procesu s běžícími vlákny není bezpečný.
+        # procs <= OCR_MAX_PROCS, takže součet slotů limit nepřekročí.
+        return ProcessPoolExecutor(
+            max_workers=self.procs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_extract_worker,
+            initargs=(ocr.OCR_MAX_PROCS // self.procs,))
+
+    def _extract(self):
+        # Víc rozpracovaných dokumentů než workerů nemá smysl — zbytek
+        # počká ve frontě a přibrzdí stahování.
+        slots = threading.BoundedSemaphore(max(1, self.procs))
+        broken = False
+
+        def finished(future, job, listina, target):
+            try:
+                extraction, error = future.result(), None
+                self._count("extract", done=1)
+            except Exception as exc:
+                extraction, error = None, str(exc)
+                print(f"  ! {listina.cislo}: {exc}")
+                self._count("extract", errors=1)
+            self._put(self.q_store, ("document", job, listina, target,
+                                     error, extraction), "store")
+            slots.release()
+
+        for job, listina, target in self._items(self.q_extract, "extract"):
+            while not slots.acquire(timeout=0.5):
+                if self.stop.is_set():
+                    return
+            try:
+                future = self.executor.submit(extract_pdf, str(target),
+                                              listina.typ, PROGRESSIVE_OCR)
+            except Exception as exc:
+                print(f"  ! {listina.cislo}: {exc}")
+                self._count("extract", errors=1)
+                self._put(self.q_store, ("document", job, listina, None,
+                                         str(exc)), "store")
+                slots.release()
+                if not isinstance(exc, BrokenExecutor):
+                    continue
+                if broken:
+                    # Rozbitý i nový pool: zbylá SVJ run() zapíše jako failed.
+                    raise
+                # Worker zabitý (OOM při OCR) rozbije celý pool -> nový.
+                broken = True
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._executor()
+                continue
+            broken = False
+            future.add_done_callback(
+                lambda f, j=job, l=listina, t=target: finished(f, j, l, t))
+        # Všechny sloty volné = všechny výsledky jsou ve frontě store.
+        for _ in range(max(1, self.procs)):
+            while not slots.acquire(timeout=0.5):
+                if self.stop.is_set():
+                    return
+        self._put(self.q_store, _DONE)
+
+    # -- zápis ---------------------------------------------------------------
+
+    def _store_document(self, job: dict, listina, target, error,
+                        extraction=None) -> dict:
+        if error:
+            return {"listina": listina.cislo, "error": error}
         try:
-            res = sync_subject(db, subject, client, max_docs=max_docs,
-                               since=since)
-            results.append(res)
-            if state is not None:
-                new_docs = [d for d in res.get("documents", [])
-                            if not d.get("duplicate") and not d.get("error")]
-                state["new_documents"] += len(new_docs)
-                state["hot_found"] += sum(
-                    1 for d in new_docs if d.get("score", 0) >= 60)
+            outcome = ingest_pdf(
+                self.db, self.db.get(Subject, job["id"]), target,
+                external_id=listina.external_id, title=listina.typ,
+                source_url=listina.detail_url, document_date=listina.vznik,
+                extraction=extraction)
+            outcome["listina"] = listina.cislo
+            return outcome
+        except Exception as exc:
+            self.db.rollback()
+            print(f"  ! {listina.cislo}: {exc}")
+            return {"listina": listina.cislo, "error": str(exc)}
+
+    def _store_resolved(self, job: dict):
+        """Výsledek vyhledání v rejstříku do sdílené cache subjektId."""
+        if "resolved" in job:
+            subjekt_ids.store(self.db, job["ico"], job["resolved"])
+            self.db.commit()
+
+    def _finish_subject(self, job: dict, documents: list[dict]) -> dict:
+        self._store_resolved(job)
+        subject = self.db.get(Subject, job["id"])
+        subject.justice_subjekt_id = job["subjekt_id"]
+        _remember_listing(
+            subject, job["listing"], self.since, True,
+            complete=job["complete"] and not any(d.get("error")
+                                                 for d in documents))
+        new_docs = [d for d in documents
+                    if not d.get("duplicate") and not d.get("error")]
+        rotation.record_check(subject, job["listing"].listiny, len(new_docs),
+                              self.db.get(LeadSummary, subject.id))
+        subject.listiny_checked_at = datetime.utcnow()
+        unchanged = job["listing"].unchanged
+        hot = sum(1 for d in new_docs if d.get("score", 0) >= 60)
+        if self.run_id is not None:
+            sync_runs.record(self.db, self.run_id, subject.id, "done",
+                             new_documents=len(new_docs), hot_found=hot,
+                             unchanged=unchanged)
+        self.db.commit()
+        self._count("store", done=1)
+        if self.state is not None:
+            self.state["unchanged_subjects"] += unchanged
+            self.state["new_documents"] += len(new_docs)
+            self.state["hot_found"] += hot
+        print(f"» {job['name']} (IČO {job['ico']}): "
+              + ("seznam listin beze změny" if unchanged
+                 else f"{len(new_docs)} nových dokumentů"))
+        return {"ico": job["ico"], "name": job["name"],
+                "downloaded": job["downloaded"], "skipped": job["skipped"],
+                "unchanged": unchanged, "documents": documents}
+
+    def _subject_failed(self, job: dict, error: str) -> dict:
+        self._store_resolved(job)
+        # Nenalezené IČO zkusit až po vypršení negativní cache,
+        # jinou chybu za týden.
+        rotation.postpone(
+            self.db.get(Subject, job["id"]),
+            subjekt_ids.MISS_DAYS
+            if job["cached_miss"] or job.get("resolved", 1) is None
+            else rotation.MIN_DAYS)
+        if self.run_id is not None:
+            sync_runs.record(self.db, self.run_id, job["id"], "failed",
+                             error=error)
+        self.db.commit()
+        self._count("store", errors=1)
+        return {"ico": job["ico"], "error": error}
+
+    def _guarded(self, job: dict, write, *args) -> dict:
+        """Zápis výsledku SVJ; chyba (např. zamčená SQLite) neukončí běh.
+
+        Po chybě se transakce vrátí a SVJ se v běhu zapíše jako failed,
+        ostatní SVJ pokračují (jako dřívější „přeskočeno“ v sync_many).
+        """
+        try:
+            return write(*args)
         except Exception as exc:
-            print(f"  ! přeskočeno: {exc}")
-            results.append({"ico": subject.ico, "error": str(exc)})
-    return results
+            self.db.rollback()
+            print(f"  ! {job['name']}: přeskočeno ({exc})")
+            self._count("store", errors=1)
+            if self.run_id is not None:
+                try:
+                    sync_runs.record(self.db, self.run_id, job["id"],
+                                     "failed", error=str(exc))
+                    self.db.commit()
+                except Exception as record_exc:
+                    self.db.rollback()
+                    print(f"  ! {job['name']}: výsledek nezapsán "
+                          f"({record_exc})")
+            return {"ico": job["ico"], "error": str(exc)}
+
+    def run(self) -> list[dict]:
+        results = []
+        documents: dict[int, list[dict]] = {}
+        expected: dict[int, dict] = {}    # id -> job s hotovým stahováním
+        finished = 0
+        handled: set[int] = set()
+        self.executor = self._executor()
+        threads = [threading.Thread(target=self._stage, args=(target,),
+                                    daemon=True,
+                                    name=f"sync-{target.__name__[1:]}")
+                   for target in (self._resolve, self._listing,
+                                  self._download, self._extract)]
+        for t in threads:
+            t.start()
+        try:
+            for message in self._items(self.q_store, "store"):
+                kind, job = message[0], message[1]
+                if kind == "failed":
+                    finished += 1
+                    handled.add(job["id"])
+                    results.append(self._guarded(
+                        job, self._subject_failed, job, message[2]))
+                elif kind == "document":
+                    documents.setdefault(job["id"], []).append(
+                        self._store_document(job, *message[2:]))
+                else:
+                    expected[job["id"]] = job
+                for subject_id in [i for i, j in expected.items()
+                                   if len(documents.get(i, []))
+                                   >= len(j["candidates"])]:
+                    finished += 1
+                    handled.add(subject_id)
+                    job = expected.pop(subject_id)
+                    results.append(self._guarded(
+                        job, self._finish_subject, job,
+                        documents.pop(subject_id, [])))
+                done = self.done_before + finished
+                _state_update(self.state,
+                              progress=f"{done}/"
+                                       f"{self.done_before + len(self.jobs)} SVJ",
+                              processed_subjects=done)
+        finally:
+            self.stop.set()
+            for t in threads:
+                t.join()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.crashed:
+            # Nedokončená SVJ: failed (rotace je odloží), běh skončí.
+            for job in self.jobs:
+                if job["id"] not in handled:
+                    results.append(self._guarded(
+                        job, self._subject_failed, job,
+                        f"synchronizace přerušena ({self.crashed})"))
+        return results
 
 
 # ---------------------------------------------------------------------------
 # Přepočet uložených dokumentů (po změně pravidel)
 # ---------------------------------------------------------------------------
 
+def _reanalyze(db: Session, doc: Document) -> tuple[int, str | None]:
+    """Přepočítá skóre a signály dokumentu z doc.text -> (dělitel, typ)."""
+    analysis = analyze_full(doc.text)
+    meta, signals, score = (analysis["meta"], analysis["signals"],
+                            analysis["score"])
+    divisor = doc_score_divisor(doc.title, meta["document_type"])
+    if divisor > 1:
+        score //= divisor
+
+    # nahradit signály
+    for s in list(doc.signals):
+        db.delete(s)
+    for s in signals:
+        db.add(Signal(
+            document_id=doc.id,
+            keyword=s["keyword"], category=s["category"],
+            points=s["points"], evidence=s["context"],
+            type=s["type"], label=s["label"],
+            priority=s["priority"], value=s["value"],
+        ))
+    doc.score = score
+    doc.doc_type = meta["document_type"]
+    doc.meeting_date = meta["meeting_date"] or doc.meeting_date
+    return divisor, meta["document_type"]
+
+
 def rescore_all(db: Session) -> dict:
     """Znovu analyzuje všechny uložené texty aktuálními pravidly."""
     changed = unchanged = 0
     docs = db.scalars(select(Document).where(Document.text.isnot(None))).all()
     for doc in docs:
-        meta = analyze_document(doc.text)
-        signals = detect_signals(doc.text)
-        score = score_signals(signals)
-        divisor = doc_score_divisor(doc.title, meta["document_type"])
-        if divisor > 1:
-            score //= divisor
-
         old_score = doc.score
-        # nahradit signály
-        for s in list(doc.signals):
-            db.delete(s)
-        for s in signals:
-            db.add(Signal(
-                document_id=doc.id,
-                keyword=s["keyword"], category=s["category"],
-                points=s["points"], evidence=s["context"],
-                type=s["type"], label=s["label"],
-                priority=s["priority"], value=s["value"],
-            ))
-        doc.score = score
-        doc.doc_type = meta["document_type"]
-        doc.meeting_date = meta["meeting_date"] or doc.meeting_date
+        divisor, doc_type = _reanalyze(db, doc)
+        score = doc.score
 
         if old_score != score:
             changed += 1
             print(f"  {doc.title[:60]:60s} {old_score or 0:>3} -> {score:>3}"
-                  + (f"  (/{divisor} – {meta['document_type'] or 'typ dle názvu'})"
+                  + (f"  (/{divisor} – {doc_type or 'typ dle názvu'})"
                      if divisor > 1 else ""))
         else:
             unchanged += 1
+    lead_summary.rebuild_all(db)
     db.commit()
     return {"changed": changed, "unchanged": unchanged, "total": len(docs)}
 
 
+def complete_partial_ocr(db: Session, limit: int = 20,
+                         state: dict | None = None) -> dict:
+    """Dokončí OCR dokumentů, u kterých progresivní OCR skončilo dřív."""
+    docs = db.scalars(
+        select(Document).where(Document.ocr_partial.is_(True))
+        .order_by(desc(Document.score)).limit(limit)
+    ).all()
+    completed = changed = missing = failed = 0
+    for n, doc in enumerate(docs, 1):
+        _state_update(state, progress=f"dokončuji OCR… {n}/{len(docs)}")
+        if not doc.file_path or not Path(doc.file_path).exists():
+            # Bez PDF nejde dokončit; přeskočené stránky zůstanou vidět
+            # v page_stats, příznak se shodí, aby dokument neblokoval frontu.
+            doc.ocr_partial = False
+            db.commit()
+            missing += 1
+            continue
+        try:
+            extraction = extract_document(doc.file_path)
+        except Exception as exc:
+            # OcrTimeout, poškozené PDF…: stejně jako bez PDF — dokument
+            # zůstane s částečným textem a příznak se shodí, jinak by
+            # (řazeno podle skóre) selhával první při každém běhu.
+            db.rollback()
+            print(f"  ! {doc.title[:60]}: OCR se nedokončilo ({exc})")
+            doc.ocr_partial = False
+            db.commit()
+            failed += 1
+            continue
+        old_score = doc.score
+        doc.text = extraction["text"]
+        doc.text_hash = hashlib.sha256(doc.text.encode("utf-8")).hexdigest()
+        doc.page_stats = extraction["pages"]
+        doc.ocr_used = extraction["used_ocr"]
+        doc.ocr_partial = False
+        _reanalyze(db, doc)
+        lead_summary.refresh_subject(db, doc.subject_id)
+        db.commit()
+        completed += 1
+        if doc.score != old_score:
+            changed += 1
+            print(f"  {doc.title[:60]:60s} {old_score or 0:>3} -> "
+                  f"{doc.score:>3} (dokončené OCR)")
+    return {"completed": completed, "changed": changed, "missing": missing,
+            "failed": failed}
+
+
+def delete_document(db: Session, doc: Document) -> None:
+    """Smaže dokument i se signály a přepočítá lead jeho SVJ."""
+    subject_id = doc.subject_id
+    db.delete(doc)
+    lead_summary.refresh_subject(db, subject_id)
+    db.commit()
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -338,7 +994,8 @@ def main():
                         help="Synchronizovat více SVJ z databáze")
     parser.add_argument("--city", help="Filtr města pro --sync-all")
     parser.add_argument("--limit", type=int, default=10,
-                        help="Počet SVJ pro --sync-all")
+                        help="Počet SVJ pro --sync-all "
+                             "(dokumentů pro --complete-ocr)")
     parser.add_argument("--max-docs", type=int, default=5,
                         help="Max. počet listin na jedno SVJ")
     parser.add_argument("--since-days", type=int, default=None,
@@ -346,6 +1003,9 @@ def main():
     parser.add_argument("--rescore", action="store_true",
                         help="Přepočítat skóre všech uložených dokumentů "
                              "aktuálními pravidly")
+    parser.add_argument("--complete-ocr", action="store_true",
+                        help="Dokončit OCR částečně zpracovaných dokumentů "
+                             "(--limit dokumentů)")
     args = parser.parse_args()
 
     init_db()
@@ -355,6 +1015,11 @@ def main():
             out = rescore_all(db)
             print(f"\nPřepočteno {out['total']} dokumentů, "
                   f"změněno {out['changed']}, beze změny {out['unchanged']}.")
+        elif args.complete_ocr:
+            out = complete_partial_ocr(db, limit=args.limit)
+            print(f"\nDokončeno {out['completed']} dokumentů, změněno skóre "
+                  f"u {out['changed']}, chybí PDF u {out['missing']}, "
+                  f"chyba OCR u {out['failed']}.")
         elif args.pdf:
             if not args.ico:
                 parser.error("--pdf vyžaduje --ico")
@@ -375,7 +1040,8 @@ def main():
             if not subject:
                 parser.error(f"SVJ s IČO {args.ico} není v databázi.")
             result = sync_subject(db, subject, max_docs=args.max_docs)
-            print(f"\nStaženo: {result['downloaded']}, "
+            print("\nSeznam listin beze změny." if result["unchanged"] else
+                  f"\nStaženo: {result['downloaded']}, "
                   f"nezajímavé/známé: {result['skipped']}")
             for docres in result["documents"]:
                 _print_outcome(docres)
@@ -385,8 +1051,9 @@ def main():
                                 since_days=args.since_days)
             hot = [r for r in results for d in r.get("documents", [])
                    if d.get("score", 0) >= 60]
-            print(f"\nHotovo. Subjektů: {len(results)}, "
-                  f"nadějných dokumentů: {len(hot)}")
+            unchanged = sum(1 for r in results if r.get("unchanged"))
+            print(f"\nHotovo. Subjektů: {len(results)} (seznam listin beze "
+                  f"změny: {unchanged}), nadějných dokumentů: {len(hot)}")
         else:
             parser.print_help()
     finally:
@@ -402,7 +1069,9 @@ def _print_outcome(out: dict):
         return
     print(f"  ✓ dokument {out.get('listina', out['document_id'])}: "
           f"skóre {out['score']}/100 ({out['lead_level']})"
-          + (" [OCR]" if out.get("ocr_used") else ""))
+          + (f" [OCR {out['ocr_pages']}/{out['pages']} str.]"
+             if out.get("ocr_pages") else
+             " [OCR]" if out.get("ocr_used") else ""))
     for s in out.get("signals", []):
         val = f" = {s['value']}" if s.get("value") else ""
         print(f"      · {s['label']}{val}")
@@ -8,22 +8,31 @@ dohledávání OpenData datasetů po krajích stačí:
   python -m app.prvotkar_client --obec "Brno" --ulice "Rybářská"
   python -m app.prvotkar_client --ico 3438546
 
+  python -m app.prvotkar_client --okres "Brno-venkov"
+
 Naimportované subjekty pak zpracuje běžná pipeline:
   python -m app.pipeline --sync-all --limit 10 --city Brno
+
+Import stahuje stránky po PRVOTKAR_PAGE_SIZE záznamech (výchozí 2000,
+maximum /api/svj) a další stránku stahuje už během zápisu předchozí.
+Každá stránka se zapíše hromadně: existující IČO jedním dotazem IN,
+zápis upsertem INSERT … ON CONFLICT (ico) DO UPDATE.
 """
 
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import requests
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
 
 from .db import init_db, SessionLocal
 from .models import Subject
 
 PRVOTKAR_URL = os.getenv("PRVOTKAR_URL", "https://prvotkar-backend.onrender.com")
-PAGE_SIZE = 200
+PAGE_SIZE = int(os.getenv("PRVOTKAR_PAGE_SIZE", "2000"))
 
 
 class PrvotkarClient:
@@ -39,10 +48,15 @@ class PrvotkarClient:
         r.raise_for_status()
         return r.json()
 
-    def svj(self, obec: str, ulice: str | None = None,
+    def svj(self, obec: str | None = None, ulice: str | None = None,
             cast_obce: str | None = None, typ: str | None = None,
-            start: int = 0, pocet: int = PAGE_SIZE) -> dict:
-        params = {"obec": obec, "start": start, "pocet": pocet}
+            start: int = 0, pocet: int = PAGE_SIZE,
+            okres: str | None = None) -> dict:
+        params = {"start": start, "pocet": pocet}
+        if obec:
+            params["obec"] = obec
+        if okres:
+            params["okres"] = okres
         if ulice:
             params["ulice"] = ulice
         if cast_obce:
@@ -54,18 +68,35 @@ class PrvotkarClient:
     def by_ico(self, ico: str) -> dict:
         return self._get(f"/api/ico/{ico}")
 
-    def iter_svj(self, obec: str, **kwargs):
+    def iter_pages(self, obec: str | None = None, **kwargs):
+        """Projde stránky výsledků (seznamy záznamů).
+
+        Další stránka se stahuje ve vlákně, zatímco volající zpracovává
+        předchozí; naráz běží nejvýš jeden požadavek.
+        """
+        pool = ThreadPoolExecutor(max_workers=1,
+                                  thread_name_prefix="prvotkar-prefetch")
+        try:
+            data = self.svj(obec, start=0, **kwargs)
+            start = 0
+            while True:
+                subjekty = data.get("subjekty", [])
+                if not subjekty:
+                    return
+                start += len(subjekty)
+                ahead = (pool.submit(self.svj, obec, start=start, **kwargs)
+                         if start < data.get("celkem", 0) else None)
+                yield subjekty
+                if ahead is None:
+                    return
+                data = ahead.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def iter_svj(self, obec: str | None = None, **kwargs):
         """Projde všechny stránky výsledků."""
-        start = 0
-        while True:
-            data = self.svj(obec, start=start, **kwargs)
-            subjekty = data.get("subjekty", [])
-            if not subjekty:
-                break
-            yield from subjekty
-            start += len(subjekty)
-            if start >= data.get("celkem", 0):
-                break
+        for page in self.iter_pages(obec, **kwargs):
+            yield from page
 
 
 def _subject_from_prvotkar(item: dict) -> dict:
@@ -100,45 +131,102 @@ def _subject_from_prvotkar(item: dict) -> dict:
     }
 
 
-def import_obec(obec: str, ulice: str | None = None,
+# Pole, která import u existujícího subjektu přepisuje, a to jen neprázdnou
+# hodnotou (adresní údaje z Prvotkáře jsou obvykle čerstvější).
+UPDATE_FIELDS = ("name", "city", "street", "house_number", "zip_code",
+                 "address", "source_dataset")
+# Jen u nově založených subjektů.
+NEW_DEFAULTS = {"legal_form": "Společenství vlastníků jednotek",
+                "source_url": "https://or.justice.cz/ias/ui/rejstrik"}
+
+
+def _merge(rows: list[dict]) -> list[dict]:
+    """Opakované IČO na stránce sloučí jako zápis po řádcích: první
+    záznam založí subjekt, další přepíší jen neprázdná pole."""
+    merged: dict[str, dict] = {}
+    for r in rows:
+        prev = merged.get(r["ico"])
+        if prev is None:
+            merged[r["ico"]] = dict(r)
+        else:
+            prev.update((k, r[k]) for k in UPDATE_FIELDS if r[k])
+    return list(merged.values())
+
+
+def upsert_page(db: Session, rows: list[dict], out: dict) -> None:
+    """Zapíše stránku polí Subjectu (nové i existující IČO); necommituje.
+
+    Existující subjekt dostane jen neprázdné hodnoty UPDATE_FIELDS,
+    last_entry_date (datum vzniku) se u něj nemění.
+    """
+    icos = list({r["ico"] for r in rows})
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        seen = set(db.scalars(select(Subject.ico).where(Subject.ico.in_(icos))))
+        existing = {}
+    else:
+        existing = {s.ico: s for s in db.scalars(
+            select(Subject).where(Subject.ico.in_(icos)))}
+        seen = set(existing)
+    for r in rows:
+        out["updated" if r["ico"] in seen else "inserted"] += 1
+        seen.add(r["ico"])
+    rows = _merge(rows)
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        table = Subject.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.ico],
+            set_={f: func.coalesce(func.nullif(stmt.excluded[f], ""),
+                                   table.c[f]) for f in UPDATE_FIELDS})
+        db.execute(stmt, [{**NEW_DEFAULTS, **r} for r in rows])
+        return
+    for r in rows:
+        subject = existing.get(r["ico"])
+        if subject is None:
+            db.add(Subject(**NEW_DEFAULTS, **r))
+            continue
+        for key in UPDATE_FIELDS:
+            if r[key]:
+                setattr(subject, key, r[key])
+
+
+def import_pages(db: Session, pages, limit: int | None = None) -> dict:
+    """Naimportuje stránky záznamů Prvotkáře, commit po každé stránce."""
+    out = {"inserted": 0, "updated": 0}
+    remaining = limit
+    for page in pages:
+        if remaining is not None:
+            page = page[:remaining]
+            remaining -= len(page)
+        if page:
+            upsert_page(db, [_subject_from_prvotkar(i) for i in page], out)
+            db.commit()
+            print(f"Zpracováno: {out['inserted'] + out['updated']}")
+        if remaining is not None and remaining <= 0:
+            break
+    return out
+
+
+def import_obec(obec: str | None = None, ulice: str | None = None,
                 cast_obce: str | None = None, typ: str | None = None,
-                limit: int | None = None) -> dict:
-    """Naimportuje subjekty z Prvotkáře do databáze RBD Radaru."""
+                limit: int | None = None, okres: str | None = None) -> dict:
+    """Naimportuje subjekty z Prvotkáře (obec nebo okres) do databáze."""
     init_db()
     client = PrvotkarClient()
-    db = SessionLocal()
-    inserted = updated = 0
-    try:
-        for n, item in enumerate(client.iter_svj(obec, ulice=ulice,
-                                                 cast_obce=cast_obce, typ=typ)):
-            if limit and n >= limit:
-                break
-            fields = _subject_from_prvotkar(item)
-            subject = db.scalar(
-                select(Subject).where(Subject.ico == fields["ico"]))
-            if subject is None:
-                subject = Subject(
-                    legal_form="Společenství vlastníků jednotek",
-                    source_url="https://or.justice.cz/ias/ui/rejstrik",
-                    **fields,
-                )
-                db.add(subject)
-                inserted += 1
-            else:
-                # Adresní údaje z Prvotkáře jsou obvykle čerstvější.
-                for key, value in fields.items():
-                    if key in ("ico", "last_entry_date"):
-                        continue
-                    if value:
-                        setattr(subject, key, value)
-                updated += 1
-            if (inserted + updated) % 100 == 0:
-                db.commit()
-                print(f"Zpracováno: {inserted + updated}")
-        db.commit()
-    finally:
-        db.close()
-    return {"inserted": inserted, "updated": updated}
+    pocet = min(PAGE_SIZE, limit) if limit else PAGE_SIZE
+    pages = client.iter_pages(obec, ulice=ulice, cast_obce=cast_obce,
+                              typ=typ, okres=okres, pocet=pocet)
+    with SessionLocal() as db:
+        try:
+            return import_pages(db, pages, limit)
+        finally:
+            pages.close()
 
 
 def import_ico(ico: str) -> dict:
@@ -173,6 +261,7 @@ def main():
     parser = argparse.ArgumentParser(
         description="Import SVJ/BD z Prvotkáře do RBD Radaru")
     parser.add_argument("--obec", help="Název obce (např. Brno)")
+    parser.add_argument("--okres", help="Název okresu (např. Brno-venkov)")
     parser.add_argument("--ulice", help="Filtr ulice")
     parser.add_argument("--cast-obce", help="Filtr části obce")
     parser.add_argument("--typ", help="svj / bd")
@@ -184,9 +273,9 @@ def main():
         out = import_ico(args.ico)
         print(f"{'Založen' if out['created'] else 'Aktualizován'}: "
               f"{out['name']} (IČO {out['ico']})")
-    elif args.obec:
+    elif args.obec or args.okres:
         out = import_obec(args.obec, args.ulice, args.cast_obce, args.typ,
-                          args.limit)
+                          args.limit, okres=args.okres)
         print(f"HOTOVO — nové: {out['inserted']}, "
               f"aktualizované: {out['updated']}")
     else:
@@ -0,0 +1,125 @@
+"""Adaptivní rotace synchronizace: kdy má smysl SVJ znovu zkontrolovat.
+
+Pro každé SVJ se vede Subject.rotation_stats:
+  filings   data založení zajímavých listin (posledních MAX_FILINGS)
+  checks    počet kontrol Sbírky listin
+  hits      kontroly, které přinesly nový dokument
+Z nich, z nejlepšího skóre a data posledního shromáždění (lead_summary)
+se po každé kontrole spočítá Subject.next_check_at. sync_many bere SVJ
+podle něj (nikdy nekontrolovaná napřed), takže pevný noční limit
+(RADAR_NIGHT_LIMIT) jde nejdřív na domy, u kterých je nový zápis
+nejpravděpodobnější; co po splatných SVJ z limitu zbude, dostanou nejdéle
+nekontrolovaná.
+
+Simulace proti starému pořadí: python scripts/benchmark.py rotation
+"""
+
+from datetime import date, datetime, timedelta
+from statistics import median
+
+from sqlalchemy import case, desc, func
+
+from .models import Subject
+
+MIN_DAYS = 7            # nejkratší interval mezi kontrolami
+MAX_DAYS = 365          # nejdelší (i spící SVJ se jednou za rok ověří)
+DEFAULT_CADENCE = 365   # SVJ bez historie: shromáždění aspoň jednou ročně
+MAX_FILINGS = 12
+# Listiny založené do pár týdnů od sebe patří ke stejnému shromáždění.
+SAME_MEETING_DAYS = 30
+# Poslední shromáždění starší než tohle = další je po termínu.
+MEETING_OVERDUE_DAYS = 400
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def cadence_days(filings: list[date]) -> float | None:
+    """Medián odstupu zajímavých listin ve dnech (None = málo historie)."""
+    gaps = [(b - a).days for a, b in zip(filings, filings[1:])
+            if (b - a).days >= SAME_MEETING_DAYS]
+    return float(median(gaps)) if gaps else None
+
+
+def next_check(stats: dict, checked_at: datetime, best_score: int = 0,
+               last_meeting: datetime | None = None) -> datetime:
+    """Termín další kontroly.
+
+    Očekávaná další zajímavá listina = poslední + obvyklý odstup. Před ní
+    se SVJ nekontroluje, jen se probudí s předstihem (rozptyl termínů
+    shromáždění). Od té doby, dokud listina nepřijde, se zkouší zhruba po
+    měsíci; čím déle je po termínu, tím řidčeji (vynechané shromáždění).
+    Váha — skóre leadu a shromáždění po termínu — předstih prodlužuje
+    a opakování zhušťuje. SVJ bez historie listin řídí úspěšnost minulých
+    kontrol: kde se opakovaně nic nenašlo, kontroluje se řidčeji.
+    """
+    filings = sorted(date.fromisoformat(d) for d in stats.get("filings", []))
+    cadence = cadence_days(filings) or DEFAULT_CADENCE
+    today = _as_date(checked_at)
+
+    weight = 1 + (best_score or 0) / 100
+    if not filings:
+        weight *= 2 * (stats.get("hits", 0) + 1) / (stats.get("checks", 0) + 2)
+    if (last_meeting is None
+            or (today - _as_date(last_meeting)).days > MEETING_OVERDUE_DAYS):
+        weight *= 1.25
+
+    if filings:
+        until = (filings[-1] - today).days + cadence * (1 - 0.1 * weight)
+    else:
+        until = 0
+    if until > 0:
+        days = until
+    else:
+        overdue = -until if filings else cadence / 2
+        days = cadence / 12 / weight * (1 + 2 * overdue / cadence)
+    days = min(MAX_DAYS, max(MIN_DAYS, days))
+    return checked_at + timedelta(days=days)
+
+
+def record_check(subject: Subject, listiny: list | None, new_documents: int,
+                 summary=None, now: datetime | None = None) -> None:
+    """Zapíše výsledek kontroly do statistik a přepočítá next_check_at.
+
+    listiny: celý seznam listin, None = seznam beze změny (historie zůstává).
+    summary: LeadSummary subjektu (skóre, poslední shromáždění) nebo None.
+    Necommituje.
+    """
+    now = now or datetime.utcnow()
+    stats = dict(subject.rotation_stats or {})
+    if listiny is not None:
+        stats["filings"] = sorted({
+            _as_date(l.zalozeno or l.vznik).isoformat()
+            for l in listiny if l.is_interesting and (l.zalozeno or l.vznik)
+        })[-MAX_FILINGS:]
+    stats["checks"] = stats.get("checks", 0) + 1
+    stats["hits"] = stats.get("hits", 0) + (1 if new_documents else 0)
+    subject.rotation_stats = stats
+    subject.next_check_at = next_check(
+        stats, now,
+        best_score=summary.best_score if summary else 0,
+        last_meeting=summary.last_meeting_date if summary else None)
+
+
+def postpone(subject: Subject, days: int, now: datetime | None = None) -> None:
+    """Odloží SVJ, jehož kontrola selhala (jinak by blokovalo začátek fronty)."""
+    subject.next_check_at = (now or datetime.utcnow()) + timedelta(days=days)
+
+
+def rotation_order(now: datetime | None = None) -> tuple:
+    """Pořadí pro sync_many: nikdy nekontrolovaná SVJ, pak splatná podle
+    termínu, zbytek limitu podle nejstarší kontroly.
+
+    Když noční limit pokryje všechna splatná SVJ, zbylá místa nedostanou
+    SVJ s nejbližším termínem (ta se kontrolují nejčastěji), ale ta nejdéle
+    nekontrolovaná — jinak by spící SVJ čekala celý interval a zpoždění
+    nálezů rostlo. SVJ zkontrolovaná před zavedením next_check_at řadí
+    jejich poslední kontrola, jako dřív.
+    """
+    now = now or datetime.utcnow()
+    due_at = func.coalesce(Subject.next_check_at, Subject.listiny_checked_at)
+    checked = func.coalesce(Subject.listiny_checked_at, Subject.next_check_at)
+    return (case((due_at.is_(None), 0), (due_at <= now, 1), else_=2),
+            case((due_at > now, checked), else_=due_at).asc().nullsfirst(),
+            desc(Subject.last_entry_date))
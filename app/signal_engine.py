@@ -11,35 +11,130 @@ Každé pravidlo má:
 
 Vyhledávání je odolné vůči chybějící diakritice (častý artefakt OCR):
 text i klíčová slova se porovnávají v normalizované podobě bez diakritiky.
+
+Pravidla se při importu zkompilují do jedné vyhledávací brány (viz
+CompiledRules); po změně SIGNAL_RULES za běhu je třeba zavolat reload_rules().
 """
 
 import re
+import threading
 import unicodedata
+from array import array
+from bisect import bisect_right
+from functools import cached_property
 
 
 # ---------------------------------------------------------------------------
 # Normalizace (odstranění diakritiky) se zachováním mapování indexů
+#
+# Výsledek normalizace každého znaku se počítá jen jednou a ukládá do
+# překladové tabulky pro str.translate — Latin-1 a Latin Extended-A
+# (čeština) jsou v ní předem, ostatní znaky se doplní při prvním výskytu.
+# Mapa indexů je pak u běžného textu identita; jen znaky, které se
+# nepřekládají na právě jeden znak (samostatná diakritická znaménka,
+# ligatury …), vyžadují pomalejší cestu.
 # ---------------------------------------------------------------------------
 
+_fold_table: dict[int, str] = {}
+_multi_chars: set[str] = set()
+_marks: set[int] = set()
+_mark_known: set[str] = set()
+_fold_lock = threading.RLock()
+_identity = array("I")
+
+
+def _char_class(codepoints, negate: bool = False) -> re.Pattern:
+    """Regex třídy znaků; souvislé úseky kódů zapíše jako rozsahy."""
+    parts = []
+    run_start = prev = None
+    for cp in sorted(codepoints):
+        if prev is not None and cp == prev + 1:
+            prev = cp
+            continue
+        if run_start is not None:
+            parts.append((run_start, prev))
+        run_start = prev = cp
+    if run_start is not None:
+        parts.append((run_start, prev))
+    if not parts:
+        return re.compile("[\\s\\S]" if negate else "(?!)")
+    body = "".join(
+        re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}"
+        for a, b in parts)
+    return re.compile(f"[{'^' if negate else ''}{body}]")
+
+
 def _strip_diacritics(s: str) -> str:
+    nfd = unicodedata.normalize("NFD", s)
+    if nfd.isascii():
+        return nfd
+    global _mark_re
+    unknown = set(nfd).difference(_mark_known)
+    if unknown:
+        with _fold_lock:
+            _marks.update(ord(c) for c in unknown
+                          if unicodedata.category(c) == "Mn")
+            _mark_known.update(unknown)
+            _mark_re = _char_class(_marks)
+    return _mark_re.sub("", nfd)
+
+
+def _fold_char(ch: str) -> str:
     return "".join(
-        c for c in unicodedata.normalize("NFD", s)
+        c for c in unicodedata.normalize("NFD", ch)
         if unicodedata.category(c) != "Mn"
-    )
+    ).lower()
+
+
+def _learn_chars(chars) -> None:
+    """Doplní znaky do překladové tabulky (a regexů, které na ni navazují)."""
+    global _unknown_re, _multi_re
+    with _fold_lock:
+        for ch in chars:
+            if ord(ch) in _fold_table:
+                continue
+            base = _fold_char(ch)
+            if len(base) != 1:
+                _multi_chars.add(ch)
+            _fold_table[ord(ch)] = base
+        _unknown_re = _char_class(_fold_table, negate=True)
+        _multi_re = _char_class(map(ord, _multi_chars))
+
+
+_unknown_re = _multi_re = None
+_mark_re = _char_class(())
+_learn_chars(chr(cp) for cp in range(0x250))    # Latin-1, Latin Extended-A/B
+
+
+def _identity_map(start: int, stop: int) -> array:
+    """Úsek identické mapy indexů (z předpočítaného pole, bez smyčky)."""
+    global _identity
+    if stop > len(_identity):
+        size = max(stop, 2 * len(_identity), 1 << 16)
+        _identity = array("I", range(size))
+    return _identity[start:stop]
 
 
 def _normalize_with_map(text: str):
-    """Vrátí (normalizovaný text, mapa indexů norm -> orig)."""
-    out = []
-    index_map = []
-    for i, ch in enumerate(text):
-        base = _strip_diacritics(ch).lower()
-        if not base:
-            continue
-        for c in base:
-            out.append(c)
-            index_map.append(i)
-    return "".join(out), index_map
+    """Vrátí (normalizovaný text, mapa indexů norm -> orig jako array('I'))."""
+    if text.isascii():
+        return text.lower(), _identity_map(0, len(text))
+    if _unknown_re.search(text):
+        _learn_chars(set(text))
+    norm = text.translate(_fold_table)
+    if not _multi_re.search(text):
+        return norm, _identity_map(0, len(text))
+
+    # Pomalá cesta: znak se přeložil na 0 nebo víc znaků.
+    index_map = array("I")
+    prev = 0
+    for m in _multi_re.finditer(text):
+        i = m.start()
+        index_map.extend(_identity_map(prev, i))
+        index_map.extend([i] * len(_fold_table[ord(m.group())]))
+        prev = i + 1
+    index_map.extend(_identity_map(prev, len(text)))
+    return norm, index_map
 
 
 def _norm(s: str) -> str:
@@ -200,6 +295,234 @@ COMBO_BONUSES = [
 LEAD_LEVELS = [(80, "HOT"), (60, "HIGH"), (35, "WATCH"), (0, "LOW")]
 
 
+# ---------------------------------------------------------------------------
+# Kompilace pravidel
+#
+# Text i klíčová slova jsou po normalizaci malými písmeny, takže by se dalo
+# hledat bez re.IGNORECASE — ten v modulu re vypíná rychlé hledání doslovné
+# předpony a zpomalí každé hledání zhruba desetkrát. Jediná výjimka jsou
+# znaky, které se s IGNORECASE shodují s ASCII písmenem (ı ~ i, ſ ~ s …);
+# když se v textu objeví, použije se varianta s IGNORECASE, aby výsledek
+# zůstal přesně stejný.
+# ---------------------------------------------------------------------------
+
+_CASE_FOLD_CHARS = re.compile("[A-Z\u0130\u0131\u017f\u212a]")
+
+
+class _Pattern:
+    """Regex zkompilovaný bez i s re.IGNORECASE (viz výše)."""
+
+    __slots__ = ("plain", "folded")
+
+    def __init__(self, regex: str, flags: int = 0):
+        self.plain = re.compile(regex, flags)
+        self.folded = re.compile(regex, flags | re.IGNORECASE)
+
+    def get(self, folded: bool):
+        return self.folded if folded else self.plain
+
+
+def _needs_fold(norm_text: str) -> bool:
+    return _CASE_FOLD_CHARS.search(norm_text) is not None
+
+
+def _keyword_regex(keyword: str, is_regex: bool) -> str:
+    pat = _norm(keyword)
+    return pat if is_regex else re.escape(pat)
+
+
+def _split_first_char(regex: str):
+    """Rozdělí regex na (první doslovný znak, zbytek), jinak (None, regex).
+
+    Úvodní \\b se zahodí — brána tím najde nadmnožinu pozic a hranici slova
+    stejně ověří plné klíčové slovo.
+    """
+    body = regex[2:] if regex.startswith("\\b") else regex
+    if (len(body) >= 1 and body[0].isalnum() and "|" not in body
+            and body[1:2] not in ("?", "*", "+", "{")):
+        return body[0], body[1:]
+    return None, body
+
+
+class CompiledRules:
+    """Pravidla předkompilovaná pro jeden průchod textem.
+
+    Všechna klíčová slova tvoří jednu alternaci seskupenou podle prvního
+    znaku (brána). Brána v textu najde kandidátní pozice a na nich se ověří
+    jen klíčová slova začínající daným znakem. Pro každé klíčové slovo se
+    tak najde jeho první výskyt — výsledek je totožný s postupným
+    re.search každého slova zvlášť, ale text se projde jen jednou.
+    """
+
+    def __init__(self, rules: list[dict]):
+        self.rules = rules
+        index: dict[str, int] = {}
+        self.keywords: list[_Pattern] = []
+        self.entries = []   # (pravidlo, [(klíčové slovo, index)], akční regex)
+        for rule in rules:
+            is_regex = rule.get("regex", False)
+            kw_ids = []
+            for kw in rule["keywords"]:
+                regex = _keyword_regex(kw, is_regex)
+                if regex not in index:
+                    index[regex] = len(self.keywords)
+                    self.keywords.append(_Pattern(regex))
+                kw_ids.append((kw, index[regex]))
+            action = None
+            if rule["action_words"]:
+                action = re.compile("|".join(
+                    re.escape(_norm(w)) for w in rule["action_words"]))
+            self.entries.append((rule, kw_ids, action))
+
+        groups: dict[str, list[str]] = {}
+        by_char: dict[str, list[int]] = {}
+        unanchored_regex: list[str] = []
+        unanchored: list[int] = []
+        for regex, i in index.items():
+            ch, rest = _split_first_char(regex)
+            if ch is None:
+                unanchored_regex.append(rest)
+                unanchored.append(i)
+            else:
+                groups.setdefault(ch, []).append(rest)
+                by_char.setdefault(ch, []).append(i)
+
+        branches = [
+            re.escape(ch) + "(?:" + "|".join(f"(?:{r})" for r in rests) + ")"
+            for ch, rests in groups.items()
+        ] + [f"(?:{r})" for r in unanchored_regex]
+        self.gate = _Pattern("|".join(branches) or "(?!)")
+        # Kandidáti podle znaku na pozici; neznámý znak (jen při IGNORECASE)
+        # znamená ověřit všechna slova.
+        self.by_char = {ch: ids + unanchored for ch, ids in by_char.items()}
+        self.all_ids = list(range(len(self.keywords)))
+
+    def first_matches(self, norm_text: str, folded: bool) -> list:
+        """Vrátí první výskyt (re.Match | None) každého klíčového slova."""
+        first = [None] * len(self.keywords)
+        pending = len(first)
+        gate = self.gate.get(folded)
+        pos = 0
+        while pending:
+            m = gate.search(norm_text, pos)
+            if m is None:
+                break
+            p = m.start()
+            for i in self.by_char.get(norm_text[p], self.all_ids):
+                if first[i] is None:
+                    km = self.keywords[i].get(folded).match(norm_text, p)
+                    if km:
+                        first[i] = km
+                        pending -= 1
+            pos = p + 1
+        return first
+
+
+def compile_rules(rules: list[dict] | None = None) -> CompiledRules:
+    return CompiledRules(SIGNAL_RULES if rules is None else rules)
+
+
+_compiled_rules = compile_rules()
+
+
+def reload_rules() -> CompiledRules:
+    """Znovu zkompiluje SIGNAL_RULES (po jejich změně za běhu)."""
+    global _compiled_rules
+    _compiled_rules = compile_rules()
+    return _compiled_rules
+
+
+# Hodnotové signály (hledají se s re.DOTALL přes celý text).
+_FINANCE_RE = _Pattern(
+    r"naklady.{0,200}prevysuji|obnos.{0,80}vybran|nedostatek.{0,60}prostred",
+    re.DOTALL)
+_ZALOHY_RE = _Pattern(
+    r"(?:navyseni|zvyseni|navysenim|zvysenim).{0,120}?(?:zaloh|prispevk).{0,120}?(\d{1,3})\s*%",
+    re.DOTALL)
+_FOND_RE = _Pattern(
+    r"(?:fond[u]? oprav|dlouhodob\w{0,4} zaloh).{0,160}?(\d{1,4})\s*kc\s*/?\s*m",
+    re.DOTALL)
+_VYBOR_RE = _Pattern(r"zvoleni clenove|volb\w{0,4}.{0,40}vybor", re.DOTALL)
+
+
+# ---------------------------------------------------------------------------
+# Sdílený kontext analýzy jednoho dokumentu
+# ---------------------------------------------------------------------------
+
+_LINE_BREAK_RE = re.compile("\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+class AnalyzedText:
+    """Text dokumentu spolu s jeho normalizovanou podobou a mapou indexů.
+
+    detect_signals i analyze_document přijímají místo řetězce i tento objekt,
+    takže se dokument normalizuje jen jednou. Odvozená data (offsety řádků,
+    text malými písmeny, výskyty klíčových slov) se počítají líně při prvním
+    použití; další analyzátory si mohou mezivýsledky uložit do `cache`.
+    """
+
+    def __init__(self, text: str | None):
+        self.text = text or ""
+        self.cache: dict = {}
+
+    @classmethod
+    def of(cls, text: "str | AnalyzedText | None") -> "AnalyzedText":
+        return text if isinstance(text, cls) else cls(text)
+
+    @cached_property
+    def is_blank(self) -> bool:
+        return not self.text.strip()
+
+    @cached_property
+    def _normalized(self):
+        return _normalize_with_map(self.text)
+
+    @property
+    def norm_text(self) -> str:
+        return self._normalized[0]
+
+    @property
+    def index_map(self) -> array:
+        return self._normalized[1]
+
+    @cached_property
+    def folded(self) -> bool:
+        """Zda je nutné hledat s re.IGNORECASE (viz _CASE_FOLD_CHARS)."""
+        return _needs_fold(self.norm_text)
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def line_starts(self) -> array:
+        """Offsety začátků řádků v původním textu (zlomy jako str.splitlines)."""
+        starts = array("I", [0])
+        starts.extend(m.end() for m in _LINE_BREAK_RE.finditer(self.text))
+        return starts
+
+    def line_end(self, pos: int) -> int:
+        """Offset konce řádku (bez znaku zlomu), na kterém leží pozice pos."""
+        starts = self.line_starts
+        i = bisect_right(starts, pos)
+        if i == len(starts):
+            return len(self.text)
+        end = starts[i]
+        return end - 2 if self.text[end - 2:end] == "\r\n" else end - 1
+
+    def orig_index(self, norm_pos: int) -> int:
+        """Pozice v původním textu pro pozici v normalizovaném textu."""
+        return self.index_map[min(norm_pos, len(self.index_map) - 1)]
+
+    def keyword_matches(self, compiled: "CompiledRules") -> list:
+        """První výskyty klíčových slov pravidel (cachované pro daná pravidla)."""
+        key = ("keywords", id(compiled))
+        if key not in self.cache:
+            self.cache[key] = compiled.first_matches(self.norm_text,
+                                                     self.folded)
+        return self.cache[key]
+
+
 # ---------------------------------------------------------------------------
 # Pomocné funkce
 # ---------------------------------------------------------------------------
@@ -216,13 +539,6 @@ def find_context(text: str, keyword: str, radius: int = 220) -> str:
     return " ".join(text[start_o:end_o].split())
 
 
-def _search(pattern: str, norm_text: str, is_regex: bool):
-    pat = _norm(pattern) if not is_regex else _norm(pattern)
-    if not is_regex:
-        pat = re.escape(pat)
-    return re.search(pat, norm_text, re.IGNORECASE)
-
-
 def _context_from_match(text, index_map, m, radius=220):
     start_o = index_map[max(0, m.start() - radius)]
     end_norm = min(len(index_map) - 1, m.end() + radius)
@@ -234,29 +550,31 @@ def _context_from_match(text, index_map, m, radius=220):
 # Hlavní analýza
 # ---------------------------------------------------------------------------
 
-def detect_signals(text: str) -> list[dict]:
+def detect_signals(text: str | AnalyzedText) -> list[dict]:
     """Vrátí seznam signálů seřazený podle priority (kompatibilní se starým API)."""
-    if not text or not text.strip():
+    doc = AnalyzedText.of(text)
+    if doc.is_blank:
         return []
 
-    norm_text, index_map = _normalize_with_map(text)
+    text, norm_text, index_map = doc.text, doc.norm_text, doc.index_map
+    folded = doc.folded
+    compiled = _compiled_rules
+    first = doc.keyword_matches(compiled)
     signals = []
 
-    for rule in SIGNAL_RULES:
-        is_regex = rule.get("regex", False)
+    for rule, kw_ids, action in compiled.entries:
         found = None
         found_kw = None
-        for kw in rule["keywords"]:
-            m = _search(kw, norm_text, is_regex)
-            if m:
-                found, found_kw = m, kw
+        for kw, i in kw_ids:
+            if first[i]:
+                found, found_kw = first[i], kw
                 break
         if not found:
             continue
 
         context = _context_from_match(text, index_map, found)
 
-        if rule["action_words"]:
+        if action is not None:
             proximity = rule.get("proximity")
             if proximity:
                 # Akční slovo musí být do N znaků od klíčového slova.
@@ -265,8 +583,7 @@ def detect_signals(text: str) -> list[dict]:
                 haystack = norm_text[lo:hi]
             else:
                 haystack = _norm(context)
-            if not any(re.search(re.escape(_norm(w)), haystack)
-                       for w in rule["action_words"]):
+            if not action.search(haystack):
                 continue
 
         signals.append({
@@ -283,10 +600,7 @@ def detect_signals(text: str) -> list[dict]:
     # --- Hodnotové signály -------------------------------------------------
 
     # Finanční situace SVJ (náklady převyšují zálohy apod.)
-    m = re.search(
-        r"naklady.{0,200}prevysuji|obnos.{0,80}vybran|nedostatek.{0,60}prostred",
-        norm_text, re.IGNORECASE | re.DOTALL,
-    )
+    m = _FINANCE_RE.get(folded).search(norm_text)
     if m:
         signals.append({
             "type": "financni_situace", "label": "Finanční situace SVJ",
@@ -296,10 +610,7 @@ def detect_signals(text: str) -> list[dict]:
         })
 
     # Zvýšení záloh (x %)
-    m = re.search(
-        r"(?:navyseni|zvyseni|navysenim|zvysenim).{0,120}?(?:zaloh|prispevk).{0,120}?(\d{1,3})\s*%",
-        norm_text, re.IGNORECASE | re.DOTALL,
-    )
+    m = _ZALOHY_RE.get(folded).search(norm_text)
     if m:
         signals.append({
             "type": "zvyseni_zaloh", "label": "Zvýšení záloh",
@@ -309,10 +620,7 @@ def detect_signals(text: str) -> list[dict]:
         })
 
     # Fond oprav / dlouhodobé zálohy (x Kč/m²)
-    m = re.search(
-        r"(?:fond[u]? oprav|dlouhodob\w{0,4} zaloh).{0,160}?(\d{1,4})\s*kc\s*/?\s*m",
-        norm_text, re.IGNORECASE | re.DOTALL,
-    )
+    m = _FOND_RE.get(folded).search(norm_text)
     if m:
         signals.append({
             "type": "fond_oprav", "label": "Fond oprav / dlouhodobé zálohy",
@@ -322,8 +630,7 @@ def detect_signals(text: str) -> list[dict]:
         })
 
     # Nově zvolený výbor (kontaktní příležitost)
-    m = re.search(r"zvoleni clenove|volb\w{0,4}.{0,40}vybor", norm_text,
-                  re.IGNORECASE | re.DOTALL)
+    m = _VYBOR_RE.get(folded).search(norm_text)
     if m:
         signals.append({
             "type": "volba_vyboru", "label": "Volba výboru",
@@ -0,0 +1,168 @@
+"""Persistentní cache překladu IČO -> subjektId webového rejstříku.
+
+Bez subjektId nejde otevřít Sbírku listin a jeho vyhledání stojí jeden
+požadavek na rejstřík (a pauzu plánovače klienta). Výsledek se proto
+ukládá do tabulky subjekt_ids, kterou čte synchronizace i Prvotkář
+(GET /api/subjekt-ids/{ico}). Nalezené subjektId platí trvale, negativní
+záznam (IČO v rejstříku není) RADAR_SUBJEKT_ID_MISS_DAYS dní (výchozí 30)
+— subjekt mohl být mezitím zapsán.
+
+Hromadné předvyplnění (mimo denní synchronizaci, např. po importu):
+
+  python -m app.subjekt_ids --prefill --limit 500
+  python -m app.subjekt_ids --stats
+"""
+
+import argparse
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .models import Subject, SubjektIdCache
+
+MISS_DAYS = int(os.getenv("RADAR_SUBJEKT_ID_MISS_DAYS", "30"))
+
+
+def normalize(ico: str) -> str:
+    return re.sub(r"\D", "", ico).lstrip("0") or ico
+
+
+def lookup_many(db: Session, icos) -> dict[str, str | None]:
+    """Platné záznamy: IČO -> subjektId (None = negativní záznam).
+
+    IČO bez záznamu nebo s prošlým negativním záznamem ve výsledku nejsou.
+    """
+    icos = sorted({normalize(i) for i in icos if i})
+    miss_since = datetime.utcnow() - timedelta(days=MISS_DAYS)
+    found = {}
+    for start in range(0, len(icos), 500):
+        for row in db.scalars(select(SubjektIdCache).where(
+                SubjektIdCache.ico.in_(icos[start:start + 500]))):
+            if row.subjekt_id or row.checked_at >= miss_since:
+                found[row.ico] = row.subjekt_id
+    return found
+
+
+def store(db: Session, ico: str, subjekt_id: str | None) -> None:
+    """Uloží výsledek vyhledání (None = nenalezeno); necommituje."""
+    db.merge(SubjektIdCache(ico=normalize(ico), subjekt_id=subjekt_id,
+                            checked_at=datetime.utcnow()))
+
+
+def resolve(db: Session, client, ico: str) -> str:
+    """subjektId z cache, jinak z rejstříku (uloží se výsledek i neúspěch).
+
+    LookupError, pokud IČO v rejstříku není (i podle negativního záznamu).
+    """
+    cached = lookup_many(db, [ico])
+    if normalize(ico) in cached:
+        if cached[normalize(ico)] is None:
+            raise LookupError(f"Subjekt s IČO {ico} není v rejstříku "
+                              f"(ověřeno v posledních {MISS_DAYS} dnech).")
+        return cached[normalize(ico)]
+    try:
+        subjekt_id = client.find_subjekt_id(normalize(ico))
+    except LookupError:
+        store(db, ico, None)
+        db.commit()
+        raise
+    store(db, ico, subjekt_id)
+    db.commit()
+    return subjekt_id
+
+
+def prefill(db: Session, client=None, limit: int | None = None) -> dict:
+    """Hromadně doplní cache a Subject.justice_subjekt_id.
+
+    Nejdřív bez sítě převezme subjektId uložená u subjektů, pak dohledá
+    subjekty bez subjektId a bez platného záznamu (nejnovější zápisy
+    napřed). Commituje po každém subjektu, přerušení nic neztratí.
+    """
+    from .listiny import ListinyClient
+
+    out = {"seeded": 0, "found": 0, "missing": 0, "errors": 0}
+    known = db.execute(select(Subject.ico, Subject.justice_subjekt_id)
+                       .where(Subject.justice_subjekt_id.isnot(None))).all()
+    cached = lookup_many(db, [ico for ico, _ in known])
+    for ico, subjekt_id in known:
+        if cached.get(normalize(ico)) != subjekt_id:
+            store(db, ico, subjekt_id)
+            out["seeded"] += 1
+    db.commit()
+
+    pending = db.scalars(
+        select(Subject).where(Subject.justice_subjekt_id.is_(None))
+        .order_by(Subject.last_entry_date.desc().nulls_last(), Subject.id)
+    ).all()
+    cached = lookup_many(db, [s.ico for s in pending])
+    for subject in pending:
+        subjekt_id = cached.get(normalize(subject.ico))
+        if subjekt_id:
+            subject.justice_subjekt_id = subjekt_id
+            db.commit()
+    pending = [s for s in pending if normalize(s.ico) not in cached]
+    if limit is not None:
+        pending = pending[:limit]
+
+    if pending and client is None:
+        client = ListinyClient()
+    for n, subject in enumerate(pending, 1):
+        try:
+            subject.justice_subjekt_id = resolve(db, client, subject.ico)
+            db.commit()
+            out["found"] += 1
+        except LookupError:
+            out["missing"] += 1
+        except Exception as exc:
+            db.rollback()
+            print(f"  ! {subject.ico}: {exc}")
+            out["errors"] += 1
+        if n % 50 == 0:
+            print(f"  {n}/{len(pending)}: nalezeno {out['found']}, "
+                  f"nenalezeno {out['missing']}")
+    return out
+
+
+def stats(db: Session) -> dict:
+    found = db.scalar(select(func.count()).select_from(SubjektIdCache)
+                      .where(SubjektIdCache.subjekt_id.isnot(None)))
+    missing = db.scalar(select(func.count()).select_from(SubjektIdCache)
+                        .where(SubjektIdCache.subjekt_id.is_(None)))
+    unresolved = db.scalar(select(func.count(Subject.id))
+                           .where(Subject.justice_subjekt_id.is_(None)))
+    return {"found": found, "missing": missing,
+            "subjects_without_id": unresolved}
+
+
+def main():
+    from .db import init_db, SessionLocal
+
+    parser = argparse.ArgumentParser(description="Cache IČO -> subjektId")
+    parser.add_argument("--prefill", action="store_true",
+                        help="Dohledat subjektId subjektů, které ho nemají")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Max. počet vyhledání v rejstříku")
+    parser.add_argument("--stats", action="store_true", help="Stav cache")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.prefill:
+            out = prefill(db, limit=args.limit)
+            print(f"\nPřevzato: {out['seeded']}, nalezeno: {out['found']}, "
+                  f"nenalezeno: {out['missing']}, chyb: {out['errors']}")
+        else:
+            st = stats(db)
+            print(f"subjektId: {st['found']} nalezených, {st['missing']} "
+                  f"nenalezených; subjektů bez ID: "
+                  f"{st['subjects_without_id']}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
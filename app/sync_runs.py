@@ -0,0 +1,275 @@
+"""Persistentní běhy hromadné synchronizace (tabulky sync_runs a
+sync_run_subjects).
+
+Běh se při spuštění zapíše i s naplánovanými SVJ. Pipeline zapisuje
+výsledek každého SVJ ve stejné transakci jako jeho dokumenty a rotaci,
+takže po pádu procesu (deploy, restart instance na Renderu) je v tabulce
+přesně to, co je opravdu hotové.
+
+Proces, který běh zpracovává, obnovuje heartbeat_at (a průběh fází)
+každých RADAR_SYNC_HEARTBEAT sekund (výchozí 15). Běh ve stavu running
+bez znamení déle než RADAR_SYNC_STALE sekund (výchozí 120) patří procesu,
+který skončil: převezme ho claim_stale a projdou se jen SVJ, která v něm
+ještě hotová nejsou.
+
+Aby SVJ, které proces spolehlivě shodí (OOM při OCR), neuvázlo běh ve
+smyčce pád → převzetí → pád, označí se při každém dalším převzetí první
+nehotové SVJ jako failed a běh převzatý víc než RADAR_SYNC_MAX_RESUMES
+krát (výchozí 3) se ukončí chybou.
+
+Heartbeat drží běh jen, dokud se hýbe: když se za RADAR_SYNC_STALL sekund
+(výchozí 1800) nezmění počty fází ani progress, přestane ho obnovovat,
+takže zaseknutý proces běh neblokuje a claim_stale ho převezme.
+
+/api/sync/status čte stav z tabulek (status), takže všechny workery
+i procesy vidí totéž.
+"""
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Subject, SyncRun, SyncRunSubject
+
+HEARTBEAT_SECONDS = float(os.getenv("RADAR_SYNC_HEARTBEAT", "15"))
+STALE_SECONDS = float(os.getenv("RADAR_SYNC_STALE", "120"))
+MAX_RESUMES = int(os.getenv("RADAR_SYNC_MAX_RESUMES", "3"))
+STALL_SECONDS = float(os.getenv("RADAR_SYNC_STALL", "1800"))
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def create(db: Session, subject_ids: list[int], params: dict,
+           key: str | None = None) -> SyncRun | None:
+    """Založí běh s naplánovanými SVJ (v pořadí zpracování) a commitne.
+
+    None, pokud běh se stejným klíčem už existuje (založil ho jiný worker).
+    """
+    run = SyncRun(key=key, params=params, owner=OWNER, progress="startuji…")
+    db.add(run)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.add_all(SyncRunSubject(run_id=run.id, subject_id=subject_id,
+                              position=n)
+               for n, subject_id in enumerate(subject_ids, 1))
+    db.commit()
+    return run
+
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+
+
+def active(db: Session) -> SyncRun | None:
+    """Běh, který právě některý proces zpracovává (živý heartbeat)."""
+    return db.scalar(select(SyncRun).where(
+        SyncRun.status == "running",
+        SyncRun.heartbeat_at >= _stale_before()).order_by(SyncRun.id))
+
+
+def unfinished(db: Session) -> list[SyncRun]:
+    return db.scalars(select(SyncRun).where(SyncRun.status == "running")
+                      .order_by(SyncRun.id)).all()
+
+
+def claim_stale(db: Session) -> SyncRun | None:
+    """Převezme nejstarší běh, jehož proces přestal dávat znamení.
+
+    Podmíněný UPDATE: kdo běh převezme, obnoví jeho heartbeat, takže
+    z více procesů, které se o něj přihlásí zároveň, ho dostane jen jeden.
+    Opakovaně přerušený běh přeskočí SVJ, u kterého nejspíš padá, a po
+    MAX_RESUMES převzetích se místo pokračování ukončí chybou.
+    """
+    for run_id in db.scalars(select(SyncRun.id).where(
+            SyncRun.status == "running",
+            SyncRun.heartbeat_at < _stale_before()).order_by(SyncRun.id)).all():
+        claimed = db.execute(
+            update(SyncRun)
+            .where(SyncRun.id == run_id, SyncRun.status == "running",
+                   SyncRun.heartbeat_at < _stale_before())
+            .values(owner=OWNER, heartbeat_at=datetime.utcnow(),
+                    resumed=SyncRun.resumed + 1)).rowcount
+        db.commit()
+        if not claimed:
+            continue
+        run = db.get(SyncRun, run_id, populate_existing=True)
+        if run.resumed > MAX_RESUMES:
+            finish(db, run_id, "error", "přerušeno",
+                   error=f"běh přerušen {run.resumed}×, nepokračuji")
+            continue
+        if run.resumed > 1:
+            _fail_first_pending(db, run_id)
+        return run
+    return None
+
+
+def _fail_first_pending(db: Session, run_id: int) -> None:
+    """Označí první nehotové SVJ opakovaně přerušeného běhu jako failed."""
+    subject_id = db.scalar(
+        select(SyncRunSubject.subject_id)
+        .where(SyncRunSubject.run_id == run_id,
+               SyncRunSubject.status == "pending")
+        .order_by(SyncRunSubject.position))
+    if subject_id is None:
+        return
+    record(db, run_id, subject_id, "failed",
+           error="zpracování opakovaně přerušeno")
+    db.commit()
+
+
+def pending_subjects(db: Session, run_id: int) -> list[Subject]:
+    """Naplánovaná SVJ běhu, která ještě nejsou hotová, v pořadí plánu."""
+    return db.scalars(
+        select(Subject).join(SyncRunSubject,
+                             SyncRunSubject.subject_id == Subject.id)
+        .where(SyncRunSubject.run_id == run_id,
+               SyncRunSubject.status == "pending")
+        .order_by(SyncRunSubject.position)).all()
+
+
+def record(db: Session, run_id: int, subject_id: int, status: str, *,
+           new_documents: int = 0, hot_found: int = 0,
+           unchanged: bool = False, error: str | None = None) -> None:
+    """Zapíše výsledek SVJ v běhu (done / failed); necommituje —
+    commit s daty subjektu je checkpoint."""
+    row = db.get(SyncRunSubject, (run_id, subject_id))
+    if row is None:
+        return
+    row.status = status
+    row.new_documents = new_documents
+    row.hot_found = hot_found
+    row.unchanged = unchanged
+    row.error = error
+    row.finished_at = datetime.utcnow()
+
+
+def touch(db: Session, run_id: int, **values) -> None:
+    """Obnoví heartbeat běhu (a případně progress/stages) a commitne."""
+    db.execute(update(SyncRun).where(SyncRun.id == run_id)
+               .values(heartbeat_at=datetime.utcnow(), **values))
+    db.commit()
+
+
+def finish(db: Session, run_id: int, status: str, progress: str,
+           error: str | None = None, stages: dict | None = None) -> None:
+    values = {"status": status, "progress": progress, "error": error,
+              "finished_at": datetime.utcnow()}
+    if stages is not None:
+        values["stages"] = stages
+    touch(db, run_id, **values)
+
+
+class Heartbeat:
+    """Vlákno, které za běhu pipeline obnovuje heartbeat a průběh fází.
+
+    Píše vlastní session (pipeline drží svou v jiném vlákně). Když se
+    počty fází ani progress nezmění déle než stall sekund, heartbeat
+    vynechá — běh pak vyprší a převezme ho jiný proces.
+    """
+
+    def __init__(self, session_factory, run_id: int, state: dict,
+                 interval: float = HEARTBEAT_SECONDS,
+                 stall: float = STALL_SECONDS):
+        self.session_factory = session_factory
+        self.run_id = run_id
+        self.state = state
+        self.interval = interval
+        self.stall = stall
+        self._mark = None
+        self._moved = time.monotonic()
+        self.stalled = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True,
+                                        name="sync-heartbeat")
+
+    def _progressing(self) -> bool:
+        stages = self.state.get("stages") or {}
+        mark = (self.state.get("progress"),
+                sorted((name, c.get("done"), c.get("errors"))
+                       for name, c in stages.items()))
+        if mark != self._mark:
+            self._mark = mark
+            self._moved = time.monotonic()
+        return time.monotonic() - self._moved <= self.stall
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            if not self._progressing():
+                if not self.stalled:
+                    self.stalled = True
+                    print(f"  ! běh {self.run_id} se {self.stall:.0f} s "
+                          f"nehýbe, heartbeat pozastaven")
+                continue
+            self.stalled = False
+            try:
+                with self.session_factory() as db:
+                    touch(db, self.run_id,
+                          stages=dict(self.state.get("stages") or {}))
+            except Exception as exc:  # výpadek DB nesmí shodit synchronizaci
+                print(f"  ! heartbeat běhu {self.run_id}: {exc}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def counts(db: Session, run_id: int) -> dict:
+    """Počty SVJ a nálezů běhu sečtené z výsledků jednotlivých SVJ."""
+    s = SyncRunSubject
+    row = db.execute(select(
+        func.count(),
+        func.sum(case((s.status != "pending", 1), else_=0)),
+        func.sum(case((s.status == "failed", 1), else_=0)),
+        func.sum(s.new_documents), func.sum(s.hot_found),
+        func.sum(case((s.unchanged, 1), else_=0)),
+    ).where(s.run_id == run_id)).one()
+    planned, processed, failed, new_docs, hot, unchanged = (v or 0
+                                                            for v in row)
+    return {"planned_subjects": planned, "processed_subjects": processed,
+            "failed_subjects": failed, "new_documents": new_docs,
+            "hot_found": hot, "unchanged_subjects": unchanged}
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def status(db: Session) -> dict:
+    """Stav posledního běhu ve tvaru SYNC_STATE (+ run_id, počty SVJ).
+
+    stale = běh patří procesu, který skončil, a čeká na převzetí.
+    """
+    run = db.scalar(select(SyncRun).order_by(SyncRun.id.desc()))
+    if run is None:
+        return {"running": False, "started_at": None, "finished_at": None,
+                "progress": "", "processed_subjects": 0, "new_documents": 0,
+                "hot_found": 0, "unchanged_subjects": 0, "error": None,
+                "stages": {}, "run_id": None}
+    totals = counts(db, run.id)
+    running = run.status == "running"
+    return {
+        "running": running,
+        "started_at": _iso(run.started_at),
+        "finished_at": _iso(run.finished_at),
+        "progress": run.progress or (f"{totals['processed_subjects']}/"
+                                     f"{totals['planned_subjects']} SVJ"),
+        **totals,
+        "error": run.error,
+        "stages": run.stages or {},
+        "run_id": run.id,
+        "resumed": run.resumed,
+        "stale": running and run.heartbeat_at < _stale_before(),
+    }
@@ -0,0 +1,176 @@
+"""Obsahově adresovaná cache extrahovaného textu PDF.
+
+Klíč = SHA-256 bajtů PDF + parametry extrakce (jazyk a DPI OCR, verze
+Tesseractu, pypdf a pravidel klasifikace stránek). Stejné PDF nahrané znovu (upload, opakovaný sync,
+--pdf) tak stojí jeden hash a jedno čtení souboru místo minut OCR.
+Změna verze OCR enginu dá jiný klíč, staré záznamy časem vytlačí LRU.
+
+Záznamy leží v data/text_cache/<2 znaky>/<klíč>.json.gz. Přístup
+obnovuje mtime souboru; při překročení limitu velikosti se mažou
+nejdéle nepoužité záznamy.
+
+Nastavení (proměnné prostředí):
+  RADAR_TEXT_CACHE      0 = cache vypnutá (výchozí 1)
+  RADAR_TEXT_CACHE_DIR  adresář cache (výchozí data/text_cache)
+  RADAR_TEXT_CACHE_MB   limit velikosti v MB (výchozí 500)
+
+Použití z příkazové řádky:
+
+  python -m app.text_cache --stats
+  python -m app.text_cache --prune --max-mb 200
+  python -m app.text_cache --clear
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from functools import cache
+from pathlib import Path
+
+ENABLED = os.getenv("RADAR_TEXT_CACHE", "1") != "0"
+CACHE_DIR = Path(os.getenv("RADAR_TEXT_CACHE_DIR", "data/text_cache"))
+MAX_BYTES = int(float(os.getenv("RADAR_TEXT_CACHE_MB", 500)) * 1024 * 1024)
+
+_lock = threading.Lock()
+# Odhad velikosti cache; None = ještě nespočítáno (první put projde disk).
+_size: int | None = None
+
+
+@cache
+def engine_version() -> str:
+    """Verze extrakčních nástrojů, které ovlivňují výsledný text."""
+    import pypdf
+    from .pdf_extract import EXTRACTION_SCHEME
+    try:
+        from .ocr import _find_tool
+        out = subprocess.run([_find_tool("tesseract"), "--version"],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             timeout=10)
+        first = out.stdout.decode("utf-8", errors="replace").splitlines()
+        tesseract = first[0].strip() if first else "tesseract ?"
+    except (RuntimeError, OSError, subprocess.SubprocessError):
+        tesseract = "tesseract -"
+    return f"{tesseract}; pypdf {pypdf.__version__}; {EXTRACTION_SCHEME}"
+
+
+def file_digest(path: str | Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def cache_key(pdf_path: str | Path, lang: str = "ces", dpi: int = 300) -> str:
+    params = f"{lang}|{dpi}|{engine_version()}"
+    return hashlib.sha256(
+        f"{file_digest(pdf_path)}|{params}".encode()).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json.gz"
+
+
+def get(key: str) -> dict | None:
+    """Vrátí uložený výsledek extrakce nebo None; zásah obnoví pozici v LRU."""
+    path = _path(key)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return entry["result"]
+
+
+def put(key: str, result: dict) -> None:
+    """Uloží záznam (atomicky přes dočasný soubor) a hlídá limit velikosti."""
+    global _size
+    path = _path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt",
+                                                   encoding="utf-8") as f:
+            json.dump({"result": result, "engine": engine_version(),
+                       "created": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    with _lock:
+        if _size is None:
+            _size = stats()["bytes"]
+        else:
+            _size += path.stat().st_size
+        over = _size > MAX_BYTES
+    if over:
+        prune(MAX_BYTES)
+
+
+def _entries() -> list[tuple[os.stat_result, Path]]:
+    entries = []
+    for path in CACHE_DIR.glob("*/*.json.gz"):
+        try:
+            entries.append((path.stat(), path))
+        except FileNotFoundError:  # mezitím smazal jiný proces
+            pass
+    return entries
+
+
+def stats() -> dict:
+    entries = _entries()
+    return {"entries": len(entries),
+            "bytes": sum(st.st_size for st, _ in entries),
+            "max_bytes": MAX_BYTES, "dir": str(CACHE_DIR)}
+
+
+def prune(max_bytes: int = MAX_BYTES) -> dict:
+    """Smaže nejdéle nepoužité záznamy, dokud cache nepřesahuje max_bytes."""
+    global _size
+    with _lock:
+        entries = sorted(_entries(), key=lambda e: e[0].st_mtime)
+        total = sum(st.st_size for st, _ in entries)
+        removed = freed = 0
+        for st, path in entries:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+            freed += st.st_size
+            removed += 1
+        _size = total
+    return {"removed": removed, "freed_bytes": freed, "bytes": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache extrahovaného textu PDF")
+    parser.add_argument("--stats", action="store_true", help="Velikost cache")
+    parser.add_argument("--prune", action="store_true",
+                        help="Vytlačit nejdéle nepoužité záznamy nad limit")
+    parser.add_argument("--max-mb", type=float, default=None,
+                        help="Limit pro --prune (výchozí RADAR_TEXT_CACHE_MB)")
+    parser.add_argument("--clear", action="store_true", help="Smazat vše")
+    args = parser.parse_args()
+
+    if args.prune or args.clear:
+        limit = 0 if args.clear else (
+            int(args.max_mb * 1024 * 1024) if args.max_mb is not None
+            else MAX_BYTES)
+        out = prune(limit)
+        print(f"Smazáno záznamů: {out['removed']}, uvolněno "
+              f"{out['freed_bytes'] / 1024 / 1024:.1f} MB, zbývá "
+              f"{out['bytes'] / 1024 / 1024:.1f} MB")
+    else:
+        st = stats()
+        print(f"{st['dir']}: {st['entries']} záznamů, "
+              f"{st['bytes'] / 1024 / 1024:.1f} / "
+              f"{st['max_bytes'] / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,10 @@ from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-import sqlite3, io, os, asyncio as _asyncio, time
+from fastapi.concurrency import run_in_threadpool
+import sqlite3, io, os, re, json, asyncio as _asyncio, time, queue, threading, urllib.parse
+from collections import OrderedDict
+from contextlib import contextmanager
 import httpx
 from typing import Optional
 from openpyxl import Workbook
@@ -15,6 +18,8 @@ from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 import uvicorn
 
+import sync_ares
+
 app = FastAPI(title="Prvotkář 3.2 API")
 
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
@@ -27,39 +32,309 @@ async def root():
 DB_FILE = "prvotkar.db"
 
 def _migrate_db():
-    """Doplní sloupec okres do starší databáze (jednorázově)."""
+    """Doplní sloupec okres a index pro stránkování do starší databáze (jednorázově)
+    a přepne ji do režimu WAL (čtení souběžně se sync_ares.py)."""
     if os.path.exists(DB_FILE):
         conn = sqlite3.connect(DB_FILE)
         try:
+            conn.execute("PRAGMA journal_mode=WAL")
             cols = {r[1] for r in conn.execute("PRAGMA table_info(subjekty)")}
             if "okres" not in cols:
                 conn.execute("ALTER TABLE subjekty ADD COLUMN okres TEXT")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_okres ON subjekty(okres)")
-                conn.commit()
+            # Pokrývající index pro /api/svj: filtr typ + obec, řazení nazev, ico.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_typ_obec_nazev "
+                         "ON subjekty(typ, obec, nazev, ico)")
+            # Fulltext a počty v obcích (první start po aktualizaci je naplní).
+            sync_ares.zajisti_vyhledavani(conn)
+            conn.commit()
         finally:
             conn.close()
 _migrate_db()
 
 # ── Cache pro VR osoby (24h) ──────────────────────────────────────────────────
-_vr_cache: dict = {}   # ico -> (timestamp, data)
-VR_CACHE_TTL = 86400   # 24 hodin
+# LRU s omezenou velikostí. Čerstvý záznam (do VR_CACHE_TTL) se vrátí hned,
+# zastaralý (ještě VR_CACHE_STALE) se vrátí taky a na pozadí se obnoví,
+# starší se stahuje znovu. Souběžné dotazy na stejné IČO sdílí jedno volání
+# ARES. Záznamy se ukládají i do SQLite (VR_CACHE_DB, prázdné = jen paměť),
+# takže přežijí restart / deploy.
+VR_CACHE_TTL   = 86400   # 24 hodin
+VR_CACHE_STALE = int(os.getenv("PRVOTKAR_VR_CACHE_STALE", str(7 * 86400)))
+VR_CACHE_MAX   = int(os.getenv("PRVOTKAR_VR_CACHE_MAX", "5000"))
+VR_CACHE_DB    = os.getenv("PRVOTKAR_VR_CACHE_DB", "prvotkar_cache.db")
+
+class VrCache:
+    def __init__(self, max_size: int, ttl: float, stale: float, db_path: str = ""):
+        self.max_size  = max(1, max_size)
+        self.ttl       = ttl
+        self.stale     = stale
+        self.db_path   = db_path
+        self._data     = OrderedDict()   # ico -> (čas uložení, data), nejstarší první
+        self._inflight = {}              # ico -> asyncio.Task s voláním ARES
+        self._loaded   = not db_path
+        self._loading  = None            # asyncio.Task s načtením z SQLite
+        self.stats     = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                          "evictions": 0, "errors": 0}
+
+    async def get(self, ico: str, fetch, need: str = ""):
+        """Data pro IČO z cache, jinak z await fetch(ico).
+
+        fetch vrací dict, nebo None / výjimku (nic se neuloží, zastaralý
+        záznam zůstává). Vrací data, nebo None, když se je získat nepovedlo.
+        need: klíč, který záznam musí mít (jinak se stáhne znovu).
+        """
+        if not self._loaded:
+            await self.load()
+        entry = self._data.get(ico)
+        if entry and need and need not in entry[1]:
+            entry = None
+        if entry:
+            age = time.time() - entry[0]
+            if age < self.ttl + self.stale:
+                self._data.move_to_end(ico)
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                else:
+                    self.stats["stale_hits"] += 1
+                    self._refresh(ico, fetch)
+                return entry[1]
+        self.stats["coalesced" if ico in self._inflight else "misses"] += 1
+        # shield: zrušený požadavek (klient odešel) nezruší sdílené volání
+        return await _asyncio.shield(self._refresh(ico, fetch))
+
+    def _refresh(self, ico: str, fetch):
+        task = self._inflight.get(ico)
+        if task is None:
+            task = self._inflight[ico] = _asyncio.create_task(self._fetch(ico, fetch))
+        return task
+
+    async def _fetch(self, ico: str, fetch):
+        try:
+            data = await fetch(ico)
+        except Exception:
+            data = None
+        try:
+            if data is None:
+                self.stats["errors"] += 1
+                return None
+            saved = time.time()
+            self._put(ico, saved, data)
+            if self.db_path:
+                await run_in_threadpool(self._store, ico, saved, data)
+            return data
+        finally:
+            self._inflight.pop(ico, None)
+
+    def _put(self, ico: str, saved: float, data: dict):
+        self._data[ico] = (saved, data)
+        self._data.move_to_end(ico)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ── Perzistence (tabulka vr_cache) ──
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("""CREATE TABLE IF NOT EXISTS vr_cache (
+            ico TEXT PRIMARY KEY, ulozeno REAL NOT NULL, data TEXT NOT NULL)""")
+        return conn
+
+    async def load(self):
+        """Načte uložené záznamy ve vlákně (SQLite neblokuje event loop);
+        souběžné dotazy čekají na jedno načtení."""
+        if self._loading is None:
+            self._loading = _asyncio.ensure_future(run_in_threadpool(self._read))
+        rows = await _asyncio.shield(self._loading)
+        if self._loaded:
+            return
+        self._loaded = True
+        for ico, saved, data in reversed(rows):   # nejnovější první na začátek
+            if ico not in self._data:
+                self._data[ico] = (saved, data)
+                self._data.move_to_end(ico, last=False)
+
+    def _read(self):
+        """Uložené záznamy (nejnovějších max_size), prošlé smaže."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM vr_cache WHERE ulozeno < ?",
+                             [time.time() - self.ttl - self.stale])
+                conn.execute("""DELETE FROM vr_cache WHERE ico NOT IN (
+                    SELECT ico FROM vr_cache ORDER BY ulozeno DESC LIMIT ?)""", [self.max_size])
+                conn.commit()
+                rows = conn.execute("SELECT ico, ulozeno, data FROM vr_cache ORDER BY ulozeno").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return []
+        return [(ico, saved, json.loads(data)) for ico, saved, data in rows]
+
+    def _store(self, ico: str, saved: float, data: dict):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT OR REPLACE INTO vr_cache (ico, ulozeno, data) VALUES (?, ?, ?)",
+                             [ico, saved, json.dumps(data, ensure_ascii=False)])
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def info(self) -> dict:
+        return {**self.stats, "size": len(self._data), "max": self.max_size,
+                "inflight": len(self._inflight), "persistent": bool(self.db_path)}
+
+_vr_cache = VrCache(VR_CACHE_MAX, VR_CACHE_TTL, VR_CACHE_STALE, VR_CACHE_DB)
+
+# subjektId (or.justice.cz) ze sdílené cache RBD Radaru — bez vlastního
+# dotazu do rejstříku. Bez RADAR_URL se subjektId hledá přímo.
+RADAR_URL = os.getenv("RADAR_URL", "").rstrip("/")
+
+async def _radar_subjekt_id(client, ico: str):
+    """(známo, subjektId) z Radaru; známo=False -> hledat v rejstříku."""
+    if not RADAR_URL:
+        return False, None
+    try:
+        r = await client.get(f"{RADAR_URL}/api/subjekt-ids/{ico}", timeout=3)
+        if r.status_code == 200:
+            return True, r.json().get("subjektId")
+    except Exception:
+        pass
+    return False, None
+
+# ── Pool read-only spojení ───────────────────────────────────────────────────
+# Endpointy s dotazy do DB jsou obyčejné def: FastAPI je spouští ve svém
+# threadpoolu, takže dotazy neblokují event loop ani sebe navzájem.
+# Spojení jsou jen pro čtení (mode=ro + query_only) a znovu se používají;
+# v režimu WAL čtou souběžně se zápisem sync_ares.py (každý dotaz vidí
+# poslední commit, zápis na čtenáře nečeká).
+DB_POOL_SIZE  = int(os.getenv("PRVOTKAR_DB_POOL", "4"))
+DB_MMAP_SIZE  = int(os.getenv("PRVOTKAR_DB_MMAP_MB", "256")) * 1024 * 1024
+DB_CACHE_KB   = int(os.getenv("PRVOTKAR_DB_CACHE_KB", "16384"))
+
+class _ReadPool:
+    def __init__(self, path: str, size: int):
+        self.path  = path
+        self._idle = queue.LifoQueue()
+        self._free = threading.BoundedSemaphore(max(1, size))
+
+    def _connect(self):
+        uri  = "file:" + urllib.parse.quote(os.path.abspath(self.path)) + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_KB}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._free.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            broken = False
+            try:
+                yield conn
+            except sqlite3.Error:
+                broken = True
+                raise
+            finally:
+                # Po chybě SQLite se spojení do poolu nevrací.
+                if broken:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._free.release()
 
-def get_db():
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+_pool: Optional[_ReadPool] = None
+_pool_lock = threading.Lock()
+
+@contextmanager
+def read_db():
+    """Spojení z poolu pro čtení (with read_db() as conn: …)."""
+    global _pool
     if not os.path.exists(DB_FILE):
         raise HTTPException(
             status_code=503,
             detail="Databáze nenalezena. Spusť nejdřív: python3 sync_ares.py"
         )
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_FILE:
+            if _pool is not None:
+                _pool.close()
+            _pool = _ReadPool(DB_FILE, DB_POOL_SIZE)
+        pool = _pool
+    with pool.connection() as conn:
+        yield conn
 
 def row_to_dict(row):
     return dict(row)
 
-def obec_filter(obec: str):
-    """Vrátí SQL fragment a params pro hledání obce (přesná shoda + prefix-)."""
-    return "(obec = ? OR obec LIKE ? OR obec LIKE ?)", [obec, obec + "-%", obec + " %"]
+# ── Cache odvozená z DB ──────────────────────────────────────────────────────
+# Platí, dokud se nezmění DB: počítadlo změn v hlavičce souboru (zvýší ho
+# každý commit) a velikost a čas změny souborů prvotkar.db a prvotkar.db-wal.
+def _db_stamp():
+    stamp = []
+    try:
+        with open(DB_FILE, "rb") as f:
+            stamp.append(f.read(28)[24:])
+    except OSError:
+        stamp.append(None)
+    for path in (DB_FILE, DB_FILE + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+_obce_names = (None, [])   # (razítko DB, názvy obcí)
+_count_cache: dict = {}    # (filtry, params) -> (razítko DB, COUNT(*))
+COUNT_CACHE_MAX = 2000
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _obce(conn):
+    global _obce_names
+    stamp = _db_stamp()
+    if _obce_names[0] != stamp:
+        names = [r[0] for r in conn.execute("SELECT DISTINCT obec FROM obce_pocty")]
+        _obce_names = (stamp, names)
+    return _obce_names[1]
+
+def obec_filter(conn, obec: str):
+    """Vrátí SQL fragment a params pro hledání obce (přesná shoda + prefix „X-“, „X “).
+
+    Odpovídající názvy obcí se dohledají předem (jako LIKE: velikost
+    písmen ASCII nerozhoduje), filtr je pak obec IN (…) a dotaz jde
+    po indexu místo LIKE přes celou tabulku.
+    """
+    prefixes = tuple((obec + sep).translate(_ASCII_LOWER) for sep in ("-", " "))
+    names = [n for n in _obce(conn)
+             if n == obec or n.translate(_ASCII_LOWER).startswith(prefixes)]
+    return f"obec IN ({', '.join('?' * len(names))})", names
+
+def _count(conn, filters: str, params: list) -> int:
+    """COUNT(*) pro kombinaci filtrů, cachovaný do další změny DB."""
+    key = (filters, tuple(params))
+    stamp = _db_stamp()
+    cached = _count_cache.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    n = conn.execute(f"SELECT COUNT(*) FROM subjekty WHERE {filters}", params).fetchone()[0]
+    if len(_count_cache) >= COUNT_CACHE_MAX:
+        _count_cache.clear()
+    _count_cache[key] = (stamp, n)
+    return n
 
 # ===================== ENDPOINTS =====================
 
@@ -73,21 +348,17 @@ async def version():
     return {"version": "3.2", "ok": True}
 
 @app.get("/api/kraje")
-async def get_kraje():
-    conn = get_db()
-    try:
+def get_kraje():
+    with read_db() as conn:
         rows = conn.execute(
             "SELECT DISTINCT kraj, kraj_kod FROM subjekty WHERE kraj IS NOT NULL ORDER BY kraj"
         ).fetchall()
         return [{"nazev": r["kraj"], "kod": r["kraj_kod"]} for r in rows]
-    finally:
-        conn.close()
 
 @app.get("/api/okresy")
-async def get_okresy(kraj: Optional[str] = None):
+def get_okresy(kraj: Optional[str] = None):
     """Seznam okresů (naplní se po novém běhu sync_ares.py)."""
-    conn = get_db()
-    try:
+    with read_db() as conn:
         q = "SELECT okres, COUNT(*) n FROM subjekty WHERE okres IS NOT NULL"
         params = []
         if kraj:
@@ -95,11 +366,9 @@ async def get_okresy(kraj: Optional[str] = None):
             params.append(kraj)
         q += " GROUP BY okres ORDER BY okres"
         return [{"okres": r[0], "pocet": r[1]} for r in conn.execute(q, params)]
-    finally:
-        conn.close()
 
 @app.get("/api/svj")
-async def get_svj(
+def get_svj(
     obec: Optional[str] = Query(None),
     okres: Optional[str] = None,
     ulice: Optional[str] = None,
@@ -110,10 +379,9 @@ async def get_svj(
 ):
     if not obec and not okres:
         raise HTTPException(status_code=400, detail="Zadejte obec nebo okres.")
-    conn = get_db()
-    try:
+    with read_db() as conn:
         if obec:
-            sql_frag, params = obec_filter(obec)
+            sql_frag, params = obec_filter(conn, obec)
         else:
             sql_frag, params = "1=1", []
         params.append(typ)
@@ -127,12 +395,15 @@ async def get_svj(
         if ulice:
             filters += " AND ulice = ?"
             params.append(ulice)
-        all_rows = conn.execute(
-            f"SELECT * FROM subjekty WHERE {filters} ORDER BY nazev",
-            params
+        celkem = _count(conn, filters, params)
+        # Stránka se vybere z indexu (typ, obec, nazev, ico), celé řádky
+        # se čtou jen pro ni.
+        page = conn.execute(
+            f"""SELECT s.* FROM (SELECT rowid AS rid FROM subjekty WHERE {filters}
+                                 ORDER BY nazev, ico LIMIT ? OFFSET ?) p
+                JOIN subjekty s ON s.rowid = p.rid ORDER BY s.nazev, s.ico""",
+            params + [max(pocet, 0), max(start, 0)]
         ).fetchall()
-        celkem = len(all_rows)
-        page = all_rows[start:start + pocet]
 
         subjekty = []
         for r in page:
@@ -156,16 +427,13 @@ async def get_svj(
                 "lng": d.get("lng"),
             })
         return {"celkem": celkem, "subjekty": subjekty}
-    finally:
-        conn.close()
 
 @app.get("/api/obce")
-async def get_obce(q: str = Query(..., min_length=2), typ: Optional[str] = None):
-    """Autocomplete obcí z lokální DB včetně počtu SVJ/BD."""
-    conn = get_db()
-    try:
-        query = """SELECT obec, kraj, COUNT(*) as pocet
-                   FROM subjekty WHERE obec LIKE ? AND obec IS NOT NULL"""
+def get_obce(q: str = Query(..., min_length=2), typ: Optional[str] = None):
+    """Autocomplete obcí z lokální DB včetně počtu SVJ/BD (z předpočítané obce_pocty)."""
+    with read_db() as conn:
+        query = """SELECT obec, MAX(kraj) as kraj, SUM(pocet) as pocet
+                   FROM obce_pocty WHERE obec LIKE ?"""
         params = [f"{q}%"]
         if typ:
             query += " AND typ = ?"
@@ -173,17 +441,12 @@ async def get_obce(q: str = Query(..., min_length=2), typ: Optional[str] = None)
         query += " GROUP BY obec ORDER BY pocet DESC, obec LIMIT 20"
         rows = conn.execute(query, params).fetchall()
         return [{"obec": r["obec"], "kraj": r["kraj"], "pocet": r["pocet"]} for r in rows]
-    finally:
-        conn.close()
 
 @app.get("/api/ico/{ico}")
-async def get_by_ico(ico: str):
+def get_by_ico(ico: str):
     """Vyhledání přímo podle IČO – vrátí základní data bez detailu."""
-    conn = get_db()
-    try:
+    with read_db() as conn:
         row = conn.execute("SELECT * FROM subjekty WHERE ico = ?", [ico]).fetchone()
-    finally:
-        conn.close()
     if not row:
         raise HTTPException(status_code=404, detail="IČO nenalezeno")
     d = row_to_dict(row)
@@ -204,28 +467,37 @@ async def get_by_ico(ico: str):
     }
 
 @app.get("/api/stats")
-async def get_stats():
-    conn = get_db()
-    try:
+def get_stats():
+    with read_db() as conn:
         total   = conn.execute("SELECT COUNT(*) FROM subjekty").fetchone()[0]
         svj     = conn.execute("SELECT COUNT(*) FROM subjekty WHERE typ='svj'").fetchone()[0]
         bd      = conn.execute("SELECT COUNT(*) FROM subjekty WHERE typ='bd'").fetchone()[0]
         updated = conn.execute("SELECT MAX(updated_at) FROM subjekty").fetchone()[0]
         obce    = conn.execute("SELECT COUNT(DISTINCT obec) FROM subjekty").fetchone()[0]
         return {"celkem": total, "svj": svj, "bd": bd, "obce": obce, "posledni_sync": updated}
-    finally:
-        conn.close()
+
+_WORD_RE = re.compile(r"\w+")
+
+def fts_query(q: str) -> str:
+    """Dotaz FTS5 ze vstupu uživatele: slova v uvozovkách jako prefixy ("x"* "y"*)."""
+    return " ".join('"' + w + '"*' for w in _WORD_RE.findall(q))
 
 @app.get("/api/hledat")
-async def hledat(q: str = Query(..., min_length=2), typ: Optional[str] = "svj", limit: int = 30):
-    """Fulltext vyhledávání v celé DB podle názvu."""
-    conn = get_db()
-    try:
+def hledat(q: str = Query(..., min_length=2), typ: Optional[str] = "svj", limit: int = 30):
+    """Fulltext vyhledávání v celé DB podle názvu, ulice, obce a IČO.
+
+    Každé slovo dotazu je prefix slova v subjekty_fts (bez ohledu na
+    diakritiku a velikost písmen), musí sedět všechna.
+    """
+    match = fts_query(q)
+    if not match:
+        return {"subjekty": [], "celkem": 0}
+    with read_db() as conn:
         rows = conn.execute(
-            """SELECT * FROM subjekty
-               WHERE (nazev LIKE ? OR ico LIKE ?) AND typ = ?
-               ORDER BY nazev LIMIT ?""",
-            [f"%{q}%", f"%{q}%", typ, limit]
+            """SELECT s.* FROM subjekty_fts f JOIN subjekty s ON s.rowid = f.rowid
+               WHERE subjekty_fts MATCH ? AND s.typ = ?
+               ORDER BY s.nazev LIMIT ?""",
+            [match, typ, limit]
         ).fetchall()
         subjekty = []
         for r in rows:
@@ -242,8 +514,6 @@ async def hledat(q: str = Query(..., min_length=2), typ: Optional[str] = "svj",
                 }
             })
         return {"subjekty": subjekty, "celkem": len(subjekty)}
-    finally:
-        conn.close()
 
 def _parse_osoby_vr(vr_json: dict) -> list:
     osoby = []
@@ -287,14 +557,52 @@ def _parse_osoby_vr(vr_json: dict) -> list:
                 })
     return osoby
 
+async def _fetch_vr(ico: str, subjekt_id: bool = True) -> dict | None:
+    """Osoby a spisová značka z ARES VR a subjektId (Radar / or.justice.cz) pro cache.
+
+    None (do cache nic) při 429/5xx a jiných odpovědích ARES než 200 / 404.
+    Bez subjekt_id se or.justice.cz neptá a záznam klíč subjektId nemá.
+    """
+    out = {"osoby": [], "spisovaZnacka": None}
+    async with httpx.AsyncClient(timeout=15) as client:
+        r = await client.get(
+            f"https://ares.gov.cz/ekonomicke-subjekty-v-be/rest/ekonomicke-subjekty-vr/{ico}"
+        )
+        if r.status_code not in (200, 404):
+            return None
+        if r.status_code == 200:
+            vr = r.json()
+            osoby = _parse_osoby_vr(vr)
+            for zaznam in vr.get("zaznamy", []):
+                for sz in zaznam.get("spisovaZnacka", []):
+                    oddil  = sz.get("oddil", "")
+                    vlozka = sz.get("vlozka", "")
+                    soud   = sz.get("soud", "")
+                    if oddil and vlozka:
+                        out["spisovaZnacka"] = f"{oddil} {vlozka}/{soud}"
+            out["osoby"] = osoby
+        if not subjekt_id:
+            return out
+
+        known, out["subjektId"] = await _radar_subjekt_id(client, ico)
+        if not known:
+            r2 = await client.get(
+                f"https://or.justice.cz/ias/ui/rejstrik-$firma?ico={ico}&jenPlatne=PLATNE",
+                headers={"User-Agent": "Mozilla/5.0"}, timeout=8
+            )
+            if r2.status_code == 200:
+                ids = re.findall(r'subjektId[=:](\d+)', r2.text)
+                if ids:
+                    out["subjektId"] = ids[0]
+    return out
+
+def _subjekt_row(ico: str):
+    with read_db() as conn:
+        return conn.execute("SELECT * FROM subjekty WHERE ico = ?", [ico]).fetchone()
+
 @app.get("/api/svj/{ico}/detail")
 async def get_svj_detail(ico: str):
-    import re as _re
-    conn = get_db()
-    try:
-        row = conn.execute("SELECT * FROM subjekty WHERE ico = ?", [ico]).fetchone()
-    finally:
-        conn.close()
+    row = await run_in_threadpool(_subjekt_row, ico)
 
     if not row:
         raise HTTPException(status_code=404, detail="Subjekt nenalezen")
@@ -319,56 +627,19 @@ async def get_svj_detail(ico: str):
         "subjektId":    None,
     }
 
-    # ── Cache VR osoby 24h ──
-    cached = _vr_cache.get(ico)
-    if cached and (time.time() - cached[0]) < VR_CACHE_TTL:
-        base["osoby"]        = cached[1].get("osoby", [])
-        base["spisovaZnacka"] = cached[1].get("spisovaZnacka")
-        base["subjektId"]    = cached[1].get("subjektId")
-        return base
-
-    try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            r = await client.get(
-                f"https://ares.gov.cz/ekonomicke-subjekty-v-be/rest/ekonomicke-subjekty-vr/{ico}"
-            )
-            if r.status_code == 200:
-                vr = r.json()
-                osoby = _parse_osoby_vr(vr)
-                for zaznam in vr.get("zaznamy", []):
-                    for sz in zaznam.get("spisovaZnacka", []):
-                        oddil  = sz.get("oddil", "")
-                        vlozka = sz.get("vlozka", "")
-                        soud   = sz.get("soud", "")
-                        if oddil and vlozka:
-                            base["spisovaZnacka"] = f"{oddil} {vlozka}/{soud}"
-                base["osoby"] = osoby
-
-            r2 = await client.get(
-                f"https://or.justice.cz/ias/ui/rejstrik-$firma?ico={ico}&jenPlatne=PLATNE",
-                headers={"User-Agent": "Mozilla/5.0"}, timeout=8
-            )
-            if r2.status_code == 200:
-                ids = _re.findall(r'subjektId[=:](\d+)', r2.text)
-                if ids:
-                    base["subjektId"] = ids[0]
-
-        # Ulož do cache
-        _vr_cache[ico] = (time.time(), {
-            "osoby":        base["osoby"],
-            "spisovaZnacka": base["spisovaZnacka"],
-            "subjektId":    base["subjektId"],
-        })
-    except Exception:
-        pass
+    # need: záznam z exportu subjektId nemá
+    data = await _vr_cache.get(ico, _fetch_vr, need="subjektId")
+    if data:
+        base["osoby"]         = data.get("osoby", [])
+        base["spisovaZnacka"] = data.get("spisovaZnacka")
+        base["subjektId"]     = data.get("subjektId")
 
     return base
 
 @app.get("/api/casti")
-async def get_casti(obec: str = Query(...), typ: Optional[str] = None):
-    conn = get_db()
-    try:
-        sql_frag, params = obec_filter(obec)
+def get_casti(obec: str = Query(...), typ: Optional[str] = None):
+    with read_db() as conn:
+        sql_frag, params = obec_filter(conn, obec)
         q = f"SELECT DISTINCT cast_obce FROM subjekty WHERE {sql_frag} AND cast_obce IS NOT NULL AND cast_obce != obec"
         if typ:
             q += " AND typ = ?"
@@ -376,14 +647,11 @@ async def get_casti(obec: str = Query(...), typ: Optional[str] = None):
         q += " ORDER BY cast_obce"
         rows = conn.execute(q, params).fetchall()
         return [r[0] for r in rows]
-    finally:
-        conn.close()
 
 @app.get("/api/ulice")
-async def get_ulice(obec: str = Query(...), cast_obce: Optional[str] = None, typ: Optional[str] = None):
-    conn = get_db()
-    try:
-        sql_frag, params = obec_filter(obec)
+def get_ulice(obec: str = Query(...), cast_obce: Optional[str] = None, typ: Optional[str] = None):
+    with read_db() as conn:
+        sql_frag, params = obec_filter(conn, obec)
         q = f"SELECT DISTINCT ulice FROM subjekty WHERE {sql_frag} AND ulice IS NOT NULL"
         if cast_obce:
             q += " AND cast_obce = ?"
@@ -394,8 +662,6 @@ async def get_ulice(obec: str = Query(...), cast_obce: Optional[str] = None, typ
         q += " ORDER BY ulice"
         rows = conn.execute(q, params).fetchall()
         return [r[0] for r in rows]
-    finally:
-        conn.close()
 
 @app.get("/api/export/excel")
 async def export_excel(
@@ -404,7 +670,8 @@ async def export_excel(
     cast_obce: Optional[str] = None,
     typ: Optional[str] = "svj",
 ):
-    result = await get_svj(obec=obec, ulice=ulice, cast_obce=cast_obce, typ=typ, start=0, pocet=9999)
+    result = await run_in_threadpool(get_svj, obec=obec, okres=None, ulice=ulice,
+                                     cast_obce=cast_obce, typ=typ, start=0, pocet=9999)
     data   = result["subjekty"]
     label  = "BD" if typ == "bd" else "SVJ"
 
@@ -412,25 +679,16 @@ async def export_excel(
     ico_list  = [s.get("ico") for s in data[:MAX_OSOBY] if s.get("ico")]
     osoby_map: dict = {}
 
-    async with httpx.AsyncClient(timeout=12) as client:
-        sem = _asyncio.Semaphore(6)
-        async def fetch_osoby(ico):
-            async with sem:
-                # Check cache first
-                cached = _vr_cache.get(ico)
-                if cached and (time.time() - cached[0]) < VR_CACHE_TTL:
-                    osoby_map[ico] = cached[1].get("osoby", [])
-                    return
-                try:
-                    await _asyncio.sleep(0.1)
-                    r = await client.get(
-                        f"https://ares.gov.cz/ekonomicke-subjekty-v-be/rest/ekonomicke-subjekty-vr/{ico}"
-                    )
-                    if r.status_code == 200:
-                        osoby_map[ico] = _parse_osoby_vr(r.json())
-                except Exception:
-                    pass
-        await _asyncio.gather(*[fetch_osoby(ico) for ico in ico_list])
+    sem = _asyncio.Semaphore(6)
+    async def fetch_vr(ico):
+        await _asyncio.sleep(0.1)   # šetrně k ARES; or.justice.cz se neptá
+        return await _fetch_vr(ico, subjekt_id=False)
+    async def fetch_osoby(ico):
+        async with sem:
+            vr = await _vr_cache.get(ico, fetch_vr)
+            if vr:
+                osoby_map[ico] = vr.get("osoby", [])
+    await _asyncio.gather(*[fetch_osoby(ico) for ico in ico_list])
 
     wb = Workbook()
     ws = wb.active
@@ -541,19 +799,21 @@ async def export_excel(
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={fn}"})
 
+@app.get("/api/vr-cache/stats")
+async def vr_cache_stats():
+    """Zásahy / výpadky cache osob z ARES VR."""
+    return _vr_cache.info()
+
 # ===================== SYNC =====================
 _sync_running = False
 _sync_status  = {"running": False, "progress": "", "done": False, "error": "", "pct": 0, "eta": ""}
 
 @app.get("/api/sync/status")
-async def sync_status():
-    conn = get_db()
-    try:
+def sync_status():
+    with read_db() as conn:
         svj     = conn.execute("SELECT COUNT(*) FROM subjekty WHERE typ='svj'").fetchone()[0]
         bd      = conn.execute("SELECT COUNT(*) FROM subjekty WHERE typ='bd'").fetchone()[0]
         updated = conn.execute("SELECT MAX(updated_at) FROM subjekty").fetchone()[0]
-    finally:
-        conn.close()
     return {**_sync_status, "svj": svj, "bd": bd, "posledni_sync": updated}
 
 @app.post("/api/sync/start")
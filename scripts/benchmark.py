@@ -0,0 +1,1052 @@
+"""Výkonnostní srovnání kritických cest RBD Radaru.
+
+Každý benchmark porovná původní implementaci (kopie v tomto skriptu)
+s aktuální a ověří, že obě dávají stejné výsledky.
+
+Použití (z kořene projektu, s aktivním .venv):
+
+  python scripts/benchmark.py signals --docs 10000
+  python scripts/benchmark.py normalize --docs 2000
+  python scripts/benchmark.py leads --subjects 5000 --docs 20000
+  python scripts/benchmark.py rotation --subjects 20000 --budget 400
+  python scripts/benchmark.py rotation --from-db --budget 100
+  python scripts/benchmark.py parsers --docs 500
+  python scripts/benchmark.py import --subjects 20000
+  python scripts/benchmark.py udaje --subjects 20000
+  python scripts/benchmark.py svj --subjects 5000
+  python scripts/benchmark.py hledat --subjects 5000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import signal_engine  # noqa: E402
+from app.signal_engine import (  # noqa: E402
+    SIGNAL_RULES, _context_from_match, _norm, _normalize_with_map,
+    detect_signals,
+)
+
+
+# ---------------------------------------------------------------------------
+# Syntetický korpus (věty typické pro zápisy ze shromáždění, část bez
+# diakritiky jako po OCR)
+# ---------------------------------------------------------------------------
+
+_SENTENCES = [
+    "Zápis ze shromáždění vlastníků jednotek konaného dne 12.5.2025.",
+    "Shromáždění bylo usnášeníschopné, přítomno 62 % podílů.",
+    "Výbor informoval o stavu fondu oprav a hospodaření za minulý rok.",
+    "Bylo schváleno navýšení příspěvku do fondu oprav na 35 Kč/m2.",
+    "Shromáždění schválilo přípravu zateplení fasády domu.",
+    "Byla projednána nabídka na výměnu oken ve společných prostorách.",
+    "Výbor zajistí projektovou dokumentaci a energetický audit.",
+    "Financování bude řešeno úvěrem a dotací z programu NZÚ.",
+    "Vlastník jednotky č. 5 upozornil na zatékání do sklepa.",
+    "Havarijní stav střechy vyžaduje okamžitou opravu.",
+    "Proběhne výběrové řízení na zhotovitele revitalizace.",
+    "Zvolení členové výboru: Jan Novák, Eva Malá, Petr Dvořák",
+    "Náklady na provoz domu převyšují obnos vybraný na zálohách.",
+    "Úklid společných prostor zajišťuje externí firma.",
+    "Diskuse k vyúčtování služeb za rok 2024 proběhla bez připomínek.",
+    "Revize výtahu proběhla bez závad, plánuje se modernizace.",
+    "Rekonstrukce balkonů a lodžií bude zahájena na jaře.",
+    "Instalace FVE na střechu domu byla odložena.",
+    "Hlasování o usnesení: pro 80 %, proti 5 %, zdržel se 15 %.",
+    "Smlouva o dílo se zhotovitelem bude podepsána do konce měsíce.",
+]
+
+
+def corpus(n: int, seed: int = 42) -> list[str]:
+    rnd = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        parts = [rnd.choice(_SENTENCES) for _ in range(rnd.randint(5, 60))]
+        doc = " ".join(parts)
+        if rnd.random() < 0.3:
+            doc = _norm(doc)            # OCR bez diakritiky
+        docs.append(doc)
+    return docs
+
+
+def _timed(fn, docs):
+    t0 = time.perf_counter()
+    out = [fn(d) for d in docs]
+    return time.perf_counter() - t0, out
+
+
+def _report(name, docs, t_before, t_after, common: float = 0.0):
+    """Vypíše časy; `common` je společná část obou variant (odečte se)."""
+    print(f"{name}: {len(docs)} dokumentů, "
+          f"{sum(len(d) for d in docs) / 1e6:.1f} M znaků")
+    print(f"  původní:  {t_before:8.2f} s")
+    print(f"  nová:     {t_after:8.2f} s")
+    print(f"  zrychlení {t_before / t_after:8.1f}×")
+    if common:
+        print(f"  bez společné části ({common:.2f} s): "
+              f"{t_before - common:.2f} s -> {t_after - common:.2f} s, "
+              f"{(t_before - common) / max(t_after - common, 1e-9):.1f}×")
+
+
+# ---------------------------------------------------------------------------
+# signals — detect_signals: původní smyčka re.search vs. kompilovaná pravidla
+# ---------------------------------------------------------------------------
+
+def _legacy_search(pattern, norm_text, is_regex):
+    pat = _norm(pattern)
+    if not is_regex:
+        pat = re.escape(pat)
+    return re.search(pat, norm_text, re.IGNORECASE)
+
+
+def legacy_detect_signals(text: str) -> list[dict]:
+    if not text or not text.strip():
+        return []
+    norm_text, index_map = _normalize_with_map(text)
+    signals = []
+    for rule in SIGNAL_RULES:
+        is_regex = rule.get("regex", False)
+        found = found_kw = None
+        for kw in rule["keywords"]:
+            m = _legacy_search(kw, norm_text, is_regex)
+            if m:
+                found, found_kw = m, kw
+                break
+        if not found:
+            continue
+        context = _context_from_match(text, index_map, found)
+        if rule["action_words"]:
+            proximity = rule.get("proximity")
+            if proximity:
+                lo = max(0, found.start() - proximity)
+                hi = min(len(norm_text), found.end() + proximity)
+                haystack = norm_text[lo:hi]
+            else:
+                haystack = _norm(context)
+            if not any(re.search(re.escape(_norm(w)), haystack)
+                       for w in rule["action_words"]):
+                continue
+        signals.append({
+            "type": rule["type"], "label": rule["label"],
+            "category": rule["category"], "priority": rule["priority"],
+            "points": rule["points"], "keyword": found_kw, "value": None,
+            "context": context,
+        })
+
+    flags = re.IGNORECASE | re.DOTALL
+    value_rules = [
+        (r"naklady.{0,200}prevysuji|obnos.{0,80}vybran|nedostatek.{0,60}prostred",
+         "financni_situace", "Finanční situace SVJ", 75, 10,
+         "náklady převyšují", None),
+        (r"(?:navyseni|zvyseni|navysenim|zvysenim).{0,120}?(?:zaloh|prispevk).{0,120}?(\d{1,3})\s*%",
+         "zvyseni_zaloh", "Zvýšení záloh", 70, 12, "zvýšení záloh", " %"),
+        (r"(?:fond[u]? oprav|dlouhodob\w{0,4} zaloh).{0,160}?(\d{1,4})\s*kc\s*/?\s*m",
+         "fond_oprav", "Fond oprav / dlouhodobé zálohy", 60, 8,
+         "fond oprav", " Kč/m²"),
+        (r"zvoleni clenove|volb\w{0,4}.{0,40}vybor",
+         "volba_vyboru", "Volba výboru", 50, 5, "volba výboru", None),
+    ]
+    categories = {"financni_situace": "finance", "zvyseni_zaloh": "finance",
+                  "fond_oprav": "finance", "volba_vyboru": "kontakt"}
+    for pattern, typ, label, prio, pts, kw, unit in value_rules:
+        m = re.search(pattern, norm_text, flags)
+        if m:
+            signals.append({
+                "type": typ, "label": label, "category": categories[typ],
+                "priority": prio, "points": pts, "keyword": kw,
+                "value": m.group(1) + unit if unit else None,
+                "context": _context_from_match(text, index_map, m),
+            })
+
+    types = {s["type"] for s in signals}
+    if "nzu" in types:
+        signals = [s for s in signals if s["type"] != "dotace"]
+    if "vytah" in types:
+        signals = [s for s in signals if s["type"] != "vytah_info"]
+    return sorted(signals, key=lambda x: x["priority"], reverse=True)
+
+
+def bench_signals(args):
+    docs = corpus(args.docs)
+    signal_engine.reload_rules()
+    t_before, before = _timed(legacy_detect_signals, docs)
+    t_after, after = _timed(detect_signals, docs)
+    # Normalizace textu je společná oběma variantám.
+    t_norm, _ = _timed(_normalize_with_map, docs)
+    mismatches = sum(1 for a, b in zip(before, after) if a != b)
+    _report("detect_signals", docs, t_before, t_after, common=t_norm)
+    print(f"  shoda výstupů: {len(docs) - mismatches}/{len(docs)}")
+    return mismatches == 0
+
+
+# ---------------------------------------------------------------------------
+# normalize — _normalize_with_map: znak po znaku vs. překladová tabulka
+# ---------------------------------------------------------------------------
+
+def _legacy_strip_diacritics(s: str) -> str:
+    return "".join(
+        c for c in unicodedata.normalize("NFD", s)
+        if unicodedata.category(c) != "Mn"
+    )
+
+
+def legacy_normalize_with_map(text: str):
+    out = []
+    index_map = []
+    for i, ch in enumerate(text):
+        base = _legacy_strip_diacritics(ch).lower()
+        if not base:
+            continue
+        for c in base:
+            out.append(c)
+            index_map.append(i)
+    return "".join(out), index_map
+
+
+def bench_normalize(args):
+    docs = corpus(args.docs)
+    # Velký OCR výstup: všechny dokumenty za sebou s typickým OCR šumem.
+    docs.append(" “ ".join(docs) + " ﬁnancování")
+    t_before, before = _timed(legacy_normalize_with_map, docs)
+    t_after, after = _timed(_normalize_with_map, docs)
+    mismatches = sum(1 for (a, am), (b, bm) in zip(before, after)
+                     if a != b or am != list(bm))
+    _report("_normalize_with_map", docs, t_before, t_after)
+    print(f"  shoda výstupů: {len(docs) - mismatches}/{len(docs)}")
+    return mismatches == 0
+
+
+# ---------------------------------------------------------------------------
+# leads — /api/leads: dotaz na signály pro každý dokument vs. lead_summary
+# ---------------------------------------------------------------------------
+
+def _leads_db(n_subjects: int, n_docs: int, seed: int = 42):
+    """In-memory databáze s náhodnými subjekty, dokumenty a signály."""
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import create_engine, event, insert
+    from sqlalchemy.orm import sessionmaker
+
+    from app import lead_summary
+    from app.db import Base
+    from app.models import Subject, Document, Signal
+
+    rnd = random.Random(seed)
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Subject), [
+            {"id": i, "ico": str(10000000 + i), "name": f"SVJ {i}",
+             "city": rnd.choice(["Brno", "Praha", "Ostrava", "Jihlava"])}
+            for i in range(1, n_subjects + 1)])
+        conn.execute(insert(Document), [
+            {"id": i, "subject_id": rnd.randint(1, n_subjects),
+             "external_id": f"D-{i}", "title": "zápis ze shromáždění",
+             "score": rnd.randint(0, 100),
+             "document_date": datetime(2020, 1, 1)
+             + timedelta(days=rnd.randint(0, 2000))}
+            for i in range(1, n_docs + 1)])
+        conn.execute(insert(Signal), [
+            {"document_id": rnd.randint(1, n_docs), "keyword": "zatepl",
+             "category": "zateplení", "points": 25, "evidence": "…",
+             "type": "zatepleni", "label": "Zateplení domu",
+             "priority": rnd.randint(40, 98)}
+            for _ in range(2 * n_docs)])
+    db = sessionmaker(bind=engine)()
+    lead_summary.rebuild_all(db)
+    db.commit()
+    queries = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+    return db, queries
+
+
+def legacy_leads(min_score, limit, city, db):
+    from sqlalchemy import select, desc
+
+    from app.models import Subject, Document, Signal
+    from app.signal_engine import lead_level
+
+    q = (select(Document, Subject)
+         .join(Subject, Document.subject_id == Subject.id)
+         .where(Document.score >= min_score)
+         .order_by(desc(Document.score), desc(Document.document_date)))
+    if city:
+        q = q.where(Subject.city.ilike(f"%{city}%"))
+    by_subject = {}
+    for doc, subject in db.execute(q).all():
+        entry = by_subject.setdefault(subject.id, {
+            "ico": subject.ico, "score": 0, "lead_level": "LOW",
+            "documents": []})
+        signals = db.scalars(
+            select(Signal).where(Signal.document_id == doc.id)
+            .order_by(desc(Signal.priority))).all()
+        entry["documents"].append({"document_id": doc.id,
+                                   "signals": [s.id for s in signals]})
+        if (doc.score or 0) > entry["score"]:
+            entry["score"] = doc.score or 0
+            entry["lead_level"] = lead_level(entry["score"])
+    result = sorted(by_subject.values(), key=lambda x: x["score"],
+                    reverse=True)
+    return result[:limit]
+
+
+def _same_leads(before: list[dict], after: list[dict]) -> bool:
+    """Shoda až na pořadí remíz (stejné skóre i datum nejlepšího dokumentu).
+
+    Původní dotaz remízy nijak neřadil, nová verze je láme podle id
+    dokumentu — na hranici limitu se tak mohou lišit subjekty se skóre
+    rovným poslednímu leadu.
+    """
+    if [e["score"] for e in before] != [e["score"] for e in after]:
+        return False
+    cutoff = before[-1]["score"] if before else 0
+    docs_before = {e["ico"]: sorted(d["document_id"] for d in e["documents"])
+                   for e in before}
+    docs_after = {e["ico"]: sorted(d["document_id"] for d in e["documents"])
+                  for e in after}
+    above_before = {e["ico"] for e in before if e["score"] > cutoff}
+    above_after = {e["ico"] for e in after if e["score"] > cutoff}
+    return (above_before == above_after
+            and all(docs_before[ico] == docs_after[ico]
+                    for ico in docs_before.keys() & docs_after.keys()))
+
+
+def bench_leads(args):
+    from app.main import leads
+
+    db, queries = _leads_db(args.subjects, args.docs)
+    results = {}
+    for name, fn in (("původní", legacy_leads), ("nová", leads)):
+        for min_score in (1, 60):
+            db.expire_all()
+            queries.clear()
+            t0 = time.perf_counter()
+            out = fn(min_score=min_score, limit=1000, city=None, db=db)
+            elapsed = time.perf_counter() - t0
+            results[name, min_score] = out
+            print(f"  {name:8s} min_score={min_score:<3d} "
+                  f"{elapsed * 1000:8.0f} ms  {len(queries):6d} dotazů  "
+                  f"{len(out)} leadů")
+    same = all(_same_leads(results["původní", m], results["nová", m])
+               for m in (1, 60))
+    print(f"  shoda výstupů: {'ano' if same else 'NE'}")
+    db.close()
+    return same
+
+
+# ---------------------------------------------------------------------------
+# Rotace synchronizace: simulace nočních běhů s pevným limitem SVJ
+# ---------------------------------------------------------------------------
+
+def _synthetic_history(n_subjects: int, start, end, seed: int = 42):
+    """Data zajímavých listin a skóre leadu pro syntetická SVJ.
+
+    15 % aktivních (projekt, zápis zhruba každé 4 měsíce), 50 % běžných
+    (roční shromáždění, občas vynechané), 35 % spících (zápis jednou za
+    pár let nebo vůbec).
+    """
+    from datetime import timedelta
+
+    rnd = random.Random(seed)
+    history = []
+    for _ in range(n_subjects):
+        kind = rnd.random()
+        if kind < 0.15:
+            cadence, skip, score = rnd.gauss(120, 20), 0.05, rnd.randint(55, 95)
+        elif kind < 0.65:
+            cadence, skip, score = rnd.gauss(365, 25), 0.2, rnd.randint(10, 60)
+        else:
+            cadence, skip, score = rnd.gauss(1100, 200), 0.5, rnd.randint(0, 30)
+        events = []
+        day = start + timedelta(days=rnd.uniform(0, cadence))
+        while day < end:
+            if rnd.random() >= skip:
+                events.append(day)
+            day += timedelta(days=max(30.0, rnd.gauss(cadence, cadence / 10)))
+        history.append((events, score))
+    return history
+
+
+def _recorded_history():
+    """Historie z databáze Radaru: data dokumentů a skóre každého SVJ."""
+    from collections import defaultdict
+
+    from sqlalchemy import select
+
+    from app.db import SessionLocal
+    from app.models import Document, LeadSummary
+
+    db = SessionLocal()
+    try:
+        events = defaultdict(list)
+        for subject_id, d in db.execute(
+                select(Document.subject_id, Document.document_date)
+                .where(Document.document_date.isnot(None))):
+            events[subject_id].append(d)
+        scores = dict(db.execute(
+            select(LeadSummary.subject_id, LeadSummary.best_score)).all())
+    finally:
+        db.close()
+    return [(sorted(ev), scores.get(sid, 0)) for sid, ev in events.items()]
+
+
+FRESH_DAYS = 30
+
+
+def _simulate(history, policy: str, budget: int, start, warmup: int,
+              days: int) -> dict:
+    """Noční běhy: každý den `budget` SVJ podle politiky rotace.
+
+    Kontrola stojí 1 požadavek (seznam listin) + 2 za každou novou listinu
+    (detail + PDF). Měří se jen po zahřátí (warmup dní), kdy už adaptivní
+    rotace zná historii. Lead (SVJ se skórem >= 60) je čerstvý, pokud se
+    jeho listina najde do FRESH_DAYS dní od založení — starší zápis už
+    obvykle obeslal někdo jiný.
+    """
+    import heapq
+    from bisect import bisect_right
+    from datetime import timedelta
+
+    from app.rotation import next_check
+
+    n = len(history)
+    seen = [start] * n              # listiny do tohoto data už známe
+    checked = [None] * n
+    due = [None] * n
+    stats = [{"filings": [], "checks": 0, "hits": 0} for _ in range(n)]
+    found_any = [False] * n
+    last_entry = [max([e for e in ev if e <= start], default=start)
+                  for ev, _ in history]
+    out = {"requests": 0, "docs": 0, "leads": 0, "fresh": 0, "delay": 0.0}
+
+    def key(i, when):
+        if checked[i] is None:      # nikdy nekontrolované napřed
+            return (0, -last_entry[i].timestamp(), i)
+        return (1, when[i].timestamp(), -last_entry[i].timestamp(), i)
+
+    # Klíč se mění jen zkontrolovaným SVJ -> stačí haldy. Adaptivní rotace
+    # bere SVJ podle termínu (due), dokud jsou splatná, zbytek limitu podle
+    # nejstarší kontroly (checked) — jako rotation_order().
+    by_checked = [key(i, checked) for i in range(n)]
+    heapq.heapify(by_checked)
+    by_due = list(by_checked) if policy == "adaptivní" else []
+    for day in range(warmup + days):
+        today = start + timedelta(days=day)
+        measuring = day >= warmup
+        batch = set()
+
+        def take(heap, when, ready=lambda k: True):
+            while heap and len(batch) < min(budget, n) and ready(heap[0]):
+                k = heapq.heappop(heap)
+                # Zastaralý záznam (SVJ mezitím znovu zařazené) přeskočit.
+                if k[-1] not in batch and k == key(k[-1], when):
+                    batch.add(k[-1])
+
+        take(by_due, due, lambda k: k[0] == 0 or k[1] <= today.timestamp())
+        take(by_checked, checked)
+        for i in sorted(batch):
+            events, score = history[i]
+            lo = bisect_right(events, seen[i])
+            hi = bisect_right(events, today)
+            new = events[lo:hi]
+            seen[i], checked[i] = today, today
+            found_any[i] = found_any[i] or bool(new)
+            st = stats[i]
+            st["filings"] = [e.date().isoformat() for e in events[:hi]][-12:]
+            st["checks"] += 1
+            st["hits"] += bool(new)
+            due[i] = next_check(st, today,
+                                best_score=score if found_any[i] else 0,
+                                last_meeting=events[hi - 1] if hi else None)
+            if measuring:
+                out["requests"] += 1 + 2 * len(new)
+                out["docs"] += len(new)
+                out["delay"] += sum((today - e).days for e in new)
+                if score >= 60:
+                    out["leads"] += len(new)
+                    out["fresh"] += sum(1 for e in new
+                                        if (today - e).days <= FRESH_DAYS)
+            heapq.heappush(by_checked, key(i, checked))
+            if policy == "adaptivní":
+                heapq.heappush(by_due, key(i, due))
+    return out
+
+
+def bench_rotation(args):
+    from datetime import datetime, timedelta
+
+    if args.from_db:
+        history = _recorded_history()
+        if not history:
+            print("  databáze Radaru neobsahuje žádné dokumenty")
+            return False
+        last = max(e for events, _ in history for e in events)
+        start = last - timedelta(days=args.days + 365)
+        print(f"  historie z databáze: {len(history)} SVJ")
+    else:
+        start = datetime(2024, 1, 1)
+        history = _synthetic_history(
+            args.subjects, start - timedelta(days=3 * 365),
+            start + timedelta(days=365 + args.days))
+    print(f"  {len(history)} SVJ, limit {args.budget} SVJ/noc, "
+          f"{args.days} dní měření po 365 dnech zahřátí")
+
+    results = {}
+    for policy in ("původní", "adaptivní"):
+        t0 = time.perf_counter()
+        out = _simulate(history, policy, args.budget, start, 365, args.days)
+        results[policy] = out
+        per_req = out["docs"] / out["requests"] if out["requests"] else 0.0
+        delay = out["delay"] / out["docs"] if out["docs"] else 0.0
+        print(f"  {policy:10s} {out['docs']:6d} listin "
+              f"({per_req:.3f}/požadavek, zpoždění {delay:5.1f} d)  "
+              f"leady {out['leads']:5d}, čerstvé {out['fresh']:5d}  "
+              f"{out['requests']:7d} požadavků  "
+              f"({time.perf_counter() - t0:.1f} s)")
+
+    def rate(out):
+        return out["fresh"] / out["requests"] if out["requests"] else 0.0
+    before, after = rate(results["původní"]), rate(results["adaptivní"])
+    if before:
+        print(f"  čerstvé leady (do {FRESH_DAYS} dní) na požadavek: "
+              f"{after / before:.2f}× původní rotace")
+    return after >= before
+
+
+# ---------------------------------------------------------------------------
+# parsers — HTML Sbírky listin: BeautifulSoup vs. C backendy (app.listiny_html)
+# ---------------------------------------------------------------------------
+
+_LISTING_ROW = """
+    <tr>
+      <td><a href="./vypis-sl-detail?dokument={dok}&amp;subjektId={sid}&amp;spis={spis}"><span>S&nbsp;{n}/SL{i}/KSPH</span></a></td>
+      <td>{typ}</td>
+      <td>{d1}</td><td>{d2}</td><td>{d3}</td><td>{stran}</td><td></td>
+    </tr>"""
+
+_LISTING_TYPES = [
+    "ostatní zápis ze schůze shromáždění SVJ", "účetní závěrka [2021]",
+    "stanovy", "notářský zápis", "ostatní pozvánka na shromáždění",
+    "výroční zpráva [2022]",
+]
+
+
+def _listing_pages(n: int, seed: int = 42) -> list[str]:
+    """Stránky vypis-sl-firma s 5–120 listinami (jako skutečná SVJ)."""
+    rnd = random.Random(seed)
+    pages = []
+    for p in range(n):
+        rows = []
+        for i in range(rnd.randint(5, 120)):
+            d = f"{rnd.randint(1, 28)}.{rnd.randint(1, 12)}."
+            rows.append(_LISTING_ROW.format(
+                dok=rnd.randint(10**7, 10**8), sid=p, spis=p * 7, n=p, i=i,
+                typ=rnd.choice(_LISTING_TYPES), d1=f"{d}{rnd.randint(2000, 2025)}",
+                d2=f"{d}2025", d3=f"{d}2026", stran=rnd.randint(1, 40)))
+        pages.append(
+            '<html><head><title>Sbírka listin</title></head><body>'
+            '<div class="menu">' + '<a href="./menu">x</a>' * 40 + '</div>'
+            '<table class="list"><thead><tr><th>Číslo listiny</th>'
+            '<th>Typ listiny</th><th>Vznik listiny</th><th>Došlo na soud</th>'
+            '<th>Založeno do SL</th><th colspan="2">Stránek</th></tr></thead>'
+            '<tbody>' + "".join(rows) + '</tbody></table></body></html>')
+    return pages
+
+
+def bench_parsers(args):
+    from app import listiny_html
+    from app.listiny import parse_listiny_html, parse_subjekt_id
+
+    pages = _listing_pages(args.docs)
+    print(f"parse_listiny_html: {len(pages)} stránek, "
+          f"{sum(len(p) for p in pages) / 1e6:.1f} M znaků")
+
+    def run(name):
+        return _timed(lambda page: (parse_listiny_html(page, "1", parser=name),
+                                    parse_subjekt_id(page, parser=name)),
+                      pages)
+
+    t_ref, ref = run("bs4")
+    print(f"  bs4:        {t_ref:8.2f} s")
+    ok = True
+    for name in listiny_html.available():
+        if name == "bs4":
+            continue
+        t, out = run(name)
+        mismatches = sum(1 for a, b in zip(ref, out) if a != b)
+        ok = ok and mismatches == 0
+        print(f"  {name + ':':11s} {t:8.2f} s  zrychlení {t_ref / t:5.1f}×, "
+              f"shoda výstupů {len(pages) - mismatches}/{len(pages)}")
+    missing = set(listiny_html.BACKENDS) - set(listiny_html.available())
+    if missing:
+        print(f"  nenainstalováno: {', '.join(sorted(missing))}")
+    return ok
+
+
+# ---------------------------------------------------------------------------
+# import — import_justice: dotaz a ORM objekt na řádek vs. dávkový upsert
+# ---------------------------------------------------------------------------
+
+_STREETS = ["Rybářská", "Údolní", "Kounicova", "Veveří", "Lidická",
+            "Cejl", "Křenová", "Palackého třída"]
+
+
+def _justice_csv(path, n: int, seed: int = 42):
+    """CSV ve tvaru OpenData datasetu (sloupce ico, nazev, udaje)."""
+    import csv
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ico", "nazev", "udaje"])
+        for i in range(n):
+            street = rnd.choice(_STREETS)
+            number = rnd.randint(1, 200)
+            dates = "; ".join(
+                f"zapisDatum={rnd.randint(1995, 2025)}-"
+                f"{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+                for _ in range(rnd.randint(1, 6)))
+            writer.writerow([
+                str(10_000_000 + i), f"Společenství vlastníků {street} "
+                f"{number}",
+                f"spisZn={{soud={{kod=KSBR;nazev=Krajský soud v Brně}};"
+                f"oddil=S;vlozka={i}}}; hlavicka=Spisová značka;"
+                f"hodnotaText=S {i} vedená u Krajského soudu v Brně}}; "
+                f"hlavicka=Sídlo;adresa={{obec=Brno;ulice={street};"
+                f"cisloPo={number};cisloOr={rnd.randint(1, 40)};"
+                f"psc=6{rnd.randint(1000, 2999)}}}; {dates}"])
+
+
+def legacy_import_csv(db, path, dataset):
+    """Původní smyčka import_dataset (SELECT a ORM objekt na řádek)."""
+    import csv
+    from app.justice_parser import parse_udaje
+    from app.models import Subject
+    from sqlalchemy import select
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row_no, row in enumerate(csv.DictReader(f), start=1):
+            ico = (row.get("ico") or "").strip()
+            name = (row.get("nazev") or "").strip()
+            parsed = parse_udaje(row.get("udaje") or "")
+            subject = db.scalar(select(Subject).where(Subject.ico == ico))
+            if subject is None:
+                subject = Subject(
+                    ico=ico, name=name,
+                    legal_form="Společenství vlastníků jednotek",
+                    source_url="https://or.justice.cz/ias/ui/rejstrik",
+                    source_dataset=dataset)
+                db.add(subject)
+            subject.name = name
+            for key in ("address", "court", "file_number", "city", "street",
+                        "house_number", "zip_code", "last_entry_date"):
+                setattr(subject, key, parsed[key])
+            subject.source_dataset = dataset
+            if row_no % 500 == 0:
+                db.commit()
+        db.commit()
+    return row_no
+
+
+def bench_import(args):
+    import contextlib
+    import io
+    import tempfile
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+    from app.db import Base
+    from app.import_justice import import_csv
+    from app.models import Subject
+
+    tmp = Path(tempfile.mkdtemp())
+    path = tmp / "svj.csv"
+    _justice_csv(path, args.subjects)
+
+    def database(name):
+        engine = create_engine(f"sqlite:///{tmp / name}")
+        Base.metadata.create_all(engine)
+        return sessionmaker(bind=engine, autoflush=False)()
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        return time.perf_counter() - t0
+
+    def snapshot(db):
+        cols = [getattr(Subject, c) for c in (
+            "ico", "name", "legal_form", "address", "court", "file_number",
+            "city", "street", "house_number", "zip_code", "last_entry_date",
+            "source_dataset")]
+        return db.execute(select(*cols).order_by(Subject.ico)).all()
+
+    old, new = database("legacy.db"), database("bulk.db")
+    n = args.subjects
+    print(f"import_justice: {n} řádků CSV, SQLite soubor")
+    ok = True
+    for phase in ("nové subjekty", "aktualizace"):
+        t_old = timed(lambda: legacy_import_csv(old, path, "bench"))
+        t_new = timed(lambda: import_csv(new, path, "bench"))
+        same = snapshot(old) == snapshot(new)
+        ok = ok and same
+        print(f"  {phase}:")
+        print(f"    po řádcích: {n / t_old:10,.0f} řádků/s ({t_old:.2f} s)")
+        print(f"    dávky:      {n / t_new:10,.0f} řádků/s ({t_new:.2f} s)")
+        print(f"    zrychlení {t_old / t_new:.1f}×, shoda výsledku: "
+              f"{'ano' if same else 'NE'}")
+    old.close()
+    new.close()
+    return ok
+
+
+# ---------------------------------------------------------------------------
+# udaje — justice_parser.parse_udaje: regexy nad celým textem vs. strom
+# ---------------------------------------------------------------------------
+
+def _first(pattern, text):
+    m = re.search(pattern, text, flags=re.I | re.S)
+    return m.group(1).strip() if m and m.group(1) else None
+
+
+def legacy_parse_udaje(udaje: str):
+    """Původní parse_udaje (regulární výrazy nad celým textem)."""
+    from datetime import datetime
+    file_number = _first(r"hlavicka=Spisová značka.*?hodnotaText=([^;}]*)",
+                         udaje)
+    court = _first(r"spisZn=\{soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)", udaje)
+    if not court:
+        court = _first(r"soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)", udaje)
+    city = _first(r"hlavicka=Sídlo.*?adresa=\{.*?obec=([^;}]*)", udaje)
+    street = _first(r"hlavicka=Sídlo.*?adresa=\{.*?ulice=([^;}]*)", udaje)
+    cislo_po = _first(r"hlavicka=Sídlo.*?adresa={.*?cisloPo=([^;}]*)", udaje)
+    cislo_or = _first(r"hlavicka=Sídlo.*?adresa={.*?cisloOr=([^;}]*)", udaje)
+    house_number = (f"{cislo_po}/{cislo_or}" if cislo_po and cislo_or
+                    else (cislo_po or cislo_or))
+    zip_code = _first(r"hlavicka=Sídlo.*?adresa=\{.*?psc=([^;}]*)", udaje)
+    dates = re.findall(r"zapisDatum=(\d{4}-\d{2}-\d{2})", udaje)
+    last_entry = None
+    if dates:
+        try:
+            last_entry = datetime.strptime(max(dates), "%Y-%m-%d")
+        except ValueError:
+            pass
+    address_parts = [x for x in [street, house_number, city, zip_code] if x]
+    return {
+        "file_number": file_number, "court": court, "city": city,
+        "street": street, "house_number": house_number, "zip_code": zip_code,
+        "address": ", ".join(address_parts) if address_parts else None,
+        "last_entry_date": last_entry,
+    }
+
+
+_CITIES = [("Brno", "KSBR", "Krajský soud v Brně"),
+           ("Kuřim", "KSBR", "Krajský soud v Brně"),
+           ("Blansko", "KSBR", "Krajský soud v Brně"),
+           ("Znojmo", "KSBR", "Krajský soud v Brně")]
+_NAMES = ["Jan Novák", "Eva Malá", "Petr Dvořák", "Jana Svobodová",
+          "Tomáš Černý", "Lucie Veselá"]
+
+
+def _isvr_address(rnd, city, street=True, orient=True) -> str:
+    parts = ["statNazev=Česká republika", f"obec={city}",
+             f"castObce={city}-střed"]
+    if street:
+        parts.append(f"ulice={rnd.choice(_STREETS)}")
+    parts.append(f"cisloPo={rnd.randint(1, 3000)}")
+    if orient:
+        parts.append(f"cisloOr={rnd.randint(1, 80)}")
+    parts.append(f"psc={rnd.randint(60000, 69999)}")
+    return "adresa={" + ";".join(parts) + "}"
+
+
+def _isvr_date(rnd) -> str:
+    return (f"{rnd.randint(1995, 2025)}-{rnd.randint(1, 12):02d}-"
+            f"{rnd.randint(1, 28):02d}")
+
+
+def isvr_udaje(rnd, i: int) -> tuple[str, bool]:
+    """Sloupec udaje ve tvaru ISVR: záznamy Spisová značka, Název, Sídlo,
+    výbor s historií členů (2–80 záznamů s adresami) a předmět činnosti.
+
+    Druhá hodnota: adresa sídla má ulici i číslo orientační (u obcí bez
+    ulic nebo bez orientačních čísel chybí).
+    """
+    city, kod, soud = rnd.choice(_CITIES)
+    street, orient = rnd.random() > 0.1, rnd.random() > 0.2
+    members = ", ".join(
+        f"{{hlavicka=Člen výboru;zapisDatum={_isvr_date(rnd)};"
+        f"osoba={{jmeno={name.split()[0]};prijmeni={name.split()[1]}}};"
+        f"{_isvr_address(rnd, rnd.choice(_CITIES)[0])}}}"
+        for name in (rnd.choice(_NAMES) for _ in range(rnd.randint(2, 80))))
+    records = [
+        f"{{hlavicka=Spisová značka;hodnotaText=S {i} vedená u "
+        f"{soud.replace('Krajský soud', 'Krajského soudu')};"
+        f"zapisDatum={_isvr_date(rnd)};udajTyp={{kod=SPIS_ZN}};"
+        f"spisZn={{soud={{kod={kod};nazev={soud}}};oddil=S;vlozka={i}}}}}",
+        f"{{hlavicka=Název;hodnotaText=Společenství vlastníků {i};"
+        f"zapisDatum={_isvr_date(rnd)}}}",
+        f"{{hlavicka=Sídlo;zapisDatum={_isvr_date(rnd)};"
+        f"{_isvr_address(rnd, city, street, orient)}}}",
+        f"{{hlavicka=Statutární orgán - výbor;zapisDatum={_isvr_date(rnd)};"
+        f"podudaje=[{members}]}}",
+        f"{{hlavicka=Předmět činnosti;hodnotaText=Správa domu a pozemku "
+        f"podle § 1194 občanského zákoníku;zapisDatum={_isvr_date(rnd)}}}",
+    ]
+    return "[" + ", ".join(records) + "]", street and orient
+
+
+def isvr_long_history(rnd, i: int, members: int = 5000,
+                      sidlo: bool = True) -> str:
+    """Údaje s dlouhou historií: členové výboru jako samostatné záznamy
+    v kořeni, Sídlo (s úplnou adresou) až za nimi, nebo vůbec."""
+    city, kod, soud = rnd.choice(_CITIES)
+    records = [
+        f"{{hlavicka=Spisová značka;hodnotaText=S {i};"
+        f"zapisDatum={_isvr_date(rnd)};"
+        f"spisZn={{soud={{kod={kod};nazev={soud}}};oddil=S;vlozka={i}}}}}"]
+    records += [
+        f"{{hlavicka=Člen výboru;zapisDatum={_isvr_date(rnd)};"
+        f"osoba={{jmeno={name.split()[0]};prijmeni={name.split()[1]}}};"
+        f"{_isvr_address(rnd, rnd.choice(_CITIES)[0])}}}"
+        for name in (rnd.choice(_NAMES) for _ in range(members))]
+    if sidlo:
+        records.append(f"{{hlavicka=Sídlo;zapisDatum={_isvr_date(rnd)};"
+                       f"{_isvr_address(rnd, city)}}}")
+    return "[" + ", ".join(records) + "]"
+
+
+def bench_udaje(args):
+    from app.justice_parser import parse_udaje
+
+    rnd = random.Random(42)
+    rows = [isvr_udaje(rnd, i) for i in range(args.subjects)]
+    complete = [ok for _, ok in rows]
+    ok = True
+    for name, blobs in (
+            ("parse_udaje (krajský dataset)", [u for u, _ in rows]),
+            # Řádek bez hledaného záznamu: regexy projdou celý text
+            # několikrát, strom jednou.
+            ("parse_udaje (řádky bez záznamu Sídlo)",
+             [u.replace("hlavicka=Sídlo", "hlavicka=Adresa")
+              for u, _ in rows])):
+        t_old, old = _timed(legacy_parse_udaje, blobs)
+        t_new, new = _timed(parse_udaje, blobs)
+        _report(name, blobs, t_old, t_new)
+        same = [a == b for a, b in zip(old, new)]
+        # Chybí-li v adrese sídla ulice nebo číslo orientační, bral je
+        # původní regex z první další adresy v textu (člen výboru), strom ne.
+        explained = sum(1 for s, c in zip(same, complete) if not s and not c)
+        print(f"  shoda výstupů: {sum(same)}/{len(blobs)}, rozdíly jen kvůli "
+              f"poli chybějícímu v adrese sídla: {explained}")
+        ok = ok and all(s or not c for s, c in zip(same, complete))
+
+    # Dlouhá historie (5000 členů v kořeni): záznamy členů se kvůli
+    # rejstříku čtou jen po hlavičku, ne celé.
+    n = max(1, args.subjects // 100)
+    for name, sidlo in (("Sídlo za historií", True), ("bez Sídla", False)):
+        blobs = [isvr_long_history(rnd, i, sidlo=sidlo) for i in range(n)]
+        t_old, old = _timed(legacy_parse_udaje, blobs)
+        t_new, new = _timed(parse_udaje, blobs)
+        _report(f"parse_udaje (5000 členů výboru, {name})", blobs,
+                t_old, t_new)
+        same = sum(a == b for a, b in zip(old, new))
+        print(f"  shoda výstupů: {same}/{len(blobs)}")
+        ok = ok and same == len(blobs)
+    return ok
+
+
+# ---------------------------------------------------------------------------
+# svj — Prvotkář /api/svj: celý výsledek + řez v Pythonu vs. stránka z indexu
+# ---------------------------------------------------------------------------
+
+# Obce různé velikosti (počet SVJ); Praha i s částmi „Praha N“.
+_SVJ_CITIES = {"Lhota": 50, "Kuřim": 500, "Brno": 5000, "Praha": 30000,
+               "Praha 4": 3000, "Praha-Zbraslav": 300}
+
+
+def _prvotkar_db(path, scale: float, seed: int = 42):
+    """Databáze Prvotkáře (schéma sync_ares) se syntetickými SVJ a BD."""
+    import sync_ares
+    sync_ares.DB_FILE = str(path)
+    conn = sync_ares.get_db()
+    rnd = random.Random(seed)
+    ico = 0
+    for city, n in _SVJ_CITIES.items():
+        for typ in ("svj", "bd"):
+            batch = []
+            for _ in range(max(1, int(n * scale * (1 if typ == "svj" else 0.2)))):
+                ico += 1
+                street = rnd.choice(_STREETS)
+                batch.append({
+                    "ico": f"{ico:08d}",
+                    "obchodniJmeno": f"Společenství vlastníků {street} "
+                                     f"{rnd.randint(1, 3000)}, {city} ({ico})",
+                    "stavSubjektu": "AKTIVNI", "datumVzniku": "2001-02-03",
+                    "sidlo": {"nazevObce": city, "nazevUlice": street,
+                              "nazevCastiObce": city, "nazevKraje": "Kraj",
+                              "cisloDomovni": rnd.randint(1, 3000),
+                              "psc": 60200, "nazevOkresu": city},
+                })
+            sync_ares.uloz_batch(conn, typ, batch)
+    conn.close()
+
+
+def legacy_svj_page(conn, obec, typ, start, pocet):
+    """Původní /api/svj: LIKE filtr obce, všechny řádky, řez v Pythonu."""
+    all_rows = conn.execute(
+        "SELECT * FROM subjekty WHERE (obec = ? OR obec LIKE ? OR obec LIKE ?)"
+        " AND typ = ? ORDER BY nazev",
+        [obec, obec + "-%", obec + " %", typ]).fetchall()
+    return len(all_rows), [r["ico"] for r in all_rows[start:start + pocet]]
+
+
+def bench_svj(args):
+    import sqlite3
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prvotkar.db"
+        _prvotkar_db(path, args.subjects / 5000)
+        import main as prvotkar
+        prvotkar.DB_FILE = str(path)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        ok = True
+        pocet, repeat = 100, 20
+        print(f"{'obec':<10} {'SVJ':>7} {'stránka':>8} "
+              f"{'původní ms':>11} {'nová ms':>8}")
+        for obec in ("Lhota", "Kuřim", "Brno", "Praha"):
+            celkem, _ = legacy_svj_page(conn, obec, "svj", 0, 0)
+            for start in (0, max(0, celkem // 2 - pocet // 2)):
+                t0 = time.perf_counter()
+                for _ in range(repeat):
+                    old = legacy_svj_page(conn, obec, "svj", start, pocet)
+                t_old = (time.perf_counter() - t0) / repeat
+                t0 = time.perf_counter()
+                for _ in range(repeat):
+                    new = prvotkar.get_svj(
+                        obec=obec, okres=None, ulice=None, cast_obce=None,
+                        typ="svj", start=start, pocet=pocet)
+                t_new = (time.perf_counter() - t0) / repeat
+                print(f"{obec:<10} {celkem:>7} {start:>8} "
+                      f"{t_old * 1000:>11.1f} {t_new * 1000:>8.1f}")
+                ok = ok and old == (new["celkem"],
+                                    [s["ico"] for s in new["subjekty"]])
+        conn.close()
+    print(f"shoda výsledků: {'ano' if ok else 'NE'}")
+    return ok
+
+
+
+# ---------------------------------------------------------------------------
+# hledat — Prvotkář /api/hledat a /api/obce: LIKE přes tabulku vs. FTS5
+# a předpočítané počty v obcích
+# ---------------------------------------------------------------------------
+
+def legacy_hledat(conn, q, typ="svj", limit=30):
+    """Původní /api/hledat: LIKE '%q%' na název a IČO."""
+    return [r["ico"] for r in conn.execute(
+        "SELECT * FROM subjekty WHERE (nazev LIKE ? OR ico LIKE ?) AND typ = ?"
+        " ORDER BY nazev LIMIT ?", [f"%{q}%", f"%{q}%", typ, limit])]
+
+
+def legacy_obce(conn, q, typ=None):
+    """Původní /api/obce: LIKE 'q%' a GROUP BY přes celou tabulku."""
+    query = ("SELECT obec, kraj, COUNT(*) as pocet FROM subjekty "
+             "WHERE obec LIKE ? AND obec IS NOT NULL")
+    params = [f"{q}%"]
+    if typ:
+        query += " AND typ = ?"
+        params.append(typ)
+    query += " GROUP BY obec ORDER BY pocet DESC, obec LIMIT 20"
+    return [(r["obec"], r["pocet"]) for r in conn.execute(query, params)]
+
+
+def bench_hledat(args):
+    import sqlite3
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prvotkar.db"
+        _prvotkar_db(path, args.subjects / 5000)
+        import main as prvotkar
+        prvotkar.DB_FILE = str(path)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        repeat = 20
+
+        def timed(fn):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                out = fn()
+            return (time.perf_counter() - t0) / repeat * 1000, out
+
+        ok = True
+        print(f"{'dotaz':<24} {'původní ms':>11} {'nová ms':>8} {'nalezeno':>9}")
+        for q in ("Kounic", "Veveří 12", "0000123", "Lidicka"):
+            t_old, old = timed(lambda: legacy_hledat(conn, q))
+            t_new, new = timed(lambda: [s["ico"] for s in prvotkar.hledat(
+                q=q, typ="svj", limit=30)["subjekty"]])
+            print(f"hledat {q!r:<17} {t_old:>11.1f} {t_new:>8.1f} "
+                  f"{len(old):>4} {len(new):>4}")
+        for q in ("Pr", "Ku", "Lh"):
+            t_old, old = timed(lambda: legacy_obce(conn, q))
+            t_new, new = timed(lambda: [(o["obec"], o["pocet"]) for o in
+                                        prvotkar.get_obce(q=q, typ=None)])
+            print(f"obce {q!r:<19} {t_old:>11.1f} {t_new:>8.1f} "
+                  f"{len(old):>4} {len(new):>4}")
+            ok = ok and old == new
+        conn.close()
+    # Hledání se záměrně liší (prefixy slov bez diakritiky i v ulici a obci
+    # místo podřetězce v názvu), shodu ověřujeme jen u obcí.
+    print(f"shoda obcí: {'ano' if ok else 'NE'}")
+    return ok
+
+
+BENCHMARKS = {
+    "signals": bench_signals,
+    "normalize": bench_normalize,
+    "leads": bench_leads,
+    "rotation": bench_rotation,
+    "parsers": bench_parsers,
+    "import": bench_import,
+    "udaje": bench_udaje,
+    "svj": bench_svj,
+    "hledat": bench_hledat,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarky RBD Radaru")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--docs", type=int, default=None,
+                        help="Počet dokumentů (signals/normalize: 10000, "
+                             "leads: 20000, parsers: stránek, 300)")
+    parser.add_argument("--subjects", type=int, default=None,
+                        help="Počet subjektů (leads/import/udaje: 5000, "
+                             "rotation: 20000; svj/hledat: měřítko, "
+                             "5000 = Praha 30000 SVJ)")
+    parser.add_argument("--budget", type=int, default=400,
+                        help="rotation: SVJ na noční běh (RADAR_NIGHT_LIMIT)")
+    parser.add_argument("--days", type=int, default=365,
+                        help="rotation: délka měřeného období ve dnech")
+    parser.add_argument("--from-db", action="store_true",
+                        help="rotation: historie z databáze Radaru "
+                             "(DATABASE_URL) místo syntetické")
+    args = parser.parse_args()
+    if args.docs is None:
+        args.docs = {"leads": 20000, "parsers": 300}.get(args.benchmark,
+                                                         10000)
+    if args.subjects is None:
+        args.subjects = 20000 if args.benchmark == "rotation" else 5000
+    ok = BENCHMARKS[args.benchmark](args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
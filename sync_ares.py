@@ -14,6 +14,9 @@ PRAVNI_FORMY = {"svj": "145", "bd": "205"}
 
 def get_db():
     conn = sqlite3.connect(DB_FILE)
+    # WAL: API (main.py) čte souběžně se zápisem, commit dávky na čtenáře nečeká
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     conn.execute("""CREATE TABLE IF NOT EXISTS subjekty (
         ico TEXT PRIMARY KEY, typ TEXT, nazev TEXT,
         kraj TEXT, kraj_kod TEXT, obec TEXT, cast_obce TEXT,
@@ -28,9 +31,57 @@ def get_db():
         col = idx.replace("idx_", "")
         col = {"obec":"obec","typ":"typ","cast":"cast_obce","ulice":"ulice"}[col]
         conn.execute(f"CREATE INDEX IF NOT EXISTS {idx} ON subjekty({col})")
+    # Pokrývající index pro stránkování /api/svj (filtr typ + obec, řazení nazev)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_typ_obec_nazev ON subjekty(typ, obec, nazev, ico)")
+    # INSERT OR REPLACE maže původní řádek; delete triggery se pak spustí jen s tímto
+    conn.execute("PRAGMA recursive_triggers=ON")
+    zajisti_vyhledavani(conn)
     conn.commit()
     return conn
 
+# Fulltext (/api/hledat) a počty subjektů v obcích (/api/obce), obojí
+# udržované triggery při každém zápisu do subjekty.
+# subjekty_fts je external-content FTS5 nad rowid tabulky subjekty: VACUUM
+# může rowid přečíslovat, po něm je třeba
+#   INSERT INTO subjekty_fts(subjekty_fts) VALUES('rebuild')
+_FTS_INSERT = """
+    INSERT INTO subjekty_fts(rowid, nazev, ulice, obec, ico)
+    VALUES (new.rowid, new.nazev, new.ulice, new.obec, new.ico);
+    INSERT INTO obce_pocty(obec, typ, kraj, pocet)
+    SELECT new.obec, new.typ, new.kraj, 1 WHERE new.obec IS NOT NULL AND new.typ IS NOT NULL
+    ON CONFLICT(obec, typ) DO UPDATE SET pocet = pocet + 1,
+        kraj = COALESCE(excluded.kraj, kraj);"""
+_FTS_DELETE = """
+    INSERT INTO subjekty_fts(subjekty_fts, rowid, nazev, ulice, obec, ico)
+    VALUES ('delete', old.rowid, old.nazev, old.ulice, old.obec, old.ico);
+    UPDATE obce_pocty SET pocet = pocet - 1 WHERE obec = old.obec AND typ = old.typ;
+    DELETE FROM obce_pocty WHERE obec = old.obec AND typ = old.typ AND pocet <= 0;"""
+
+def zajisti_vyhledavani(conn):
+    """Vytvoří subjekty_fts, obce_pocty a triggery; u existující DB je naplní."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'subjekty_fts'").fetchone()
+    if exists:
+        return
+    # Bez diakritiky a velikosti písmen, prefixové indexy pro našeptávání
+    conn.execute("""CREATE VIRTUAL TABLE subjekty_fts USING fts5(
+        nazev, ulice, obec, ico, content='subjekty', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS obce_pocty (
+        obec TEXT NOT NULL, typ TEXT NOT NULL, kraj TEXT, pocet INTEGER NOT NULL,
+        PRIMARY KEY (obec, typ)
+    )""")
+    conn.execute(f"CREATE TRIGGER subjekty_ai AFTER INSERT ON subjekty BEGIN {_FTS_INSERT} END")
+    conn.execute(f"CREATE TRIGGER subjekty_ad AFTER DELETE ON subjekty BEGIN {_FTS_DELETE} END")
+    # Jen sloupce, na kterých index závisí (geocode.py mění lat/lng)
+    conn.execute(f"""CREATE TRIGGER subjekty_au AFTER UPDATE OF nazev, ulice, obec, ico, typ, kraj
+        ON subjekty BEGIN {_FTS_DELETE} {_FTS_INSERT} END""")
+    conn.execute("INSERT INTO subjekty_fts(subjekty_fts) VALUES('rebuild')")
+    conn.execute("DELETE FROM obce_pocty")
+    conn.execute("""INSERT INTO obce_pocty(obec, typ, kraj, pocet)
+        SELECT obec, typ, MAX(kraj), COUNT(*) FROM subjekty
+        WHERE obec IS NOT NULL AND typ IS NOT NULL GROUP BY obec, typ""")
+
 def http_get(url, retries=3):
     req = urllib.request.Request(url, headers={"Accept": "application/json"})
     for attempt in range(retries):
@@ -0,0 +1,92 @@
+import csv
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.import_justice import import_csv, _upsert_orm
+from app.models import Subject
+
+
+def _udaje(ulice, datum):
+    return ("spisZn={soud={kod=KSBR;nazev=Krajský soud v Brně};oddil=S}; "
+            "hlavicka=Sídlo;adresa={obec=Brno;ulice=" + ulice
+            + ";cisloPo=12;psc=60200}; zapisDatum=" + datum)
+
+
+def _csv(path, rows):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, ["ico", "nazev", "udaje"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_import_csv_upserts_in_batches(tmp_path):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    queries = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+    db = sessionmaker(bind=engine)()
+    db.add(Subject(ico="1", name="Staré SVJ", legal_form="vlastní",
+                   city="Praha"))
+    db.commit()
+
+    path = tmp_path / "svj.csv"
+    _csv(path, [
+        {"ico": "1", "nazev": "SVJ Rybářská 12", "udaje":
+         _udaje("Rybářská", "2024-01-02")},
+        {"ico": "2", "nazev": "SVJ Údolní 1", "udaje":
+         _udaje("Údolní", "2023-05-06")},
+        {"ico": "", "nazev": "bez IČO", "udaje": ""},
+        {"ico": "3", "nazev": "SVJ Kounicova", "udaje":
+         _udaje("Kounicova", "2022-01-01")},
+        # Opakované IČO v dávce: platí poslední řádek.
+        {"ico": "2", "nazev": "SVJ Údolní 1 (nový název)", "udaje":
+         _udaje("Údolní", "2025-01-01")},
+    ])
+    queries.clear()
+    out = import_csv(db, path, "svj-test", chunk=3)
+    assert (out["rows"], out["inserted"], out["updated"], out["skipped"],
+            out["errors"]) == (5, 2, 2, 1, 0)
+    assert out["rows_per_s"] > 0
+    # Na dávku jeden dotaz IN a jeden upsert, ne dotaz na řádek.
+    assert len([q for q in queries if q.lstrip().startswith("SELECT")]) == 2
+
+    subjects = {s.ico: s for s in db.query(Subject)}
+    assert set(subjects) == {"1", "2", "3"}
+    old = subjects["1"]
+    assert old.name == "SVJ Rybářská 12" and old.city == "Brno"
+    assert old.legal_form == "vlastní"          # import ho nepřepisuje
+    assert old.last_entry_date == datetime(2024, 1, 2)
+    new = subjects["2"]
+    assert new.name == "SVJ Údolní 1 (nový název)"
+    assert new.legal_form == "Společenství vlastníků jednotek"
+    assert new.active and new.created_at and new.source_dataset == "svj-test"
+    assert new.address == "Údolní, 12, Brno, 60200"
+
+    # Opakovaný import téhož souboru jen aktualizuje.
+    out = import_csv(db, path, "svj-test")
+    assert (out["inserted"], out["updated"]) == (0, 4)
+    assert db.query(Subject).count() == 3
+    db.close()
+
+
+def test_upsert_orm_fallback_matches():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    existing = Subject(ico="1", name="A", legal_form="vlastní")
+    db.add(existing)
+    db.commit()
+    fields = dict(name="B", address=None, court=None, file_number=None,
+                  city="Brno", street=None, house_number=None, zip_code=None,
+                  last_entry_date=None, source_dataset="x")
+    _upsert_orm(db, [{"ico": "1", **fields}, {"ico": "2", **fields}],
+                {"1": existing})
+    db.commit()
+    assert [(s.ico, s.name, s.legal_form) for s in
+            db.query(Subject).order_by(Subject.ico)] == [
+        ("1", "B", "vlastní"), ("2", "B", "Společenství vlastníků jednotek")]
+    db.close()
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import justice_client
+from app.db import Base
+from app.import_justice import import_rows
+from app.justice_client import JusticeClient
+from app.models import Subject
+
+URL = "https://dataor.justice.cz/api/file/svj-test.csv"
+
+
+def _body(n):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["ico", "nazev", "udaje"])
+    for i in range(n):
+        writer.writerow([str(100 + i), f"SVJ {i}",
+                         "hlavicka=Sídlo;adresa={obec=Brno;psc=60200}"])
+    return buf.getvalue().encode("utf-8-sig")
+
+
+class FakeRaw(io.BytesIO):
+    decode_content = False
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, raw=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = raw or FakeRaw(body)
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def close(self):
+        self.closed = True
+
+
+def _db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_stream_gzip_tee_and_etag_skip(monkeypatch, tmp_path):
+    body = gzip.compress(_body(50))
+    requests_seen = []
+
+    def fake_get(url, stream, timeout, headers):
+        requests_seen.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, body, {"ETag": '"v1"'})
+
+    monkeypatch.setattr(justice_client.requests, "get", fake_get)
+    cache = tmp_path / "svj-test.csv"
+    db = _db()
+
+    with JusticeClient().open_stream(URL, cache) as stream:
+        assert not stream.cached
+        out = import_rows(db, stream.text(), "svj-test", chunk=20)
+    assert (out["rows"], out["inserted"]) == (50, 50)
+    assert cache.read_bytes() == body           # tee: data tak, jak přišla
+    assert justice_client.read_meta(cache)["etag"] == '"v1"'
+    assert not list(tmp_path.glob("*.part"))
+
+    with JusticeClient().open_stream(URL, cache) as stream:
+        assert stream.cached
+        out = import_rows(db, stream.text(), "svj-test")
+    assert requests_seen[1]["If-None-Match"] == '"v1"'
+    assert (out["rows"], out["updated"]) == (50, 50)
+    assert db.query(Subject).count() == 50
+    db.close()
+
+
+def test_interrupted_download_keeps_old_cache(monkeypatch, tmp_path):
+    class BrokenRaw(FakeRaw):
+        def read(self, size=-1):
+            if self.tell():
+                raise ConnectionError("spojení přerušeno")
+            return super().read(100)
+
+    monkeypatch.setattr(
+        justice_client.requests, "get",
+        lambda url, **kw: FakeResponse(200, raw=BrokenRaw(_body(50)),
+                                       headers={"ETag": '"v2"'}))
+    cache = tmp_path / "svj-test.csv"
+    cache.write_bytes(b"stara data")
+
+    with pytest.raises(ConnectionError):
+        with JusticeClient().open_stream(URL, cache) as stream:
+            stream.text().read()
+    assert cache.read_bytes() == b"stara data"
+    assert justice_client.read_meta(cache) is None
+    assert not list(tmp_path.glob("*.part"))
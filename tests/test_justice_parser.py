@@ -0,0 +1,129 @@
+import re
+from datetime import datetime
+
+import pytest
+
+from app.justice_parser import parse_tree, parse_udaje
+
+
+def _first(pattern, text):
+    m = re.search(pattern, text, flags=re.I | re.S)
+    return m.group(1).strip() if m and m.group(1) else None
+
+
+def legacy_parse_udaje(udaje):
+    """Původní parse_udaje (regexy nad celým textem) pro srovnání."""
+    cislo_po = _first(r"hlavicka=Sídlo.*?adresa={.*?cisloPo=([^;}]*)", udaje)
+    cislo_or = _first(r"hlavicka=Sídlo.*?adresa={.*?cisloOr=([^;}]*)", udaje)
+    out = {
+        "file_number": _first(
+            r"hlavicka=Spisová značka.*?hodnotaText=([^;}]*)", udaje),
+        "court": _first(r"spisZn=\{soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)",
+                        udaje)
+        or _first(r"soud=\{kod=[^;}]*(?:;|,)nazev=([^;}]+)", udaje),
+        "city": _first(r"hlavicka=Sídlo.*?adresa=\{.*?obec=([^;}]*)", udaje),
+        "street": _first(r"hlavicka=Sídlo.*?adresa=\{.*?ulice=([^;}]*)",
+                         udaje),
+        "house_number": f"{cislo_po}/{cislo_or}" if cislo_po and cislo_or
+        else (cislo_po or cislo_or),
+        "zip_code": _first(r"hlavicka=Sídlo.*?adresa=\{.*?psc=([^;}]*)",
+                           udaje),
+    }
+    parts = [out[k] for k in ("street", "house_number", "city", "zip_code")
+             if out[k]]
+    out["address"] = ", ".join(parts) if parts else None
+    dates = re.findall(r"zapisDatum=(\d{4}-\d{2}-\d{2})", udaje)
+    try:
+        out["last_entry_date"] = (datetime.strptime(max(dates), "%Y-%m-%d")
+                                  if dates else None)
+    except ValueError:
+        out["last_entry_date"] = None
+    return out
+
+
+SIDLO = ("{hlavicka=Sídlo;zapisDatum=2010-04-01;adresa={statNazev=Česká "
+         "republika;obec=Brno;castObce=Brno-střed;ulice=Rybářská;cisloPo=12;"
+         "cisloOr=3;psc=60200}}")
+SPIS = ("{hlavicka=Spisová značka;hodnotaText=S 1234 vedená u Krajského "
+        "soudu v Brně;zapisDatum=2001-05-03;udajTyp={kod=SPIS_ZN};"
+        "spisZn={soud={kod=KSBR;nazev=Krajský soud v Brně};oddil=S;"
+        "vlozka=1234}}")
+CLEN = ("{hlavicka=Člen výboru;zapisDatum=2024-09-08;osoba={jmeno=Jan;"
+        "prijmeni=Novák};adresa={obec=Kuřim;ulice=Tyršova;cisloPo=5;"
+        "cisloOr=7;psc=66434}}")
+VYBOR = ("{hlavicka=Statutární orgán - výbor;zapisDatum=2015-01-01;"
+         "podudaje=[" + ", ".join([CLEN] * 3) + "]}")
+
+ROWS = [
+    # Seznam záznamů ISVR.
+    "[" + ", ".join([SPIS, SIDLO, VYBOR]) + "]",
+    "[" + "; ".join([SPIS, "{hlavicka=Název;hodnotaText=SVJ Rybářská 12}",
+                     SIDLO, VYBOR]) + "]",
+    # Záznamy bez závorek (tvar z testů importu a benchmarku).
+    "spisZn={soud={kod=KSBR;nazev=Krajský soud v Brně};oddil=S}; "
+    "hlavicka=Sídlo;adresa={obec=Brno;ulice=Údolní;cisloPo=12;psc=60200}; "
+    "zapisDatum=2024-01-02",
+    "spisZn={soud={kod=KSBR;nazev=Krajský soud v Brně};oddil=S;vlozka=7}; "
+    "hlavicka=Spisová značka;hodnotaText=S 7 vedená u Krajského soudu "
+    "v Brně}; hlavicka=Sídlo;adresa={obec=Brno;ulice=Veveří;cisloPo=3;"
+    "cisloOr=1;psc=60200}; zapisDatum=2001-01-01; zapisDatum=2019-12-31",
+    # Mezery kolem hodnot, soud jen mimo spisovou značku, čárka před nazev.
+    "[{hlavicka=Sídlo; adresa={obec= Znojmo ; ulice=Horní ; cisloPo=1 ;"
+    " psc=66902 }}, {hlavicka=Soud;soud={kod=KSBR,nazev=Krajský soud}}]",
+    "[{hlavicka=Sídlo;adresa={obec=Brno;ulice=;cisloPo=;cisloOr=4;psc=}}]",
+    # Neplatné datum, žádné údaje, useknutý text.
+    "[" + SIDLO.replace("2010-04-01", "2020-02-30") + "]",
+    "",
+    "[" + SPIS + ", {hlavicka=Sídlo;adresa={obec=Brno;ulice=Cejl;cisloPo=8",
+]
+
+
+@pytest.mark.parametrize("udaje", ROWS)
+def test_parse_udaje_matches_legacy_regexes(udaje):
+    assert parse_udaje(udaje) == legacy_parse_udaje(udaje)
+
+
+def test_parse_udaje_reads_only_sidlo_address():
+    # Bez čísla orientačního v sídle bral regex číslo z adresy člena výboru.
+    udaje = "[" + ", ".join([SPIS, SIDLO.replace("cisloOr=3;", ""),
+                             VYBOR]) + "]"
+    assert legacy_parse_udaje(udaje)["house_number"] == "12/7"
+    parsed = parse_udaje(udaje)
+    assert parsed["house_number"] == "12"
+    assert parsed["address"] == "Rybářská, 12, Brno, 60200"
+    assert parsed["last_entry_date"] == datetime(2024, 9, 8)
+
+
+def test_parse_tree_is_lazy():
+    tree = parse_tree("[" + ", ".join([SPIS, SIDLO, VYBOR]) + "]")
+    adresa = tree.record("sídlo")["adresa"]
+    assert adresa.get("ulice") == "Rybářská"
+    assert tree.find("soud").get("kod") == "KSBR"
+    # Historie výboru za sídlem se nečetla.
+    assert "statutární orgán - výbor" not in tree.records
+    assert tree.record("Statutární orgán")["podudaje"].get("")[0] \
+        .get("osoba").get("prijmeni") == "Novák"
+    assert tree.record("Neexistuje") == {}
+
+
+def test_parse_tree_indexes_root_records_by_header_only():
+    members = [CLEN.replace("Člen výboru", f"Člen výboru {n}")
+               for n in range(3)]
+    tree = parse_tree("[" + ", ".join([SPIS, *members, SIDLO]) + "]")
+    assert tree.record("Sídlo")["adresa"].get("psc") == "60200"
+    # Záznamy členů jsou v rejstříku, ale jejich pole se nerozkládala.
+    assert "člen výboru 1" in tree.records
+    assert tree.records["člen výboru 1"]._fields is None
+
+
+def test_parse_udaje_groups_deeper_than_regex_depth():
+    deep = "extra=" + "{a=" * 10 + "1" + "}" * 10
+    udaje = ("[{hlavicka=Sídlo;adresa={obec=Brno;" + deep
+             + ";ulice=Cejl;psc=60200}}, " + SPIS + "]")
+    parsed = parse_udaje(udaje)
+    assert (parsed["street"], parsed["zip_code"], parsed["file_number"]) == (
+        "Cejl", "60200", "S 1234 vedená u Krajského soudu v Brně")
+    # Totéž v údajích bez závorek kolem záznamů.
+    parsed = parse_udaje("x=" + "{a=" * 10 + "1" + "}" * 10
+                         + "; hlavicka=Sídlo;adresa={obec=Brno;psc=60200}")
+    assert parsed["zip_code"] == "60200"
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+from fastapi import Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.lead_summary import refresh_subject
+from app.main import leads, lead_by_ico, subjects, _iter_leads
+from app.models import Subject, Document, Signal, LeadSummary
+from app.pipeline import ingest_text, delete_document
+
+
+def _setup():
+    """Izolovaná in-memory databáze s počítadlem SQL dotazů."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    queries = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+    return sessionmaker(bind=engine)(), queries
+
+
+def _add(db, ico, city, docs):
+    subject = Subject(ico=ico, name=f"SVJ {ico}", city=city)
+    db.add(subject)
+    db.flush()
+    for score, date, priorities in docs:
+        doc = Document(subject_id=subject.id, external_id=f"{ico}-{score}",
+                       title="zápis", score=score, document_date=date)
+        db.add(doc)
+        db.flush()
+        for p in priorities:
+            db.add(Signal(document_id=doc.id, keyword="k", category="c",
+                          points=1, evidence="e", label=f"L{p}", priority=p))
+    refresh_subject(db, subject.id)
+    db.commit()
+
+
+def test_leads_grouped_ordered_and_limited():
+    db, queries = _setup()
+    _add(db, "1", "Brno", [(40, datetime(2024, 1, 1), [50, 90]),
+                           (70, None, [])])
+    _add(db, "2", "Brno", [(70, datetime(2025, 1, 1), [60])])
+    _add(db, "3", "Praha", [(90, datetime(2023, 1, 1), [])])
+    _add(db, "4", "Brno", [(10, datetime(2025, 1, 1), [])])
+
+    queries.clear()
+    out = leads(min_score=35, limit=10, city=None, db=db)
+    assert [e["ico"] for e in out] == ["3", "2", "1"]
+    assert out[0]["lead_level"] == "HOT"
+    # dokumenty subjektu: nejlepší napřed, signály podle priority
+    assert [d["score"] for d in out[2]["documents"]] == [70, 40]
+    assert [s["priority"] for s in out[2]["documents"][1]["signals"]] == [90, 50]
+    # konstantní počet dotazů (lead_summary, dokumenty, hromadně signály)
+    assert len(queries) == 3
+
+    assert [e["ico"] for e in leads(min_score=35, limit=2, city="brno",
+                                    db=db)] == ["2", "1"]
+    db.close()
+
+
+def test_lead_summary_follows_ingest_and_delete():
+    db, _ = _setup()
+    _add(db, "5", "Brno", [(20, datetime(2024, 1, 1), [40])])
+    subject = db.query(Subject).filter_by(ico="5").one()
+    out = ingest_text(db, subject, external_id="Z-1", title="Zápis",
+                      text="Zápis ze shromáždění konané dne 5.6.2026. "
+                           "Schválena příprava zateplení fasády a "
+                           "rekonstrukce balkonů. Financování úvěrem.")
+    row = db.get(LeadSummary, subject.id)
+    assert row.best_score == out["score"] > 20
+    assert row.best_document_id == out["document_id"]
+    assert row.document_count == 2
+    assert "L40" in row.signal_labels
+    assert lead_by_ico("5", db=db)["score"] == out["score"]
+
+    delete_document(db, db.get(Document, out["document_id"]))
+    row = db.get(LeadSummary, subject.id)
+    assert (row.best_score, row.document_count) == (20, 1)
+
+    delete_document(db, db.get(Document, row.best_document_id))
+    assert db.get(LeadSummary, subject.id) is None
+    assert leads(min_score=1, limit=10, city=None, db=db) == []
+    db.close()
+
+
+def _pages(endpoint, db, limit, **kw):
+    """Projde všechny stránky přes X-Next-Cursor."""
+    items, cursor = [], None
+    while True:
+        response = Response()
+        page = endpoint(limit=limit, cursor=cursor, response=response,
+                        db=db, **kw)
+        items += page
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+        assert len(page) == limit
+
+
+def test_keyset_pagination_matches_single_page():
+    db, _ = _setup()
+    # remízy ve skóre i datu a dokumenty bez data přes hranice stránek
+    for n, (score, date) in enumerate([
+            (50, datetime(2024, 1, 1)), (50, None), (50, datetime(2024, 1, 1)),
+            (80, None), (50, datetime(2025, 1, 1)), (50, None), (20, None)]):
+        _add(db, str(n), "Brno", [(score, date, [])])
+
+    everything = leads(min_score=1, limit=100, city=None, db=db)
+    for limit in (1, 2, 3):
+        assert _pages(leads, db, limit, min_score=1, city=None) == everything
+    assert ([e["ico"] for e in _pages(subjects, db, 2, city=None, search=None)]
+            == [e["ico"] for e in subjects(limit=100, db=db)])
+
+    # NDJSON: každý řádek nese kurzor, od kterého lze pokračovat
+    streamed = list(_iter_leads(db, 1, None, None, None))
+    assert [e["ico"] for e in streamed] == [e["ico"] for e in everything]
+    rest = leads(min_score=1, limit=100, city=None, db=db,
+                 cursor=streamed[2]["cursor"])
+    assert rest == everything[3:]
+
+    # limit=0 vrátí prázdnou stránku bez kurzoru (jako dřív [])
+    for endpoint, kw in ((leads, {"min_score": 1, "city": None}),
+                         (subjects, {"city": None, "search": None})):
+        response = Response()
+        assert endpoint(limit=0, response=response, db=db, **kw) == []
+        assert "X-Next-Cursor" not in response.headers
+    db.close()
@@ -0,0 +1,126 @@
+from app.listiny import FetchScheduler, endpoint_class
+
+
+class FakeClock:
+    """Virtuální čas — sleep jen posune hodiny."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _scheduler(rate=1.0):
+    clock = FakeClock()
+    return FetchScheduler(rate, clock=clock, sleep=clock.sleep), clock
+
+
+def test_endpoint_class():
+    base = "https://or.justice.cz/ias/ui/"
+    assert endpoint_class(base + "rejstrik-$firma?ico=1") == "search"
+    assert endpoint_class(base + "vypis-sl-firma?subjektId=1") == "firma"
+    assert endpoint_class(base + "vypis-sl-detail?dokument=1") == "detail"
+    assert endpoint_class("https://or.justice.cz/ias/content/download?id=1") \
+        == "download"
+
+
+def test_global_rate_is_kept_across_endpoints():
+    sched, clock = _scheduler(rate=0.5)
+    for endpoint in ["search", "firma", "detail", "download", "firma"]:
+        sched.acquire(endpoint)
+    # První požadavek hned, další po 2 s bez ohledu na typ stránky.
+    assert clock.now == 8.0
+
+
+def test_backoff_is_per_endpoint_and_recovers_slowly():
+    sched, clock = _scheduler(rate=1.0)
+    sched.report("download", 503)
+    sched.report("download", 503)
+    assert sched.buckets["download"].rate == 0.25
+    assert sched.buckets["firma"].rate == 1.0
+    assert sched.total.rate == 1.0        # 5xx nebrzdí ostatní typy
+
+    sched.acquire("firma")
+    sched.acquire("download")
+    sched.acquire("download")
+    # Po chybě se čeká celý interval (1 / 0.25 s) před každým stažením.
+    assert clock.now == 8.0
+
+    for _ in range(5):
+        sched.report("download", 200)
+    assert 0.25 < sched.buckets["download"].rate < 1.0
+    for _ in range(20):
+        sched.report("download", 200)
+    assert sched.buckets["download"].rate == 1.0
+
+
+def test_other_client_errors_do_not_slow_down():
+    sched, _ = _scheduler(rate=1.0)
+    sched.report("detail", 404)
+    sched.report("detail", 403)
+    assert sched.buckets["detail"].rate == 1.0
+    sched.report("detail", None)          # timeout zpomalí
+    assert sched.buckets["detail"].rate == 0.5
+
+
+def test_429_honours_retry_after_and_slows_global():
+    sched, clock = _scheduler(rate=1.0)
+    sched.acquire("search")
+    sched.report("search", 429, retry_after=30)
+    assert sched.total.rate == 0.5
+    sched.acquire("search")
+    assert clock.now >= 30
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+def test_fetch_listing_skips_unchanged(monkeypatch):
+    from app.listiny import ListinyClient, listing_fingerprint
+    from test_listiny_parser import LISTINY_HTML
+
+    client = ListinyClient(delay=0)
+    sent = []
+    responses = [
+        FakeResponse(200, LISTINY_HTML, {"ETag": '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(200, LISTINY_HTML.replace("<body>", "<body><p>x</p>")),
+    ]
+
+    def fake_get(url, **kwargs):
+        sent.append(kwargs.get("headers"))
+        return responses.pop(0)
+    monkeypatch.setattr(client, "_get", fake_get)
+
+    first = client.fetch_listing("875537")
+    assert not first.unchanged and first.listiny
+    assert first.fingerprint == listing_fingerprint(LISTINY_HTML)
+    state = {"fingerprint": first.fingerprint, "etag": first.etag,
+             "last_modified": None}
+    assert client.fetch_listing("875537", state).unchanged
+    assert sent[1] == {"If-None-Match": '"v1"'}
+    # Bez validátorů rozhoduje otisk: obsah mimo tabulku listin nevadí.
+    assert client.fetch_listing("875537", state).unchanged
+
+
+def test_listing_fingerprint_tracks_rows():
+    from app.listiny import listing_fingerprint
+    from test_listiny_parser import LISTINY_HTML
+
+    fp = listing_fingerprint(LISTINY_HTML)
+    assert fp.startswith(f"{LISTINY_HTML.count('vypis-sl-detail?dokument=')}|")
+    assert listing_fingerprint(
+        LISTINY_HTML.replace("7.4.2025", "8.4.2025")) != fp
+    assert listing_fingerprint(
+        LISTINY_HTML.replace("85685221", "85685222")) != fp
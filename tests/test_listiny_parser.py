@@ -1,3 +1,6 @@
+import pytest
+
+from app import listiny_html
 from app.listiny import (
     parse_listiny_html, parse_subjekt_id, parse_download_url, Listina,
 )
@@ -76,3 +79,65 @@ def test_external_id_fallback():
     l = Listina(cislo="", typ="zápis", vznik=None, doslo=None, zalozeno=None,
                 stran=None, dokument_id="42", subjekt_id="875537")
     assert l.external_id == "SL-42"
+
+
+# ---------------------------------------------------------------------------
+# Backendy parsování (app.listiny_html) dávají stejný výstup jako BeautifulSoup
+# ---------------------------------------------------------------------------
+
+# Okrajové případy: komentář a nezlomitelné mezery na okraji buněk,
+# více textových uzlů v buňce, řádek bez odkazu, tabulka bez hlavičky.
+EDGE_HTML = """
+<html><body>
+<table><tr><td>1</td><td>2</td><td>3</td><td>4</td><td>5</td><td>6</td></tr></table>
+<table>
+  <tr><th><b>Číslo</b> listiny</th></tr>
+  <tr>
+    <td>&nbsp;<a href="vypis-sl-detail?dokument=7&amp;spis=8"><!-- x -->S&nbsp;1/SL2/KSPH <i>a</i></a></td>
+    <td> zápis <b>ze schůze</b>&nbsp;</td>
+    <td>1.<span>2.</span>2023</td><td></td><td>x</td><td> 12 </td>
+  </tr>
+  <tr><td>bez odkazu</td><td></td><td></td><td></td><td></td><td></td></tr>
+</table>
+</body></html>
+"""
+
+PAGES = [LISTINY_HTML, REJSTRIK_HTML, DETAIL_HTML, EDGE_HTML, "",
+         "<html><body>nic</body></html>",
+         # XHTML s deklarací kódování (lxml ji v str odmítá)
+         '<?xml version="1.0" encoding="UTF-8"?>\n' + LISTINY_HTML]
+
+
+@pytest.mark.parametrize("name", listiny_html.BACKENDS)
+def test_parser_backends_match_bs4(name):
+    pytest.importorskip({"bs4": "bs4", "lxml": "lxml.html",
+                         "selectolax": "selectolax.lexbor"}[name])
+    for html in PAGES:
+        assert (parse_listiny_html(html, "1", parser=name)
+                == parse_listiny_html(html, "1", parser="bs4"))
+        assert (parse_subjekt_id(html, parser=name)
+                == parse_subjekt_id(html, parser="bs4"))
+        assert (parse_download_url(html, parser=name)
+                == parse_download_url(html, parser="bs4"))
+    assert parse_subjekt_id(REJSTRIK_HTML, parser=name) == "875537"
+    assert len(parse_listiny_html(PAGES[-1], "1", parser=name)) == len(
+        parse_listiny_html(LISTINY_HTML, "1", parser=name)) > 0
+
+
+def test_parse_edge_cases():
+    [l] = parse_listiny_html(EDGE_HTML, "1", parser="bs4")
+    assert l.cislo == "S 1/SL2/KSPH a"
+    assert l.typ == "zápis ze schůze"
+    assert l.vznik.year == 2023 and l.doslo is None and l.stran == 12
+
+
+def test_parse_subjekt_id_prefers_sbirka():
+    html = ('<a href="./rejstrik-firma.vysledky?subjektId=1">výpis</a>'
+            '<a href="./vypis-sl-firma?subjektId=2">Sbírka listin</a>')
+    assert parse_subjekt_id(html) == "2"
+    assert parse_subjekt_id(html.split("</a>")[0] + "</a>") == "1"
+
+
+def test_unknown_parser():
+    with pytest.raises(ValueError):
+        listiny_html.get("html5lib")
@@ -0,0 +1,56 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app import ocr
+
+
+def _fake_tools(monkeypatch, tmp_path, pages, delay):
+    """Nahradí pdftoppm/tesseract: stránka n se „čte" delay(n) sekund."""
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF")
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def rasterize(pdf_path, page, output_dir, dpi=300, timeout=None):
+        image = Path(output_dir) / f"page-{page:04d}.jpg"
+        image.write_text(str(page))
+        return image
+
+    def ocr_image(image, lang="ces", timeout=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        page = int(Path(image).read_text())
+        time.sleep(delay(page))
+        with lock:
+            running[0] -= 1
+        return f"strana {page}"
+
+    monkeypatch.setattr(ocr, "_find_tool", lambda name: name)
+    monkeypatch.setattr(ocr, "page_count", lambda path: pages)
+    monkeypatch.setattr(ocr, "rasterize_page", rasterize)
+    monkeypatch.setattr(ocr, "ocr_image", ocr_image)
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 4)
+    monkeypatch.setattr(ocr, "_proc_slots", threading.BoundedSemaphore(3))
+    return str(pdf), peak
+
+
+def test_ocr_pages_parallel_in_order(monkeypatch, tmp_path):
+    # pozdější stránky doběhnou dřív — text musí zůstat v pořadí stránek
+    pdf, peak = _fake_tools(monkeypatch, tmp_path, pages=8,
+                            delay=lambda page: 0.02 * (9 - page))
+    text = ocr.ocr_pdf(pdf, work_dir=str(tmp_path / "work"))
+    assert text.split("\n\n") == [f"strana {p}" for p in range(1, 9)]
+    # paralelně, ale nad globální strop podprocesů
+    assert 1 < peak[0] <= 3
+    assert not list((tmp_path / "work").glob("*.jpg"))
+
+
+def test_ocr_timeout(monkeypatch, tmp_path):
+    pdf, _ = _fake_tools(monkeypatch, tmp_path, pages=20,
+                         delay=lambda page: 0.05)
+    with pytest.raises(ocr.OcrTimeout):
+        ocr.ocr_pdf(pdf, timeout=0.1)
@@ -0,0 +1,125 @@
+from pypdf import PdfWriter
+from pypdf.generic import (DecodedStreamObject, DictionaryObject, NameObject,
+                           NumberObject)
+
+from app import pdf_extract
+
+_TEXT = (b"BT /F1 12 Tf 72 720 Td (Zapis ze shromazdeni vlastniku jednotek "
+         b"konane dne 5.6.2026) Tj ET\n")
+
+
+def _pdf(path, kinds):
+    """PDF se stránkami 'text' (textová vrstva), 'scan' (obrázek přes celou
+    stranu), 'stamp' (malý obrázek) a 'blank'."""
+    w = PdfWriter()
+    for kind in kinds:
+        page = w.add_blank_page(612, 792)
+        res, content = DictionaryObject(), b""
+        if kind == "text":
+            font = DictionaryObject({
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica")})
+            res[NameObject("/Font")] = DictionaryObject(
+                {NameObject("/F1"): w._add_object(font)})
+            content = _TEXT
+        if kind in ("scan", "stamp"):
+            img = DecodedStreamObject()
+            img.set_data(b"\x80" * 3)
+            img.update({NameObject("/Type"): NameObject("/XObject"),
+                        NameObject("/Subtype"): NameObject("/Image"),
+                        NameObject("/Width"): NumberObject(1),
+                        NameObject("/Height"): NumberObject(1),
+                        NameObject("/ColorSpace"): NameObject("/DeviceRGB"),
+                        NameObject("/BitsPerComponent"): NumberObject(8)})
+            res[NameObject("/XObject")] = DictionaryObject(
+                {NameObject("/Im0"): w._add_object(img)})
+            content = (b"q 600 0 0 780 6 6 cm /Im0 Do Q" if kind == "scan"
+                       else b"q 50 0 0 50 500 40 cm /Im0 Do Q")
+        stream = DecodedStreamObject()
+        stream.set_data(content)
+        page[NameObject("/Contents")] = w._add_object(stream)
+        page[NameObject("/Resources")] = res
+    with open(path, "wb") as f:
+        w.write(f)
+
+
+def test_only_scanned_pages_go_to_ocr(monkeypatch, tmp_path):
+    pdf = tmp_path / "mix.pdf"
+    _pdf(pdf, ["text", "scan", "blank", "stamp", "scan"])
+    asked = []
+
+    def ocr_pages(path, pages, *args, **kwargs):
+        asked.extend(pages)
+        return {p: f"OCR strana {p}" for p in pages}
+
+    monkeypatch.setattr("app.ocr.ocr_pages", ocr_pages)
+    out = pdf_extract.extract_document(str(pdf), use_cache=False)
+
+    assert asked == [2, 5]
+    assert out["used_ocr"]
+    assert [p["source"] for p in out["pages"]] == [
+        "text", "ocr", "empty", "empty", "ocr"]
+    assert out["pages"][0]["fonts"] and out["pages"][1]["images"] > 0.9
+    assert out["pages"][3]["images"] < 0.05
+    # text ve správném pořadí stránek
+    lines = out["text"].split("\n")
+    assert lines[0].startswith("Zapis ze shromazdeni")
+    assert lines[1] == "OCR strana 2" and lines[-1] == "OCR strana 5"
+
+
+def test_text_pdf_unchanged_without_ocr(monkeypatch, tmp_path):
+    pdf = tmp_path / "text.pdf"
+    _pdf(pdf, ["text", "blank", "text"])
+    monkeypatch.setattr("app.ocr.ocr_pages", None)  # OCR se nesmí volat
+    out = pdf_extract.extract_document(str(pdf), use_cache=False)
+    assert not out["used_ocr"]
+    # stejný text jako dřívější extrakce celého dokumentu (kvůli text_hash)
+    assert out["text"] == pdf_extract.extract_pdf_text(str(pdf))
+
+
+def test_progressive_ocr_stops_early(monkeypatch, tmp_path):
+    pdf = tmp_path / "scan.pdf"
+    _pdf(pdf, ["text"] + ["scan"] * 8)
+    asked = []
+
+    def ocr_pages(path, pages, *args, **kwargs):
+        asked.append(list(pages))
+        return {p: f"OCR strana {p}" for p in pages}
+
+    monkeypatch.setattr("app.ocr.ocr_pages", ocr_pages)
+    monkeypatch.setattr("app.ocr.OCR_WORKERS", 2)
+
+    # predikát rozhodne po druhé dávce
+    out = pdf_extract.extract_document(
+        str(pdf), use_cache=False,
+        enough=lambda text: "OCR strana 5" in text)
+    assert asked == [[2, 3], [4, 5]]
+    assert out["partial"] and out["used_ocr"]
+    assert [p["source"] for p in out["pages"][5:]] == ["skipped"] * 4
+
+    # rozpočet stránek
+    asked.clear()
+    out = pdf_extract.extract_document(str(pdf), use_cache=False,
+                                       page_budget=3)
+    assert asked == [[2, 3], [4]]
+    assert out["partial"]
+
+
+def test_failed_ocr_pages_are_marked_and_not_cached(monkeypatch, tmp_path):
+    from app import text_cache
+
+    pdf = tmp_path / "scan.pdf"
+    _pdf(pdf, ["scan"] * 3)
+    # ocr_pages chybu stránky jen vypíše a stránku ve výsledku vynechá.
+    monkeypatch.setattr("app.ocr.ocr_pages", lambda path, pages, **kw: {
+        p: f"OCR strana {p}" for p in pages if p != 2})
+    monkeypatch.setattr(text_cache, "ENABLED", True)
+    stored = []
+    monkeypatch.setattr(text_cache, "get", lambda key: None)
+    monkeypatch.setattr(text_cache, "put", lambda key, r: stored.append(r))
+
+    out = pdf_extract.extract_document(str(pdf))
+    assert [p["source"] for p in out["pages"]] == ["ocr", "failed", "ocr"]
+    assert out["partial"] and out["used_ocr"] and stored == []
+    assert out["text"].split("\n") == ["OCR strana 1", "", "OCR strana 3"]
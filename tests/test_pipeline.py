@@ -2,8 +2,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.db import Base
-from app.models import Subject
-from app.pipeline import ingest_text
+from app.models import Subject, Document, LeadSummary
+from app.pipeline import ingest_text, signals_decided, complete_partial_ocr
 
 
 def _setup():
@@ -53,3 +53,153 @@ def test_ingest_stanovy_discount():
     # bez slevy by skóre bylo ~50+, se slevou pro stanovy musí být nízké
     assert out["score"] < 35
     db.close()
+
+
+def test_signals_decided():
+    strong = ("Zápis ze shromáždění. Schválena příprava zateplení fasády "
+              "a rekonstrukce balkonů, poptávka dodavatelů, financování "
+              "úvěrem, revitalizace domu, výměna oken.")
+    assert not signals_decided("Zápis ze shromáždění")("Prezenční listina.")
+    assert signals_decided("Zápis ze shromáždění")(strong)
+    # stanovy po slevě nikdy nepřekročí LOW -> rozhodnuto hned
+    assert signals_decided("stanovy společenství")("Prezenční listina.")
+
+
+def test_complete_partial_ocr(monkeypatch, tmp_path):
+    db, subject = _setup()
+    pdf = tmp_path / "zapis.pdf"
+    pdf.write_bytes(b"%PDF")
+    out = ingest_text(db, subject, text="Zápis ze shromáždění. Úvod.",
+                      external_id="P-1", title="Zápis ze shromáždění",
+                      file_path=str(pdf), ocr_used=True, ocr_partial=True)
+    assert out["score"] < 35
+
+    full = ("Zápis ze shromáždění. Úvod. Schválena příprava zateplení "
+            "fasády a rekonstrukce balkonů. Financování úvěrem.")
+    monkeypatch.setattr(
+        "app.pipeline.extract_document",
+        lambda path: {"text": full, "used_ocr": True, "partial": False,
+                      "pages": []})
+    assert complete_partial_ocr(db)["completed"] == 1
+    doc = db.get(Document, out["document_id"])
+    assert not doc.ocr_partial and doc.score >= 60
+    assert db.get(LeadSummary, subject.id).best_score == doc.score
+    assert complete_partial_ocr(db)["completed"] == 0
+    db.close()
+
+
+def test_complete_partial_ocr_skips_failing_document(monkeypatch, tmp_path):
+    from app.ocr import OcrTimeout
+
+    db, subject = _setup()
+    ids = []
+    for n, score_text in enumerate(["Schválena příprava zateplení fasády "
+                                    "a rekonstrukce balkonů.", "Úvod."]):
+        pdf = tmp_path / f"zapis{n}.pdf"
+        pdf.write_bytes(b"%PDF")
+        ids.append(ingest_text(
+            db, subject, text=f"Zápis ze shromáždění. {score_text}",
+            external_id=f"P-{n}", title="Zápis ze shromáždění",
+            file_path=str(pdf), ocr_used=True,
+            ocr_partial=True)["document_id"])
+
+    def extract(path):
+        if path.endswith("zapis0.pdf"):     # dokument s vyšším skóre
+            raise OcrTimeout("OCR překročilo limit")
+        return {"text": "Zápis ze shromáždění. Celý text.", "used_ocr": True,
+                "partial": False, "pages": []}
+
+    monkeypatch.setattr("app.pipeline.extract_document", extract)
+    out = complete_partial_ocr(db)
+    assert (out["completed"], out["failed"]) == (1, 1)
+    failed = db.get(Document, ids[0])
+    # Neblokuje frontu: příznak je shozený, částečný text zůstal.
+    assert not failed.ocr_partial and "zateplení" in failed.text
+    assert complete_partial_ocr(db) == {"completed": 0, "changed": 0,
+                                        "missing": 0, "failed": 0}
+    db.close()
+
+
+def test_sync_many_pipeline_matches_sequential(monkeypatch, tmp_path):
+    from datetime import datetime
+    import app.listiny
+    from app.listiny import Listina, ListingPage
+    from app.pipeline import sync_many, sync_subject
+
+    class FakeClient:
+        def fetch_listing(self, subjekt_id, previous=None):
+            listiny = self.list_listiny(subjekt_id)
+            fingerprint = ",".join(l.dokument_id for l in listiny)
+            if previous and previous["fingerprint"] == fingerprint:
+                return ListingPage(None, fingerprint)
+            return ListingPage(listiny, fingerprint)
+
+        def find_subjekt_id(self, ico):
+            if ico == "10000003":
+                raise LookupError("subjekt nenalezen")
+            return f"S{ico}"
+
+        def list_listiny(self, subjekt_id):
+            return [Listina(dokument_id=f"{subjekt_id}-{n}",
+                            subjekt_id=subjekt_id, spis="1",
+                            cislo=f"{subjekt_id}/SL{n}",
+                            typ="zápis ze schůze shromáždění SVJ",
+                            vznik=datetime(2025, 1, n + 1), doslo=None,
+                            zalozeno=None, stran=1)
+                    for n in range(3)]
+
+        def download_pdf(self, listina, target):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(b"%PDF")
+
+    monkeypatch.setattr(app.listiny, "ListinyClient", FakeClient)
+    monkeypatch.setattr(
+        "app.pipeline.extract_document",
+        lambda path, **kw: {"text": f"Zápis {path}. Schválena výměna "
+                            "výtahu.", "used_ocr": False, "partial": False,
+                            "pages": []})
+
+    def summary(results):
+        return sorted((r["ico"], r.get("downloaded"), r.get("skipped"),
+                       len(r.get("documents", [])), "error" in r)
+                      for r in results)
+
+    def fresh_db(name):
+        monkeypatch.setattr("app.pipeline.LISTINY_DIR", tmp_path / name)
+        db, _ = _setup()
+        db.add_all([Subject(ico=f"1000000{i}", name=f"SVJ {i}")
+                    for i in range(5)])
+        db.commit()
+        return db
+
+    db = fresh_db("seq")
+    sequential = []
+    for subject in db.query(Subject).all():
+        try:
+            sequential.append(sync_subject(db, subject, FakeClient(),
+                                           max_docs=2))
+        except LookupError as exc:
+            sequential.append({"ico": subject.ico, "error": str(exc)})
+    db.close()
+
+    db = fresh_db("pipe")
+    state = {"new_documents": 0, "hot_found": 0, "unchanged_subjects": 0}
+    results = sync_many(db, limit=10, max_docs=2, state=state, procs=0)
+    assert summary(results) == summary(sequential)
+    assert db.query(Document).count() == state["new_documents"] == 10
+    stages = state["stages"]
+    assert stages["resolve"] == {"done": 5, "queued": 0, "errors": 1,
+                                 "cached": 0}
+    assert stages["extract"]["done"] == stages["download"]["done"] == 10
+    assert stages["store"]["done"] == 5 and state["processed_subjects"] == 6
+
+    # max_docs nestačil -> otisk se neuložil; dokončí se příště, pak už
+    # se nezměněný seznam přeskočí.
+    assert state["unchanged_subjects"] == 0
+    results = sync_many(db, limit=10, max_docs=5, state=state, procs=0)
+    assert state["new_documents"] == 15 and state["unchanged_subjects"] == 0
+    results = sync_many(db, limit=10, max_docs=5, state=state, procs=0)
+    assert state["unchanged_subjects"] == 5
+    assert sum(r.get("unchanged", False) for r in results) == 5
+    assert state["stages"]["listing"]["unchanged"] == 5
+    db.close()
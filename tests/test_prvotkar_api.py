@@ -0,0 +1,158 @@
+import asyncio
+
+import main
+import sync_ares
+
+
+def _subjekt(ico, nazev, obec):
+    return {"ico": ico, "obchodniJmeno": nazev, "sidlo": {"nazevObce": obec}}
+
+
+def _svj(obec, start=0, pocet=2000):
+    return main.get_svj(obec=obec, okres=None, ulice=None, cast_obce=None,
+                        typ="svj", start=start, pocet=pocet)
+
+
+def test_get_svj_pages_in_sql_with_cached_count(tmp_path, monkeypatch):
+    db = str(tmp_path / "prvotkar.db")
+    monkeypatch.setattr(sync_ares, "DB_FILE", db)
+    monkeypatch.setattr(main, "DB_FILE", db)
+    conn = sync_ares.get_db()
+    sync_ares.uloz_batch(conn, "svj", [
+        _subjekt("1", "SVJ C", "Praha"),
+        _subjekt("2", "SVJ A", "Praha 4"),
+        _subjekt("3", "SVJ B", "praha-Zbraslav"),
+        _subjekt("4", "SVJ D", "Prahanov"),
+        _subjekt("5", "SVJ A", "Praha"),
+    ])
+    sync_ares.uloz_batch(conn, "bd", [_subjekt("6", "BD A", "Praha")])
+
+    assert [s["ico"] for s in _svj("Praha")["subjekty"]] == ["2", "5", "3", "1"]
+    page = _svj("Praha", start=1, pocet=2)
+    assert page["celkem"] == 4
+    assert [s["ico"] for s in page["subjekty"]] == ["5", "3"]
+    assert _svj("Praha", start=10)["subjekty"] == []
+    assert _svj("Lhota") == {"celkem": 0, "subjekty": []}
+
+    # Po zápisu do DB se počet (i seznam obcí) načte znovu.
+    sync_ares.uloz_batch(conn, "svj", [_subjekt("7", "SVJ E", "Praha 10")])
+    conn.close()
+    assert _svj("Praha", pocet=1)["celkem"] == 5
+
+
+def test_hledat_and_obce_use_indexes_kept_in_sync(tmp_path, monkeypatch):
+    db = str(tmp_path / "prvotkar.db")
+    monkeypatch.setattr(sync_ares, "DB_FILE", db)
+    monkeypatch.setattr(main, "DB_FILE", db)
+    conn = sync_ares.get_db()
+    sync_ares.uloz_batch(conn, "svj", [
+        _subjekt("12345678", "Společenství vlastníků Rybářská 12", "Brno"),
+        _subjekt("22345678", "SVJ Údolní 5", "Brno"),
+        _subjekt("32345678", "SVJ Náměstí", "Břeclav"),
+    ])
+    sync_ares.uloz_batch(conn, "bd", [_subjekt("42345678", "BD Rybářská", "Brno")])
+
+    def hledat(q, typ="svj"):
+        return [s["ico"] for s in main.hledat(q=q, typ=typ, limit=30)["subjekty"]]
+
+    # Bez diakritiky, prefixy slov, IČO i obec.
+    assert hledat("rybarska") == ["12345678"]
+    assert hledat("spol ryb") == ["12345678"]
+    assert hledat("2234") == ["22345678"]
+    assert hledat("breclav") == ["32345678"]
+    assert hledat("ryb", typ="bd") == ["42345678"]
+    assert hledat('"*') == []
+    assert main.get_obce(q="Br", typ=None) == [
+        {"obec": "Brno", "kraj": None, "pocet": 3}]
+
+    # INSERT OR REPLACE a UPDATE přepíšou index i počty.
+    sync_ares.uloz_batch(conn, "svj", [_subjekt("12345678", "SVJ Kounicova", "Břeclav")])
+    conn.execute("UPDATE subjekty SET obec = 'Kuřim' WHERE ico = '22345678'")
+    conn.commit()
+    conn.close()
+    assert hledat("rybarska") == []
+    assert hledat("kounic") == ["12345678"]
+    assert main.get_obce(q="B", typ="svj") == [
+        {"obec": "Břeclav", "kraj": None, "pocet": 2}]
+    assert main.get_obce(q="Ku", typ="svj") == [
+        {"obec": "Kuřim", "kraj": None, "pocet": 1}]
+
+
+def test_vr_cache_coalesces_evicts_revalidates_and_persists(tmp_path):
+    calls = []
+
+    async def fetch(ico):
+        calls.append(ico)
+        await asyncio.sleep(0.01)
+        return None if ico == "chyba" else {"osoby": [ico, len(calls)]}
+
+    async def scenario(cache):
+        # Souběžné dotazy na stejné IČO = jedno volání ARES.
+        first = await asyncio.gather(*[cache.get("1", fetch) for _ in range(5)])
+        assert first == [{"osoby": ["1", 1]}] * 5 and calls == ["1"]
+        await cache.get("2", fetch)
+        await cache.get("3", fetch)     # vyřadí nejdéle nepoužité "1"
+        assert list(cache._data) == ["2", "3"]
+        assert await cache.get("chyba", fetch) is None
+        # Zastaralý záznam se vrátí hned a obnoví na pozadí.
+        cache._data["2"] = (cache._data["2"][0] - 61, cache._data["2"][1])
+        assert await cache.get("2", fetch) == {"osoby": ["2", 2]}
+        await asyncio.sleep(0.05)
+        assert cache._data["2"][1] == {"osoby": ["2", 5]}
+
+    cache = main.VrCache(2, ttl=60, stale=3600, db_path=str(tmp_path / "c.db"))
+    asyncio.run(scenario(cache))
+    assert cache.info() == {
+        "hits": 0, "stale_hits": 1, "misses": 4, "coalesced": 4,
+        "evictions": 1, "errors": 1, "size": 2, "max": 2, "inflight": 0,
+        "persistent": True}
+
+    # Po restartu se záznamy načtou z SQLite (ve vlákně, jednou pro souběžné
+    # dotazy) v pořadí podle stáří.
+    restarted = main.VrCache(2, ttl=60, stale=3600, db_path=str(tmp_path / "c.db"))
+
+    async def after_restart():
+        reads = []
+        read = restarted._read
+        restarted._read = lambda: reads.append(1) or read()
+        got = await asyncio.gather(restarted.get("2", fetch), restarted.get("3", fetch))
+        return got, reads
+
+    got, reads = asyncio.run(after_restart())
+    assert got == [{"osoby": ["2", 5]}, {"osoby": ["3", 3]}] and reads == [1]
+    assert list(restarted._data) == ["2", "3"]
+    assert restarted.info()["hits"] == 2 and len(calls) == 5
+
+
+def test_fetch_vr_skips_errors_and_justice_for_export(monkeypatch):
+    import httpx
+
+    requests, status = [], {"ares": 429}
+
+    def handler(request):
+        requests.append(request.url.host)
+        if request.url.host == "ares.gov.cz":
+            return httpx.Response(status["ares"], json={"zaznamy": []})
+        return httpx.Response(200, text="subjektId=875537")
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(main.httpx, "AsyncClient", lambda **kw: client(
+        transport=httpx.MockTransport(handler), **kw))
+    monkeypatch.setattr(main, "RADAR_URL", "")
+
+    # Omezení ARES (429) se do cache neuloží.
+    assert asyncio.run(main._fetch_vr("1")) is None
+    status["ares"] = 404
+    assert asyncio.run(main._fetch_vr("1", subjekt_id=False)) == {
+        "osoby": [], "spisovaZnacka": None}
+    assert requests == ["ares.gov.cz", "ares.gov.cz"]
+
+    # Detail záznam z exportu (bez subjektId) stáhne znovu i se subjektId.
+    cache = main.VrCache(10, ttl=60, stale=60)
+
+    async def scenario():
+        await cache.get("1", lambda ico: main._fetch_vr(ico, subjekt_id=False))
+        return await cache.get("1", main._fetch_vr, need="subjektId")
+
+    assert asyncio.run(scenario())["subjektId"] == "875537"
+    assert requests[-1] == "or.justice.cz"
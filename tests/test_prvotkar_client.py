@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Subject
+from app.prvotkar_client import PrvotkarClient, import_pages
+
+
+def _item(ico, jmeno, ulice=None, vznik="2001-02-03"):
+    return {"ico": ico, "obchodniJmeno": jmeno, "datumVzniku": vznik,
+            "sidlo": {"nazevObce": "Brno", "nazevUlice": ulice,
+                      "cisloDomovni": 12, "psc": 60200}}
+
+
+def test_import_pages_upserts_and_keeps_existing_values():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    queries = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+    db = sessionmaker(bind=engine)()
+    db.add(Subject(ico="1", name="Staré SVJ", legal_form="vlastní",
+                   street="Stará", city="Praha",
+                   last_entry_date=datetime(1999, 1, 1)))
+    db.add(Subject(ico="2", name="SVJ Údolní", legal_form="vlastní",
+                   street="Údolní", city="Brno"))
+    db.commit()
+
+    pages = [
+        [_item("00000001", "SVJ Rybářská 12", "Rybářská"),
+         # Prázdná ulice existující hodnotu nepřepíše.
+         _item("2", "SVJ Údolní 2", None),
+         _item("3", "SVJ Kounicova", "Kounicova")],
+        [_item("4", "BD Cejl", "Cejl"),
+         # Opakované IČO: další záznam přepíše jen neprázdná pole.
+         _item("3", "SVJ Kounicova 5", None, vznik="2020-01-01"),
+         _item("5", "za limitem")],
+    ]
+    queries.clear()
+    out = import_pages(db, pages, limit=5)
+    assert out == {"inserted": 2, "updated": 3}
+    # Na stránku jeden dotaz IN, ne dotaz na záznam.
+    assert len([q for q in queries if q.lstrip().startswith("SELECT")]) == 2
+
+    subjects = {s.ico: s for s in db.query(Subject)}
+    assert set(subjects) == {"1", "2", "3", "4"}
+    old = subjects["1"]
+    assert (old.name, old.street, old.city, old.legal_form) == (
+        "SVJ Rybářská 12", "Rybářská", "Brno", "vlastní")
+    assert old.last_entry_date == datetime(1999, 1, 1)
+    assert old.address == "Rybářská, 12, Brno, 60200"
+    assert subjects["2"].street == "Údolní"
+    assert subjects["2"].name == "SVJ Údolní 2"
+    new = subjects["3"]
+    assert (new.name, new.street, new.legal_form, new.source_dataset) == (
+        "SVJ Kounicova 5", "Kounicova", "Společenství vlastníků jednotek",
+        "prvotkar")
+    assert new.last_entry_date == datetime(2001, 2, 3)
+
+
+class _FakeClient(PrvotkarClient):
+    def __init__(self, records, pocet):
+        super().__init__("http://prvotkar.test")
+        self.records = records
+        self.pocet = pocet
+        self.calls = []
+        self.second_requested = threading.Event()
+
+    def _get(self, path, **params):
+        self.calls.append(params)
+        if params["start"] > 0:
+            self.second_requested.set()
+        start = params["start"]
+        return {"celkem": len(self.records),
+                "subjekty": self.records[start:start + params["pocet"]]}
+
+
+def test_iter_pages_prefetches_next_page():
+    client = _FakeClient([_item(str(i), f"SVJ {i}") for i in range(5)], 2)
+    pages = client.iter_pages(okres="Brno-venkov", typ="svj", pocet=2)
+    first = next(pages)
+    # Druhá stránka se stahuje, zatímco se zpracovává první.
+    assert client.second_requested.wait(2)
+    rest = list(pages)
+    assert [len(p) for p in [first, *rest]] == [2, 2, 1]
+    assert [c["start"] for c in client.calls] == [0, 2, 4]
+    assert client.calls[0] == {"start": 0, "pocet": 2, "okres": "Brno-venkov",
+                               "typ": "svj"}
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+
+from app.listiny import Listina
+from app.models import Subject
+from app.rotation import (cadence_days, next_check, record_check,
+                          rotation_order, MIN_DAYS, MAX_DAYS)
+
+NOW = datetime(2026, 6, 1)
+
+
+def _days(stats, **kw):
+    return (next_check(stats, NOW, **kw) - NOW).days
+
+
+def test_cadence_ignores_same_meeting_filings():
+    filings = [date(2023, 5, 1), date(2023, 5, 10), date(2024, 5, 2),
+               date(2025, 5, 5)]
+    assert cadence_days(filings) == 363
+    assert cadence_days([date(2025, 1, 1)]) is None
+
+
+def test_next_check_follows_expected_filing():
+    yearly = {"filings": ["2024-05-01", "2025-05-01"], "checks": 0, "hits": 0}
+    # Další zápis čekáme kolem 1. 5. 2026 -> je po termínu, zkoušet brzy.
+    overdue = _days(yearly, last_meeting=datetime(2025, 4, 20))
+    assert MIN_DAYS <= overdue < 120
+    fresh = {"filings": ["2025-05-01", "2026-05-20"], "checks": 0, "hits": 0}
+    assert _days(fresh, last_meeting=datetime(2026, 5, 10)) > 180
+
+
+def test_next_check_weights_score_hits_and_bounds():
+    base = {"filings": ["2025-05-01", "2026-05-01"], "checks": 0, "hits": 0}
+    meeting = datetime(2026, 4, 20)
+    assert (_days(base, best_score=80, last_meeting=meeting)
+            < _days(base, last_meeting=meeting))
+    # Bez historie listin rozhoduje úspěšnost kontrol.
+    lucky = {"filings": [], "checks": 4, "hits": 4}
+    unlucky = {"filings": [], "checks": 4, "hits": 0}
+    assert _days(lucky) < _days(unlucky)
+    assert _days({"filings": [], "checks": 50, "hits": 0}) == MAX_DAYS
+    busy = {"filings": ["2026-01-01", "2026-03-01", "2026-05-01"],
+            "checks": 10, "hits": 10}
+    assert _days(busy, best_score=100) >= MIN_DAYS
+
+
+def test_record_check_keeps_history_when_unchanged():
+    subject = Subject(ico="1", name="SVJ")
+
+    def listina(n, typ, zalozeno):
+        return Listina(cislo=str(n), typ=typ, vznik=None, doslo=None,
+                       zalozeno=zalozeno, stran=1, dokument_id=str(n),
+                       subjekt_id="S")
+    listiny = [listina(1, "zápis ze schůze shromáždění SVJ",
+                       datetime(2025, 5, 2)),
+               listina(2, "účetní závěrka", datetime(2025, 6, 1))]
+    record_check(subject, listiny, 1, now=NOW)
+    assert subject.rotation_stats == {"filings": ["2025-05-02"],
+                                      "checks": 1, "hits": 1}
+    first = subject.next_check_at
+    record_check(subject, None, 0, now=NOW)
+    assert subject.rotation_stats["filings"] == ["2025-05-02"]
+    assert subject.rotation_stats["checks"] == 2
+    assert subject.next_check_at == first
+
+
+def test_rotation_order_fills_budget_with_oldest_checked():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    def subject(ico, checked=None, due=None):
+        db.add(Subject(ico=ico, name=ico,
+                       listiny_checked_at=checked and NOW - timedelta(checked),
+                       next_check_at=due and NOW + timedelta(due)))
+
+    subject("aktivni", checked=10, due=5)       # brzy, ale ještě ne
+    subject("spici", checked=200, due=150)      # dlouho nekontrolované
+    subject("splatne", checked=40, due=-3)
+    subject("nove")
+    subject("stare", checked=30)                # před zavedením next_check_at
+    db.commit()
+    order = db.scalars(select(Subject.ico)
+                       .order_by(*rotation_order(NOW))).all()
+    assert order == ["nove", "stare", "splatne", "spici", "aktivni"]
+    db.close()
@@ -1,5 +1,11 @@
-from app.signal_engine import analyze, detect_signals, score_signals, lead_level
-from app.document_analyzer import analyze_document
+import re
+
+from app.signal_engine import (
+    analyze, detect_signals, score_signals, lead_level, SIGNAL_RULES,
+    CompiledRules, AnalyzedText, _norm, _normalize_with_map, _needs_fold,
+)
+from app.document_analyzer import analyze_document, analyze_full
+from app import signal_engine
 
 
 REAL_OCR_SAMPLE = (
@@ -91,3 +97,76 @@ def test_document_analyzer_metadata():
 def test_empty_text():
     assert detect_signals("") == []
     assert score_signals([]) == 0
+
+
+def _first_keyword_naive(rule, norm_text):
+    """Původní vyhledávání: klíčová slova postupně, každé přes re.search."""
+    for kw in rule["keywords"]:
+        pat = _norm(kw) if rule.get("regex") else re.escape(_norm(kw))
+        m = re.search(pat, norm_text, re.IGNORECASE)
+        if m:
+            return kw, m.span()
+    return None
+
+
+def test_compiled_rules_match_naive_search():
+    """Jeden průchod branou najde stejné první výskyty jako re.search."""
+    texts = [
+        REAL_OCR_SAMPLE,
+        # překrývající se klíčová slova a pořadí slov v pravidle
+        "Kontaktní zateplení a minerální izolace fasády, výměna lodžií.",
+        "fasáda; zateplení až později. FVE-fve fvesystem",
+        # ſ a ı se s re.IGNORECASE shodují s s/i
+        "Dotaſe na zateplení a hydroızolace, SFPI",
+        "Projektová\ndokumentace; energetický   audit; výběr zhotovitele.",
+        "",
+    ]
+    compiled = CompiledRules(SIGNAL_RULES)
+    for text in texts:
+        norm_text, _ = _normalize_with_map(text)
+        first = compiled.first_matches(norm_text, _needs_fold(norm_text))
+        for rule, kw_ids, _action in compiled.entries:
+            got = next(((kw, first[i].span()) for kw, i in kw_ids if first[i]),
+                       None)
+            assert got == _first_keyword_naive(rule, norm_text), rule["type"]
+
+
+def test_normalize_with_map_matches_per_char():
+    """Překladová tabulka dává stejný výsledek jako normalizace znak po znaku."""
+    import unicodedata
+
+    text = "Zápis „ŉ“ ze shromáždění: fi ﬁ, é, İı, 28 Kč/m²\n"
+    expected_text, expected_map = "", []
+    for i, ch in enumerate(text):
+        base = "".join(c for c in unicodedata.normalize("NFD", ch)
+                       if unicodedata.category(c) != "Mn").lower()
+        expected_text += base
+        expected_map += [i] * len(base)
+
+    norm_text, index_map = _normalize_with_map(text)
+    assert norm_text == expected_text
+    assert list(index_map) == expected_map
+    assert _normalize_with_map("ASCII Text")[0] == "ascii text"
+
+
+def test_analyze_full_normalizes_once(monkeypatch):
+    calls = []
+    original = signal_engine._normalize_with_map
+
+    def counting(text):
+        calls.append(text)
+        return original(text)
+
+    monkeypatch.setattr(signal_engine, "_normalize_with_map", counting)
+    out = analyze_full(REAL_OCR_SAMPLE)
+    assert len(calls) == 1
+    assert out["meta"] == analyze_document(REAL_OCR_SAMPLE)
+    assert out["signals"] == detect_signals(REAL_OCR_SAMPLE)
+    assert out["score"] == score_signals(out["signals"])
+
+
+def test_analyzed_text_lines():
+    doc = AnalyzedText("první\r\ndruhý řádek\ntřetí")
+    assert list(doc.line_starts) == [0, 7, 19]
+    assert doc.text[7:doc.line_end(9)] == "druhý řádek"
+    assert doc.line_end(20) == len(doc.text)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import subjekt_ids
+from app.db import Base
+from app.models import Subject, SubjektIdCache
+
+
+class FakeClient:
+    def __init__(self, ids):
+        self.ids = ids
+        self.calls = []
+
+    def find_subjekt_id(self, ico):
+        self.calls.append(ico)
+        if ico not in self.ids:
+            raise LookupError(ico)
+        return self.ids[ico]
+
+
+def _db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_resolve_caches_hits_and_misses():
+    db = _db()
+    client = FakeClient({"123": "S1"})
+    assert subjekt_ids.resolve(db, client, "00000123") == "S1"
+    assert subjekt_ids.resolve(db, client, "123") == "S1"
+    with pytest.raises(LookupError):
+        subjekt_ids.resolve(db, client, "456")
+    with pytest.raises(LookupError):
+        subjekt_ids.resolve(db, client, "456")
+    assert client.calls == ["123", "456"]
+
+    # Prošlý negativní záznam se ověří znovu.
+    db.get(SubjektIdCache, "456").checked_at = (
+        datetime.utcnow() - timedelta(days=subjekt_ids.MISS_DAYS + 1))
+    db.commit()
+    assert subjekt_ids.lookup_many(db, ["123", "456"]) == {"123": "S1"}
+    client.ids["456"] = "S2"
+    assert subjekt_ids.resolve(db, client, "456") == "S2"
+    db.close()
+
+
+def test_prefill_seeds_known_and_resolves_rest():
+    db = _db()
+    db.add_all([Subject(ico="1", name="A", justice_subjekt_id="S1"),
+                Subject(ico="2", name="B"),
+                Subject(ico="3", name="C"),
+                Subject(ico="4", name="D")])
+    db.add(SubjektIdCache(ico="4", subjekt_id="S4"))
+    db.commit()
+    client = FakeClient({"2": "S2"})
+    out = subjekt_ids.prefill(db, client)
+    assert out == {"seeded": 1, "found": 1, "missing": 1, "errors": 0}
+    assert client.calls == ["2", "3"]
+    ids = {s.ico: s.justice_subjekt_id for s in db.query(Subject)}
+    assert ids == {"1": "S1", "2": "S2", "3": None, "4": "S4"}
+
+    assert subjekt_ids.prefill(db, client)["missing"] == 0
+    assert client.calls == ["2", "3"]
+    assert subjekt_ids.stats(db) == {"found": 3, "missing": 1,
+                                     "subjects_without_id": 1}
+    db.close()
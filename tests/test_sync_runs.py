@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app import sync_runs
+from app.db import Base
+from app.models import Subject, Document, SyncRun
+
+
+def _db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([Subject(ico=f"1000000{i}", name=f"SVJ {i}")
+                for i in range(3)])
+    db.commit()
+    return db
+
+
+def test_run_records_subjects_and_status():
+    db = _db()
+    ids = [s.id for s in db.query(Subject).order_by(Subject.id.desc())]
+    run = sync_runs.create(db, ids, {"max_docs": 2}, key="night-2026-10-17")
+    assert sync_runs.create(db, ids, {}, key="night-2026-10-17") is None
+    assert [s.id for s in sync_runs.pending_subjects(db, run.id)] == ids
+
+    sync_runs.record(db, run.id, ids[0], "done", new_documents=2,
+                     hot_found=1, unchanged=False)
+    sync_runs.record(db, run.id, ids[1], "failed", error="nenalezeno")
+    db.commit()
+    assert [s.id for s in sync_runs.pending_subjects(db, run.id)] == ids[2:]
+
+    st = sync_runs.status(db)
+    assert st["running"] and not st["stale"] and st["run_id"] == run.id
+    assert st["progress"] == "startuji…"
+    sync_runs.touch(db, run.id, progress=None)
+    st = sync_runs.status(db)
+    assert st["progress"] == "2/3 SVJ"
+    assert (st["new_documents"], st["hot_found"], st["failed_subjects"]) \
+        == (2, 1, 1)
+
+    sync_runs.finish(db, run.id, "done", "hotovo")
+    st = sync_runs.status(db)
+    assert not st["running"] and st["finished_at"] and st["progress"] == "hotovo"
+    db.close()
+
+
+def test_claim_stale_run_once():
+    db = _db()
+    run = sync_runs.create(db, [1, 2], {})
+    # Živý heartbeat: běh patří jinému procesu.
+    assert sync_runs.active(db).id == run.id
+    assert sync_runs.claim_stale(db) is None
+
+    run.heartbeat_at = datetime.utcnow() - timedelta(
+        seconds=sync_runs.STALE_SECONDS + 1)
+    db.commit()
+    assert sync_runs.active(db) is None and sync_runs.status(db)["stale"]
+    claimed = sync_runs.claim_stale(db)
+    assert claimed.id == run.id and claimed.resumed == 1
+    assert sync_runs.claim_stale(db) is None
+    db.close()
+
+
+def test_claim_stale_limits_resumes(monkeypatch):
+    monkeypatch.setattr(sync_runs, "MAX_RESUMES", 2)
+    db = _db()
+    run = sync_runs.create(db, [3, 1, 2], {})
+
+    def crash_and_claim():
+        db.execute(update(SyncRun).values(
+            heartbeat_at=datetime.utcnow() - timedelta(
+                seconds=sync_runs.STALE_SECONDS + 1)))
+        db.commit()
+        return sync_runs.claim_stale(db)
+
+    # První převzetí (deploy) nic nepřeskakuje.
+    assert crash_and_claim().resumed == 1
+    assert [s.id for s in sync_runs.pending_subjects(db, run.id)] == [3, 1, 2]
+    # Proces spadl znovu: SVJ, na kterém nejspíš padá, se přeskočí.
+    assert crash_and_claim().resumed == 2
+    assert [s.id for s in sync_runs.pending_subjects(db, run.id)] == [1, 2]
+    assert sync_runs.counts(db, run.id)["failed_subjects"] == 1
+    # Nad limitem se běh ukončí chybou a už se nepřevezme.
+    assert crash_and_claim() is None
+    st = sync_runs.status(db)
+    assert not st["running"] and "přerušen 3×" in st["error"]
+    assert sync_runs.unfinished(db) == []
+    db.close()
+
+
+def test_heartbeat_pauses_when_pipeline_stalls(tmp_path):
+    import time
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    run = sync_runs.create(db, [], {})
+    old = datetime.utcnow() - timedelta(hours=1)
+
+    def expire_heartbeat():
+        db.execute(update(SyncRun).values(heartbeat_at=old))
+        db.commit()
+
+    def heartbeat_at():
+        db.expire_all()
+        return db.get(SyncRun, run.id).heartbeat_at
+
+    state = {"progress": "1/3 SVJ", "stages": {"store": {"done": 1}}}
+    beat = sync_runs.Heartbeat(Session, run.id, state, interval=0.02,
+                               stall=0.15)
+    with beat:
+        expire_heartbeat()
+        time.sleep(0.08)
+        assert heartbeat_at() > old
+        # Nic se nehýbe déle než stall: heartbeat se vynechává.
+        time.sleep(0.2)
+        assert beat.stalled
+        expire_heartbeat()
+        time.sleep(0.08)
+        assert heartbeat_at() == old
+        state["stages"]["store"]["done"] = 2
+        time.sleep(0.08)
+        assert not beat.stalled and heartbeat_at() > old
+    db.close()
+
+
+def _fake_sync(monkeypatch, tmp_path, seen: list):
+    """Sbírka listin a extrakce bez sítě a PDF (2 listiny na SVJ)."""
+    import app.listiny
+    from app.listiny import Listina, ListingPage
+
+    class FakeClient:
+        def find_subjekt_id(self, ico):
+            return f"S{ico}"
+
+        def fetch_listing(self, subjekt_id, previous=None):
+            seen.append(subjekt_id)
+            return ListingPage([Listina(
+                dokument_id=f"{subjekt_id}-{n}", subjekt_id=subjekt_id,
+                spis="1", cislo=f"{subjekt_id}/SL{n}",
+                typ="zápis ze schůze shromáždění SVJ",
+                vznik=datetime.utcnow(), doslo=None, zalozeno=None, stran=1)
+                for n in range(2)], "fp")
+
+        def download_pdf(self, listina, target):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(b"%PDF")
+
+    monkeypatch.setattr(app.listiny, "ListinyClient", FakeClient)
+    monkeypatch.setattr("app.pipeline.LISTINY_DIR", tmp_path)
+    monkeypatch.setattr(
+        "app.pipeline.extract_document",
+        lambda path, **kw: {"text": f"Zápis {path}.", "used_ocr": False,
+                            "partial": False, "pages": []})
+
+
+def test_sync_many_resumes_pending_subjects(monkeypatch, tmp_path):
+    from app.pipeline import sync_many
+
+    seen = []
+    _fake_sync(monkeypatch, tmp_path, seen)
+
+    db = _db()
+    first, *rest = db.query(Subject).order_by(Subject.id).all()
+    run = sync_runs.create(db, [s.id for s in (first, *rest)],
+                           {"max_docs": 2, "since_days": 30})
+    # První SVJ stihl proces před restartem.
+    sync_runs.record(db, run.id, first.id, "done", new_documents=2)
+    db.commit()
+
+    state = {"new_documents": 0, "hot_found": 0, "unchanged_subjects": 0}
+    results = sync_many(db, max_docs=2, since_days=30, state=state,
+                        procs=0, run_id=run.id)
+    assert seen == [f"S{s.ico}" for s in rest]
+    assert len(results) == 2 and state["processed_subjects"] == 3
+    assert state["progress"] == "3/3 SVJ"
+    assert db.query(Document).count() == 4
+    totals = sync_runs.counts(db, run.id)
+    assert totals["processed_subjects"] == 3 and totals["new_documents"] == 6
+    assert sync_runs.pending_subjects(db, run.id) == []
+    assert db.get(SyncRun, run.id).status == "running"  # uzavírá volající
+    db.close()
+
+
+def test_sync_many_skips_subject_whose_store_fails(monkeypatch, tmp_path):
+    from sqlalchemy.exc import OperationalError
+    from app import rotation
+    from app.pipeline import sync_many
+
+    _fake_sync(monkeypatch, tmp_path, [])
+    record_check = rotation.record_check
+
+    def locked_for_first(subject, *args):
+        if subject.ico == "10000000":
+            raise OperationalError("UPDATE", {}, "database is locked")
+        return record_check(subject, *args)
+
+    monkeypatch.setattr("app.pipeline.rotation.record_check",
+                        locked_for_first)
+    db = _db()
+    run = sync_runs.create(db, [s.id for s in db.query(Subject)
+                                .order_by(Subject.id)], {"max_docs": 2})
+    state = {"new_documents": 0, "hot_found": 0, "unchanged_subjects": 0}
+    results = sync_many(db, max_docs=2, state=state, procs=0, run_id=run.id)
+    # Chyba zápisu jednoho SVJ neukončí běh; SVJ je v běhu failed.
+    assert [("error" in r) for r in results] == [True, False, False]
+    assert "database is locked" in results[0]["error"]
+    totals = sync_runs.counts(db, run.id)
+    assert (totals["processed_subjects"], totals["failed_subjects"]) == (3, 1)
+    # Dokumenty se zapisují průběžně; příště se rozpoznají jako známé.
+    assert db.query(Document).count() == 6
+    db.close()
+
+
+def _sync_with_executor(monkeypatch, tmp_path, broken_submits: list):
+    """sync_many s poolem, jehož submit podle broken_submits (jeden prvek
+    na každý nový pool) hází BrokenProcessPool; hlídá zaseknutí."""
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    from app.pipeline import _SyncPipeline, sync_many
+
+    _fake_sync(monkeypatch, tmp_path, [])
+
+    class Executor(ThreadPoolExecutor):
+        def __init__(self, failures):
+            super().__init__(max_workers=1)
+            self.failures = failures
+
+        def submit(self, *args, **kwargs):
+            if self.failures:
+                self.failures -= 1
+                raise BrokenProcessPool("worker zabit (OOM)")
+            return super().submit(*args, **kwargs)
+
+    pools = iter(broken_submits)
+    monkeypatch.setattr(_SyncPipeline, "_executor",
+                        lambda self: Executor(next(pools, 0)))
+    db = _db()
+    run = sync_runs.create(db, [s.id for s in db.query(Subject)
+                                .order_by(Subject.id)], {"max_docs": 2})
+    state = {"new_documents": 0, "hot_found": 0, "unchanged_subjects": 0}
+
+    def stuck(*_):
+        raise TimeoutError("sync_many se zasekl")
+
+    previous = signal.signal(signal.SIGALRM, stuck)
+    signal.alarm(30)
+    try:
+        results = sync_many(db, max_docs=2, state=state, procs=1,
+                            run_id=run.id)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+    return db, run, results
+
+
+def test_sync_many_recreates_broken_extract_pool(monkeypatch, tmp_path):
+    db, run, results = _sync_with_executor(monkeypatch, tmp_path, [1])
+    # Dokument, jehož submit selhal, je chyba; ostatní jdou přes nový pool.
+    errors = [d for r in results for d in r["documents"] if d.get("error")]
+    assert len(results) == 3 and len(errors) == 1
+    assert "OOM" in errors[0]["error"]
+    assert db.query(Document).count() == 5
+    assert sync_runs.counts(db, run.id)["processed_subjects"] == 3
+    db.close()
+
+
+def test_sync_many_fails_remaining_subjects_when_pool_stays_broken(
+        monkeypatch, tmp_path):
+    db, run, results = _sync_with_executor(monkeypatch, tmp_path, [1, 1])
+    assert len(results) == 3
+    assert any("přerušena" in r.get("error", "") for r in results)
+    totals = sync_runs.counts(db, run.id)
+    assert totals["processed_subjects"] == 3 and totals["failed_subjects"] >= 1
+    db.close()
@@ -0,0 +1,47 @@
+import os
+
+from app import pdf_extract, text_cache
+
+
+def _use_tmp_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(text_cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(text_cache, "ENABLED", True)
+    monkeypatch.setattr(text_cache, "_size", None)
+    monkeypatch.setattr(text_cache, "engine_version", lambda: "test")
+
+
+def test_extract_text_smart_cached(monkeypatch, tmp_path):
+    _use_tmp_cache(monkeypatch, tmp_path)
+    calls = []
+    # pypdf "%PDF-scan" nepřečte -> celé PDF (1 strana) jde do OCR
+    monkeypatch.setattr("app.ocr.page_count",
+                        lambda path: calls.append(path) or 1)
+    monkeypatch.setattr("app.ocr.ocr_pages", lambda path, pages, **kw:
+                        calls.append("ocr") or {1: "text ze skenu"})
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-scan")
+
+    assert pdf_extract.extract_text_smart(str(pdf)) == ("text ze skenu", True)
+    assert text_cache.get(text_cache.cache_key(pdf)) is not None
+    # stejný obsah pod jiným jménem -> bez extrakce i OCR
+    copy = tmp_path / "kopie.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    assert pdf_extract.extract_text_smart(str(copy)) == ("text ze skenu", True)
+    assert calls == [str(pdf), "ocr"]
+
+    # jiné parametry OCR = jiný klíč
+    assert text_cache.cache_key(pdf) != text_cache.cache_key(pdf, dpi=200)
+
+
+def test_prune_evicts_least_recently_used(monkeypatch, tmp_path):
+    _use_tmp_cache(monkeypatch, tmp_path)
+    for n, key in enumerate(["aa1", "bb2", "cc3"]):
+        text_cache.put(key, {"text": "x" * 1000 + key, "used_ocr": False})
+        os.utime(text_cache._path(key), (n, n))
+    assert text_cache.get("aa1") is not None        # obnoví pozici v LRU
+
+    keep = sum(text_cache._path(k).stat().st_size for k in ("aa1", "cc3"))
+    out = text_cache.prune(max_bytes=keep)
+    assert out["removed"] == 1
+    assert text_cache.get("bb2") is None
+    assert text_cache.get("aa1") and text_cache.get("cc3")